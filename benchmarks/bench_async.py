@@ -0,0 +1,67 @@
+"""Benchmark how long `parse_async()` keeps the event loop from running other tasks, against `Parser.parse()`.
+
+A ticker task measures the latency of the event loop while a document is parsed. Run from the repository root with
+`python -m benchmarks.bench_async`.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import typing
+
+from benchmarks.corpus import generate
+from src.pybeech.aio import parse_async
+from src.pybeech.beech_types import Tree
+from src.pybeech.parser import Parser
+
+SIZE = 1 << 21
+CHUNK_SIZE = 1 << 16
+
+
+async def chunks(source: str) -> typing.AsyncIterator[bytes]:
+    # The source as it might arrive over the network.
+    for i in range(0, len(source), CHUNK_SIZE):
+        yield source[i:i + CHUNK_SIZE].encode()
+        await asyncio.sleep(0)
+
+
+async def measure(parse: typing.Awaitable[Tree]) -> tuple[float, float]:
+    # Return the time taken by `parse` and the longest time the event loop was kept from running the ticker.
+    ticks: list[float] = []
+
+    async def ticker() -> None:
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await parse
+    end = time.perf_counter()
+    task.cancel()
+    ticks.append(end)
+    return end - start, max(b - a for a, b in zip(ticks, ticks[1:]))
+
+
+async def parse_blocking(source: str) -> Tree:
+    return Parser(source).parse()
+
+
+async def main() -> None:
+    print(f"{'kind':<8}{'parser':<26}{'time':>10}{'longest stall':>16}")
+    for kind in ("wide", "data", "lists"):
+        source = generate(kind, SIZE)
+        runs: dict[str, typing.Callable[[], typing.Awaitable[Tree]]] = {
+            "Parser.parse()": lambda: parse_blocking(source),
+            "parse_async()": lambda: parse_async(chunks(source)),
+            "parse_async(every 100)": lambda: parse_async(chunks(source), yield_every=100),
+            "parse_async(executor)": lambda: parse_async(chunks(source), executor_threshold=1 << 20),
+        }
+        for name, run in runs.items():
+            seconds, stall = await measure(run())
+            print(f"{kind:<8}{name:<26}{seconds * 1e3:>8.0f}ms{stall * 1e3:>14.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
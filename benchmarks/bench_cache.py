@@ -0,0 +1,37 @@
+"""Benchmark loading trees from the parse cache against parsing them.
+
+Run from the repository root with `python -m benchmarks.bench_cache`.
+"""
+from __future__ import annotations
+
+import tempfile
+import time
+
+from benchmarks.bench_symbols import data_source
+from src.pybeech.cache import ParseCache, encode_tree
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.parser import Parser
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    source = data_source(20_000)
+    print(f"source: {len(source) / 1e6:.1f} MB")
+    print(f"{'mode':<14}{'parse':>10}{'cached':>10}{'mmap':>10}{'size MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, mode in {"none": None, "default": DEFAULT_MODE}.items():
+            parse = timed(lambda: Parser(source, mode=mode).parse())
+            ParseCache(directory).parse(source, mode)  # Fill the cache.
+            cached = timed(lambda: ParseCache(directory).parse(source, mode))
+            mapped = timed(lambda: ParseCache(directory, use_mmap=True).parse(source, mode))
+            size = len(encode_tree(Parser(source, mode=mode).parse()))
+            print(f"{name:<14}{parse:>9.3f}s{cached:>9.3f}s{mapped:>9.3f}s{size / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
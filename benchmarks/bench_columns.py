@@ -0,0 +1,78 @@
+"""Benchmark extracting long lists into columns against parsing them in default mode.
+
+Run from the repository root with `python -m benchmarks.bench_columns`.
+"""
+from __future__ import annotations
+
+import random
+import time
+import tracemalloc
+import typing
+
+from src.pybeech.columns import extract_column, extract_table
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, TextSymbol, classify
+from src.pybeech.parser import Parser
+
+ITEMS = 1_000_000
+ROWS = 100_000
+
+_WORDS = ["alpha", "beech", "cedar", "delta", "elm", "fir", "grove", "hazel", "ivy", "juniper"]
+
+
+def numbers_source(items: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return f"samples ({' '.join(str(rng.randrange(-1 << 20, 1 << 20)) for _ in range(items))})"
+
+
+def rows_source(rows: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "readings ({})".format(" ".join(
+        f"{{at 2023-{rng.randrange(1, 13):02}-{rng.randrange(1, 29):02}T{rng.randrange(24):02}:00:00Z "
+        f"value {rng.randrange(1 << 16)} sensor {rng.choice(_WORDS)}}}" for _ in range(rows)))
+
+
+def measure(build: typing.Callable[[], typing.Any]) -> tuple[int, float]:
+    # Return the bytes still allocated by `build()` once it has returned (with its result), and the time taken.
+    classify.cache_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, seconds
+
+
+def timed(build: typing.Callable[[], typing.Any]) -> float:
+    classify.cache_clear()
+    start = time.perf_counter()
+    build()
+    return time.perf_counter() - start
+
+
+def compare(name: str, count: int, runs: dict[str, typing.Callable[[], typing.Any]]) -> None:
+    print(f"{name:<26}{'time':>10}{'memory':>16}")
+    for run_name, run in runs.items():
+        seconds = timed(run)
+        size, _ = measure(run)
+        print(f"  {run_name:<24}{seconds * 1e3:>8.0f}ms{size / count:>12.1f}B per item")
+
+
+def main() -> None:
+    numbers = numbers_source(ITEMS)
+    column = extract_column(numbers, "samples")
+    assert list(column) == [n.value for n in Parser(numbers, mode=DEFAULT_MODE).parse()[TextSymbol("samples")]]
+    compare(f"{ITEMS} numbers", ITEMS, {
+        "default mode": lambda: Parser(numbers, mode=DEFAULT_MODE).parse(),
+        "extract_column()": lambda: extract_column(numbers, "samples"),
+    })
+    rows = rows_source(ROWS)
+    compare(f"{ROWS} rows of 3 keys", ROWS, {
+        "default mode": lambda: Parser(rows, mode=DEFAULT_MODE).parse(),
+        "extract_table()": lambda: extract_table(rows, "readings"),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Benchmark writing trees back out as Beech source code.
+
+Run from the repository root with `python -m benchmarks.bench_emitter`.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+from benchmarks.bench_symbols import data_source
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.emitter import dump, dumps
+from src.pybeech.parser import Parser
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    source = data_source(20_000) + 'escapes "tab\\there \\"quoted\\" \\\\ \\x00 é"\n'
+    print(f"{'tree':<10}{'layout':<10}{'time':>10}{'MB/s':>10}")
+    for name, mode in {"plain": None, "default": DEFAULT_MODE}.items():
+        tree = Parser(source, mode=mode).parse()
+        for layout, indent in {"compact": None, "pretty": 4}.items():
+            output = dumps(tree, indent)
+            assert Parser(output, mode=mode).parse() == tree, "Round trip failed."
+            elapsed = timed(lambda: dumps(tree, indent))
+            print(f"{name:<10}{layout:<10}{elapsed:>9.3f}s{len(output) / elapsed / 1e6:>10.1f}")
+    tree = Parser(source).parse()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "out.beech")
+        with open(path, "w", encoding="utf-8") as file:
+            elapsed = timed(lambda: dump(tree, file, indent=4))
+        print(f"dump to file: {elapsed:.3f}s, {os.path.getsize(path) / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Check how long importing the package, and starting the command line tool, take against a budget.
+
+Each target is imported in a fresh interpreter with `-X importtime`, and the median of several runs of the
+cumulative time of its import is compared with its budget. Exits with status 1 if any target is over budget. Run
+from the repository root with `python -m benchmarks.bench_import`, passing `--scale` to loosen the budgets on a slow
+machine.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+
+RUNS = 7
+# Budget, in milliseconds, for the cumulative import time of each target.
+BUDGETS_MS = {
+    "src.pybeech": 25,
+    "src.pybeech.parser": 60,
+    "src.pybeech.default_mode.symbol_parser": 75,
+    "src.pybeech.__main__": 70,
+}
+# Modules which must not be imported by a target, as they are only needed by some of its features.
+_DEFERRED = {
+    "src.pybeech": ["src.pybeech.parser", "src.pybeech.lexer", "asyncio"],
+    "src.pybeech.parser": ["asyncio", "concurrent.futures", "src.pybeech.default_mode.symbol_parser"],
+    "src.pybeech.__main__": ["asyncio", "concurrent.futures", "src.pybeech.default_mode.symbol_parser",
+                             "src.pybeech.profiling"],
+}
+
+# A line written by `-X importtime`: self and cumulative times in microseconds, then the indented module name.
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    # Import `module` in a fresh interpreter, returning the self and cumulative time of every module imported.
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if match := _LINE.match(line):
+            times[match[4]] = int(match[1]), int(match[2])
+    return times
+
+
+def main() -> None:
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("--scale", type=float, default=1.0, help="factor to multiply the budgets by")
+    arguments.add_argument("--top", type=int, default=5, help="number of slowest modules to show for each target")
+    options = arguments.parse_args()
+
+    over = False
+    print(f"{'target':<44}{'median':>10}{'budget':>10}")
+    for module, budget in BUDGETS_MS.items():
+        runs = [import_times(module) for _ in range(RUNS)]
+        median = statistics.median(times[module][1] for times in runs) / 1e3
+        limit = budget * options.scale
+        status = "ok" if median <= limit else "OVER BUDGET"
+        over |= median > limit
+        print(f"{module:<44}{median:>8.1f}ms{limit:>8.0f}ms  {status}")
+        for deferred in _DEFERRED.get(module, []):
+            if deferred in runs[0]:
+                over = True
+                print(f"    imports {deferred}, which should only be imported when needed")
+        slowest = sorted(runs[-1].items(), key=lambda item: item[1][0], reverse=True)[:options.top]
+        for name, (own, _) in slowest:
+            print(f"    {name:<40}{own / 1e3:>8.1f}ms")
+    sys.exit(over)
+
+
+if __name__ == "__main__":
+    main()
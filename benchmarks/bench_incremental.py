@@ -0,0 +1,52 @@
+"""Benchmark reparsing a document incrementally after an edit against parsing it again in full.
+
+Run from the repository root with `python -m benchmarks.bench_incremental`.
+"""
+from __future__ import annotations
+
+import re
+import time
+import typing
+
+from benchmarks.corpus import generate
+from src.pybeech.incremental import Document
+from src.pybeech.parser import Parser
+
+EDITS = 50
+
+# A symbol of at least two letters at the start of a tree or list, to type into.
+_WORD = re.compile(r"[({] ?([a-z])[a-z]")
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def type_in_middle(document: Document, text: str) -> Document:
+    # Type `text` one character at a time into a nested symbol in the middle of the document, as an editor would.
+    offset = typing.cast(re.Match[str], _WORD.search(document.source, len(document.source) // 2)).end(1)
+    for i, c in enumerate(text):
+        document = document.edit(offset + i, 0, c)
+    return document
+
+
+def main() -> None:
+    print(f"{'size':<10}{'kind':<8}{'full parse':>12}{'edit':>12}{'speedup':>10}")
+    for kind in ("data", "deep"):
+        for size in (1 << 18, 1 << 20, 1 << 22):
+            source = generate(kind, size)
+            document = Document(source)
+            full = timed(lambda: Parser(source).parse())
+            text = "x" * EDITS
+            start = time.perf_counter()
+            edited = type_in_middle(document, text)
+            edit = (time.perf_counter() - start) / EDITS
+            assert edited.tree == Parser(edited.source).parse()
+            print(f"{len(source) / 1e6:<7.1f}MB {kind:<8}{full * 1e3:>10.1f}ms{edit * 1e3:>10.3f}ms"
+                  f"{full / edit:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Benchmark the memory used per token and per parsed node.
+
+Run from the repository root with `python -m benchmarks.bench_memory`.
+"""
+from __future__ import annotations
+
+import tracemalloc
+import typing
+from dataclasses import dataclass
+
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import parse_symbol
+from src.pybeech.lexer import Lexer, TokenType
+from src.pybeech.parser import Parser, SymbolTable
+from src.pybeech.transformer import transformer
+
+
+@dataclass
+class DictToken:
+    """Token as it was before it was slotted, for comparison."""
+    type: TokenType
+    start_index: int
+    value: str
+    has_whitespace_before: bool
+    preceding_comments: list[str]
+
+
+class DictSymbol(Symbol):
+    """Symbol with a per-instance `__dict__`, as it was before it was slotted, for comparison."""
+
+
+def records_source(records: int) -> str:
+    return "".join(
+        f"record{i} {{ name item{i % 100} type widget id {i} created 2023-08-{i % 28 + 1:02} }}\n"
+        for i in range(records)
+    )
+
+
+def measure(build: typing.Callable[[], typing.Any]) -> int:
+    # Return the number of bytes still allocated by `build()` once it has returned.
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def old_tokens(source: str) -> list[DictToken]:
+    return [DictToken(t.type, t.start_index, t.value, t.has_whitespace_before, list(t.preceding_comments))
+            for t in Lexer(source)]
+
+
+def old_symbols(source: str) -> list[DictSymbol]:
+    return [DictSymbol(t.value) for t in Lexer(source) if t.type == TokenType.SYMBOL]
+
+
+def new_symbols(source: str, intern_symbols: bool = False) -> list[Symbol]:
+    return [Symbol(t.value) for t in Lexer(source, intern_symbols=intern_symbols) if t.type == TokenType.SYMBOL]
+
+
+def table_symbols(source: str, table: SymbolTable) -> list[Symbol]:
+    return [table.symbol(t.value) for t in Lexer(source) if t.type == TokenType.SYMBOL]
+
+
+def main() -> None:
+    source = records_source(20_000)
+    tokens = sum(1 for _ in Lexer(source))
+    symbols = sum(1 for t in Lexer(source) if t.type == TokenType.SYMBOL)
+    print(f"source: {len(source)} characters, {tokens} tokens, {symbols} symbols")
+    table = SymbolTable()
+    print(f"{'measurement':<36}{'before':>12}{'after':>12}")
+    rows = {
+        "bytes per token": (measure(lambda: old_tokens(source)) / tokens,
+                            measure(lambda: list(Lexer(source))) / tokens),
+        "bytes per symbol": (measure(lambda: old_symbols(source)) / symbols,
+                             measure(lambda: new_symbols(source)) / symbols),
+        "bytes per symbol (interned)": (measure(lambda: old_symbols(source)) / symbols,
+                                        measure(lambda: new_symbols(source, intern_symbols=True)) / symbols),
+        "bytes per symbol (symbol table)": (measure(lambda: old_symbols(source)) / symbols,
+                                            measure(lambda: table_symbols(source, table)) / symbols),
+    }
+    for name, (before, after) in rows.items():
+        print(f"{name:<36}{before:>12.1f}{after:>12.1f}")
+    print(f"symbol table: {len(table)} symbols, {table.hits} hits, {table.misses} misses")
+
+    tree = Parser(source, intern_symbols=True).parse()
+    parsed = measure(lambda: Parser(source, intern_symbols=True).parse())
+    transformed = measure(lambda: transformer(transform_symbol=parse_symbol)(tree))
+    print(f"parsed tree: {parsed / len(source):.2f} bytes per source character")
+    print(f"default-mode tree: {transformed / len(source):.2f} bytes per source character")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark ordered trees against the list of single-pair trees a log had to be written as before.
+
+Run from the repository root with `python -m benchmarks.bench_ordered`.
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+import typing
+
+from src.pybeech.beech_types import Symbol
+from src.pybeech.parser import Parser
+
+EVENTS = 200_000
+_KINDS = ["start", "read", "write", "flush", "stop"]
+
+
+def log_source(events: int, ordered: bool) -> str:
+    # A log of events whose keys repeat, as an ordered tree or as a list of trees of one pair each.
+    entries = (f'{_KINDS[i % len(_KINDS)]} "event {i}"' for i in range(events))
+    if ordered:
+        return f"log [{' '.join(entries)}]"
+    return f"log ({' '.join(f'{{{entry}}}' for entry in entries)})"
+
+
+def measure(build: typing.Callable[[], typing.Any]) -> tuple[int, float, typing.Any]:
+    # Return the bytes still allocated by `build()` once it has returned, the time taken and its result.
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, seconds, result
+
+
+def timed(function: typing.Callable[[], typing.Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    key = Symbol("write")
+    ordered_size, _, ordered = measure(Parser(log_source(EVENTS, True)).parse)
+    listed_size, _, listed = measure(Parser(log_source(EVENTS, False)).parse)
+    ordered_log = ordered[Symbol("log")]
+    listed_log = listed[Symbol("log")]
+    parse_ordered = timed(Parser(log_source(EVENTS, True)).parse)
+    parse_listed = timed(Parser(log_source(EVENTS, False)).parse)
+    iterate_ordered = timed(lambda: [value for _, value in ordered_log.items()])
+    iterate_listed = timed(lambda: [value for entry in listed_log for value in entry.values()])
+    first_lookup = timed(lambda: ordered_log.get_all(key))
+    lookup_ordered = timed(lambda: ordered_log.get_all(key))
+    lookup_listed = timed(lambda: [entry[key] for entry in listed_log if key in entry])
+    assert ordered_log.get_all(key) == [entry[key] for entry in listed_log if key in entry]
+
+    print(f"{EVENTS} events{'ordered tree':>20}{'list of trees':>16}")
+    print(f"{'memory':<16}{ordered_size / EVENTS:>18.1f}B{listed_size / EVENTS:>15.1f}B  per event")
+    print(f"{'parse':<16}{parse_ordered * 1e3:>17.1f}ms{parse_listed * 1e3:>14.1f}ms")
+    print(f"{'iterate':<16}{iterate_ordered * 1e3:>17.1f}ms{iterate_listed * 1e3:>14.1f}ms")
+    print(f"{'all of a key':<16}{lookup_ordered * 1e3:>17.1f}ms{lookup_listed * 1e3:>14.1f}ms"
+          f"  (first lookup, building the index: {first_lookup * 1e3:.1f}ms)")
+
+
+if __name__ == "__main__":
+    main()
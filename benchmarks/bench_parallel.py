@@ -0,0 +1,33 @@
+"""Benchmark parsing one large document sequentially and in parallel chunks.
+
+Run from the repository root with `python -m benchmarks.bench_parallel`.
+"""
+from __future__ import annotations
+
+import os
+import time
+
+from benchmarks.bench_symbols import data_source
+from src.pybeech.batch import _split_top_level, parse_parallel
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.parser import Parser
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    source = data_source(100_000)
+    workers = os.cpu_count() or 1
+    print(f"source: {len(source) / 1e6:.1f} MB, {workers} CPUs")
+    print(f"boundary scan:  {timed(lambda: _split_top_level(source, workers)):.3f}s")
+    print(f"sequential:     {timed(lambda: Parser(source, mode=DEFAULT_MODE).parse()):.3f}s")
+    for n in sorted({2, 4, workers}):
+        print(f"parallel ({n:>2}):  {timed(lambda: parse_parallel(source, workers=n, mode=DEFAULT_MODE)):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the recursive and iterative parsers.
+
+Run from the repository root with `python -m benchmarks.bench_parser`.
+"""
+from __future__ import annotations
+
+import sys
+import timeit
+
+from src.pybeech.errors import ParseError
+from src.pybeech.parser import Parser
+
+
+def flat_source(pairs: int) -> str:
+    return "".join(f'key{i} "value {i}"\n' for i in range(pairs))
+
+
+def shallow_source(records: int) -> str:
+    return "".join(
+        f"record{i} {{\n"
+        f'    name "record {i}"\n'
+        f"    id {i}\n"
+        f"    tags (a b c)\n"
+        f"    nested {{ x 1 y 2 }}\n"
+        f"}}\n"
+        for i in range(records)
+    )
+
+
+def deep_source(depth: int) -> str:
+    return "root " + "{ k " * depth + "v" + " }" * depth
+
+
+def best_time(source: str, iterative: bool, number: int = 3) -> float:
+    return min(timeit.repeat(lambda: Parser(source, iterative=iterative).parse(), number=1, repeat=number))
+
+
+def main() -> None:
+    inputs = {
+        "flat (100000 pairs)": flat_source(100_000),
+        "shallow (20000 records)": shallow_source(20_000),
+        "deep (250 levels)": deep_source(250),
+    }
+    print(f"{'input':<28}{'recursive':>12}{'iterative':>12}{'ratio':>8}")
+    for name, source in inputs.items():
+        recursive = best_time(source, iterative=False)
+        iterative = best_time(source, iterative=True)
+        print(f"{name:<28}{recursive:>11.3f}s{iterative:>11.3f}s{iterative / recursive:>8.2f}")
+
+    depth = 20 * sys.getrecursionlimit()
+    source = deep_source(depth)
+    try:
+        Parser(source).parse()
+        recursive_result = "ok"
+    except RecursionError:
+        recursive_result = "RecursionError"
+    except ParseError as e:
+        recursive_result = f"ParseError: {e}"
+    iterative = best_time(source, iterative=True, number=1)
+    print(f"deep ({depth} levels): recursive {recursive_result}, iterative {iterative:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark decoding documents with a schema against parsing them in default mode.
+
+Run from the repository root with `python -m benchmarks.bench_schema`.
+"""
+from __future__ import annotations
+
+import dataclasses
+import random
+import time
+import tracemalloc
+import typing
+
+from src.pybeech.default_mode.extension_types import Date, DateTime, Time
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, TextSymbol, classify
+from src.pybeech.parser import Parser
+from src.pybeech.schema import Schema
+
+READINGS = 20_000
+
+_WORDS = ["alpha", "beech", "cedar", "delta", "elm", "fir", "grove", "hazel", "ivy", "juniper"]
+
+BEECH_SCHEMA = """
+sensor text
+readings ({id number count number created date at time updated date-time name text})
+"""
+
+
+@dataclasses.dataclass(slots=True)
+class Reading:
+    id: int
+    count: int
+    created: Date
+    at: Time
+    updated: DateTime
+    name: TextSymbol
+
+
+@dataclasses.dataclass(slots=True)
+class Log:
+    sensor: TextSymbol
+    readings: list[Reading]
+
+
+def log_source(readings: int, seed: int = 0) -> str:
+    # A log of readings following the schemas above, each with a tree of metadata which they leave out.
+    rng = random.Random(seed)
+    entries = []
+    for i in range(readings):
+        day, minute = rng.randrange(1, 29), rng.randrange(60)
+        entries.append(f"{{id {i} count 0x{rng.randrange(1 << 16):x} created 2023-08-{day:02} at 12:{minute:02}:00Z "
+                       f"updated 2023-11-{day:02}T05:{minute:02}:{rng.randrange(60):02}+01:00 "
+                       f"name {rng.choice(_WORDS)} meta {{source {rng.choice(_WORDS)} tags (a b c)}}}}")
+    return f"sensor boiler readings ({' '.join(entries)})"
+
+
+def measure(build: typing.Callable[[], typing.Any]) -> tuple[int, float]:
+    # Return the bytes still allocated by `build()` once it has returned (with its result), and the time taken.
+    classify.cache_clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, seconds
+
+
+def timed(build: typing.Callable[[], typing.Any]) -> float:
+    classify.cache_clear()
+    start = time.perf_counter()
+    build()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    source = log_source(READINGS)
+    beech_schema = Schema.from_source(BEECH_SCHEMA)
+    class_schema = Schema(Log)
+    runs: dict[str, typing.Callable[[], typing.Any]] = {
+        "default mode": lambda: Parser(source, mode=DEFAULT_MODE).parse(),
+        "schema (Beech)": lambda: beech_schema.decode(source),
+        "schema (dataclasses)": lambda: class_schema.decode(source),
+    }
+    log = class_schema.decode(source)
+    tree = Parser(source, mode=DEFAULT_MODE).parse()
+    assert [reading.updated for reading in log.readings] == [
+        reading[TextSymbol("updated")].value for reading in tree[TextSymbol("readings")]]
+
+    print(f"{READINGS} readings ({len(source) / 1e6:.1f}MB)")
+    print(f"{'':<22}{'time':>10}{'memory':>16}")
+    for name, run in runs.items():
+        seconds = min(timed(run) for _ in range(3))
+        size, _ = measure(run)
+        print(f"{name:<22}{seconds * 1e3:>8.0f}ms{size / READINGS:>10.0f}B per reading")
+
+
+if __name__ == "__main__":
+    main()
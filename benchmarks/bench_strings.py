@@ -0,0 +1,46 @@
+"""Benchmark string literal decoding in the reference and fast lexing engines.
+
+Run from the repository root with `python -m benchmarks.bench_strings`.
+"""
+from __future__ import annotations
+
+import timeit
+
+from src.pybeech.lexer import Lexer
+
+
+def escape_heavy_source(escapes: int) -> str:
+    # A single literal made almost entirely of escape sequences.
+    unit = r"\t\x41é\"\\\n"
+    return 'key "' + unit * (escapes // 6) + '"'
+
+
+def multiline_heavy_source(lines: int) -> str:
+    # A single literal spread over many continuation lines, like an embedded certificate.
+    line = "MIIDdzCCAl+gAwIBAgIEAgAAuTANBgkqhkiG9w0BAQUFADBaMQswCQYDVQQGEwJJRTES"
+    return "cert " + "\n     ".join(f'"{line}\\' for _ in range(lines)) + '\n     ""'
+
+
+def plain_source(length: int) -> str:
+    return 'blob "' + "abcdefgh" * (length // 8) + '"'
+
+
+def best_time(source: str, fast: bool, number: int = 3) -> float:
+    return min(timeit.repeat(lambda: list(Lexer(source, fast=fast)), number=1, repeat=number))
+
+
+def main() -> None:
+    inputs = {
+        "escape-heavy (120000 escapes)": escape_heavy_source(120_000),
+        "multiline-heavy (20000 lines)": multiline_heavy_source(20_000),
+        "plain (1000000 chars)": plain_source(1_000_000),
+    }
+    print(f"{'input':<32}{'reference':>12}{'fast':>12}{'MB/s (fast)':>14}")
+    for name, source in inputs.items():
+        reference = best_time(source, fast=False)
+        fast = best_time(source, fast=True)
+        print(f"{name:<32}{reference:>11.3f}s{fast:>11.4f}s{len(source) / fast / 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
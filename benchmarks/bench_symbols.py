@@ -0,0 +1,60 @@
+"""Benchmark classifying symbols with the default mode `parse_symbol`.
+
+Run from the repository root with `python -m benchmarks.bench_symbols`.
+"""
+from __future__ import annotations
+
+import timeit
+
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, EXTENDED_SYMBOLS, TextSymbol, classify, parse_symbol
+from src.pybeech.parser import Parser
+from src.pybeech.transformer import transformer
+
+
+def data_source(records: int) -> str:
+    return "".join(
+        f"record{i} {{ name item{i % 100} id {i} count 0x{i:x} "
+        f"created 2023-08-{i % 28 + 1:02} at 12:{i % 60:02}:00Z "
+        f"updated 2023-11-{i % 28 + 1:02}T05:{i % 60:02}:00+01:00 }}\n"
+        for i in range(records)
+    )
+
+
+def sequential_parse_symbol(symbol: Symbol) -> Symbol:
+    # Try every extended symbol type in turn, as `parse_symbol` used to.
+    value = str(symbol)
+    for cls in EXTENDED_SYMBOLS:
+        if (sym := cls.try_parse(value)) is not None:
+            return sym
+    return TextSymbol(value)
+
+
+def cold_parse_symbol(symbol: Symbol) -> Symbol:
+    # Classify without the cache.
+    return classify.__wrapped__(str(symbol))
+
+
+def best_time(function, number: int = 3) -> float:
+    return min(timeit.repeat(function, number=1, repeat=number))
+
+
+def main() -> None:
+    source = data_source(20_000)
+    tree = Parser(source).parse()
+    parse = best_time(lambda: Parser(source).parse())
+    print(f"parse: {parse:.3f}s")
+    for name, rule in {
+        "sequential": sequential_parse_symbol,
+        "dispatch (uncached)": cold_parse_symbol,
+        "dispatch (cached)": parse_symbol,
+    }.items():
+        transform = transformer(transform_symbol=rule)
+        print(f"transform, {name:<20} {best_time(lambda: transform(tree)):.3f}s")
+    print(classify.cache_info())
+    one_pass = best_time(lambda: Parser(source, mode=DEFAULT_MODE).parse())
+    print(f"parse with default mode in one pass: {one_pass:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
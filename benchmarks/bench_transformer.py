@@ -0,0 +1,50 @@
+"""Benchmark the eager, in-place and lazy transformers.
+
+Run from the repository root with `python -m benchmarks.bench_transformer`.
+"""
+from __future__ import annotations
+
+import time
+import tracemalloc
+import typing
+
+from benchmarks.bench_symbols import data_source
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import classify, parse_symbol
+from src.pybeech.parser import Parser
+from src.pybeech.transformer import in_place_transformer, lazy_transformer, transformer
+
+
+def measure(run: typing.Callable[[], typing.Any]) -> tuple[float, int]:
+    # Return the time taken by `run()` and the peak memory it allocated.
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    source = data_source(20_000)
+    eager = transformer(transform_symbol=parse_symbol)
+    in_place = in_place_transformer(transform_symbol=parse_symbol)
+    lazy = lazy_transformer(transform_symbol=parse_symbol)
+    key = parse_symbol(Symbol("record100"))
+    runs: dict[str, typing.Callable[[typing.Any], typing.Any]] = {
+        "eager": eager,
+        "in place": in_place,
+        "lazy (one record)": lambda tree: dict(lazy(tree)[key]),
+        "lazy (everything)": lambda tree: [dict(record) for record in lazy(tree).values()],
+    }
+    print(f"{'transformer':<20}{'time':>10}{'peak MB':>10}")
+    for name, run in runs.items():
+        tree = Parser(source).parse()
+        classify.cache_clear()
+        elapsed, peak = measure(lambda: run(tree))
+        print(f"{name:<20}{elapsed:>9.3f}s{peak / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Generate synthetic Beech corpora for benchmarking.
+
+Each kind of corpus stresses a different part of the lexer, parser or default mode. The output depends only on
+the kind, size and seed, so that results from different runs (and machines) are comparable.
+
+Run from the repository root with `python -m benchmarks.corpus KIND [SIZE]` to print a corpus.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import typing
+
+DEFAULT_SEED = 20230810
+
+# Depth of each nested record in the "deep" corpus, kept well inside the recursive parser's limit.
+DEEP_RECORD_DEPTH = 100
+
+_WORDS = ["alpha", "beech", "cedar", "delta", "elm", "fir", "grove", "hazel", "ivy", "juniper", "larch", "maple",
+          "oak", "pine", "rowan", "spruce", "teak", "willow", "yew"]
+_ESCAPES = ["\\n", "\\t", "\\\"", "\\'", "\\\\", "\\x41", "\\u00e9", "\\U0001f333", "\\r", "\\a"]
+
+
+def _word(rng: random.Random) -> str:
+    return rng.choice(_WORDS)
+
+
+def _wide(rng: random.Random, i: int) -> str:
+    # One key-value pair of a flat top-level tree.
+    if rng.random() < 0.5:
+        return f"{_word(rng)}{i} {_word(rng)}-{rng.randrange(1000)}\n"
+    return f'{_word(rng)}{i} "{_word(rng)} {_word(rng)} {rng.randrange(1000)}"\n'
+
+
+def _deep(rng: random.Random, i: int) -> str:
+    # A record nested `DEEP_RECORD_DEPTH` levels deep, with a small tree or list at the bottom.
+    depth = DEEP_RECORD_DEPTH
+    leaf = f"({_word(rng)} {_word(rng)})" if i % 2 else f'{{ {_word(rng)} "{rng.randrange(1000)}" }}'
+    return f"record{i} " + "{ k " * depth + leaf + " }" * depth + "\n"
+
+
+def _lists(rng: random.Random, i: int) -> str:
+    # A long list of symbols and strings.
+    items = " ".join(_word(rng) if rng.random() < 0.7 else f'"{_word(rng)}"' for _ in range(200))
+    return f"list{i} ({items})\n"
+
+
+def _escapes(rng: random.Random, i: int) -> str:
+    # Strings with many escape sequences, some of them spanning several lines.
+    parts = [f"{_word(rng)}{rng.choice(_ESCAPES)}" for _ in range(12)]
+    if i % 4 == 0:
+        return f'text{i} "{"".join(parts[:6])}\n    "{"".join(parts[6:])}"\n'
+    return f'text{i} "{"".join(parts)}"\n'
+
+
+def _comments(rng: random.Random, i: int) -> str:
+    # Key-value pairs buried in line comments and (nested) block comments.
+    # Note: the lexer does not accept a comment at the very start of the source, so each record starts with a pair.
+    return (f"key{i} {_word(rng)} # {_word(rng)}\n"
+            f"# {_word(rng)} {_word(rng)} {_word(rng)}\n"
+            f"~{{ {_word(rng)} ~{{ {_word(rng)} }}~ {_word(rng)} }}~\n")
+
+
+def _data(rng: random.Random, i: int) -> str:
+    # Records of numbers, dates, times and date-times, which default mode converts.
+    day = rng.randrange(1, 29)
+    minute = rng.randrange(60)
+    return (f"record{i} {{ id {i} count 0x{rng.randrange(1 << 16):x} delta {rng.randrange(-999, 1000)} "
+            f"created 2023-08-{day:02} at 12:{minute:02}:00Z "
+            f"updated 2023-11-{day:02}T05:{minute:02}:00+01:00 name {_word(rng)} }}\n")
+
+
+KINDS: dict[str, typing.Callable[[random.Random, int], str]] = {
+    "wide": _wide,
+    "deep": _deep,
+    "lists": _lists,
+    "escapes": _escapes,
+    "comments": _comments,
+    "data": _data,
+}
+
+
+def generate(kind: str, size: int, seed: int = DEFAULT_SEED) -> str:
+    """Return a corpus of the given kind, of at least `size` characters.
+
+    :param kind: one of the keys of `KINDS`
+    :param size: minimum number of characters
+    :param seed: (optional) seed for the random choices
+
+    :raises ValueError: if `kind` is not known
+    """
+    try:
+        record = KINDS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown corpus kind: {kind!r}") from None
+    rng = random.Random(f"{seed} {kind}")
+    parts: list[str] = []
+    total = 0
+    i = 0
+    while total < size:
+        part = record(rng, i)
+        parts.append(part)
+        total += len(part)
+        i += 1
+    return "".join(parts)
+
+
+def main() -> None:
+    kind = sys.argv[1] if len(sys.argv) > 1 else "wide"
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 16
+    sys.stdout.write(generate(kind, size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Check that every lexing engine gives the same tokens and errors, and compare their speed.
+
+The engines are the reference engine, the pure Python fast engine and (if it has been built) the compiled
+accelerator. Run from the repository root with `python -m benchmarks.lexer_conformance`; the exit status is
+non-zero if any engine disagrees with the reference.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import timeit
+
+from benchmarks.bench_strings import escape_heavy_source, multiline_heavy_source
+from benchmarks.bench_symbols import data_source
+from src.pybeech import lexer
+from src.pybeech.lexer import Lexer
+
+ENGINES = {
+    "reference": {"fast": False},
+    "fast": {"fast": True, "compiled": False},
+    "compiled": {"fast": True, "compiled": True},
+}
+
+CASES = [
+    "",
+    "a b c",
+    'key "value" other \'single\'',
+    "{ a (b c) }",
+    "[a b a c] x[y]z",
+    "a~b c~ d ~{ comment }~ e",
+    "a # line comment\n b",
+    "a ~{ nested ~{ comment }~ x }~ b",
+    "a ~{ unterminated",
+    "a }~",
+    'a "unterminated',
+    'a "multi\n   "line\\\n   \'string\'',
+    'a "multi\n  ~{ comment }~ "line"',
+    'a "multi\nb"',
+    r'a "\t\n\r\v\f\a\b\\\"\'"',
+    r'a "\x41é\U0001F600"',
+    r'a "\x4"',
+    r'a "\xZZ"',
+    r'a "\ud800"',
+    r'a "\udfff" b',
+    'a\n "x\\uDC00y"',
+    r'a "\U00110000"',
+    r'a "\UFFFFFFFF"',
+    'a "multi\n  "\\U0000d800"',
+    r'a "\q"',
+    'a "\x01"',
+    "a \x01",
+    "a　b é ​",
+    "a#b c",
+    '"" \'\'',
+]
+
+ALPHABET = ['a', 'é', '"', "'", '\\', 'n', 'x', 'u', 'U', '0', '4', '1', 'd', '8', 'F', '\n', ' ', '\t', '#',
+            '~{', '}~', '{', '}', '(', ')', '[', ']', '~', '\x01', '　']
+
+
+def tokens(source: str, options: dict[str, bool]) -> list[tuple] | str:
+    # Return the tokens as tuples, or a description of the error raised.
+    try:
+        return [(t.type, t.start_index, t.value, t.has_whitespace_before, list(t.preceding_comments))
+                for t in Lexer(source, **options)]
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def random_cases(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 30))) for _ in range(count)]
+
+
+def main() -> int:
+    engines = dict(ENGINES)
+    if lexer._speedups is None:
+        print("compiled accelerator not built; checking the pure Python engines only")
+        del engines["compiled"]
+    failures = 0
+    for source in CASES + random_cases(20_000):
+        expected = tokens(source, engines["reference"])
+        for name, options in engines.items():
+            if (actual := tokens(source, options)) != expected:
+                failures += 1
+                print(f"{name} engine differs on {source!r}:\n  expected {expected}\n  got      {actual}")
+    print(f"conformance: {failures} failures")
+
+    inputs = {
+        "data": data_source(20_000),
+        "escape-heavy": escape_heavy_source(120_000),
+        "multiline-heavy": multiline_heavy_source(20_000),
+    }
+    print(f"{'input':<18}" + "".join(f"{name:>12}" for name in engines if name != "reference"))
+    for input_name, source in inputs.items():
+        times = [min(timeit.repeat(lambda: list(Lexer(source, **options)), number=1, repeat=3))
+                 for name, options in engines.items() if name != "reference"]
+        print(f"{input_name:<18}" + "".join(f"{t:>11.3f}s" for t in times))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""Run the benchmark suite over the synthetic corpora, and compare results between runs.
+
+Each stage (lexing, parsing, transforming with default mode, and `parse_symbol` on its own) is timed on each kind
+of corpus (see `benchmarks.corpus`). For each, the suite reports tokens and megabytes of source per second (both
+relative to the whole corpus, whatever the stage), the peak memory traced while it runs, and the number of memory
+blocks it leaves allocated (mostly its result).
+
+Run from the repository root with `python -m benchmarks.suite [--output FILE] [--compare BASELINE]`. With
+`--compare`, the exit status is 1 if any throughput fell by more than the threshold, to gate a release on.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+from benchmarks.corpus import DEFAULT_SEED, KINDS, generate
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, classify, parse_symbol
+from src.pybeech.lexer import Lexer, TokenType
+from src.pybeech.parser import Parser
+from src.pybeech.transformer import mode_transformer
+
+# Version of the results format. Results of different versions are not compared.
+RESULTS_VERSION = 1
+DEFAULT_SIZE = 1 << 20
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.10
+
+
+class Stage(typing.NamedTuple):
+    """A stage of the pipeline: `prepare(source)` builds its input (untimed), and `run(input)` is timed."""
+    prepare: typing.Callable[[str], typing.Any]
+    run: typing.Callable[[typing.Any], typing.Any]
+
+
+def _lex(source: str) -> int:
+    count = 0
+    for _ in Lexer(source):
+        count += 1
+    return count
+
+
+def _symbols(source: str) -> list[Symbol]:
+    return [Symbol(t.value) for t in Lexer(source) if t.type is TokenType.SYMBOL]
+
+
+def _cold(function: typing.Callable[[typing.Any], typing.Any]) -> typing.Callable[[typing.Any], typing.Any]:
+    # Clear the default mode's symbol cache first, so that every repetition does the same work.
+    def run(value: typing.Any) -> typing.Any:
+        classify.cache_clear()
+        return function(value)
+    return run
+
+
+def _parse_symbols(symbols: list[Symbol]) -> list[Symbol]:
+    return [parse_symbol(symbol) for symbol in symbols]
+
+
+STAGES: dict[str, Stage] = {
+    "lex": Stage(lambda source: source, _lex),
+    "parse": Stage(lambda source: source, lambda source: Parser(source).parse()),
+    "transform": Stage(lambda source: Parser(source).parse(), _cold(mode_transformer(DEFAULT_MODE))),
+    "parse_symbol": Stage(_symbols, _cold(_parse_symbols)),
+}
+
+
+def measure(stage: Stage, source: str, tokens: int, repeat: int) -> dict[str, float]:
+    """Time one stage on one corpus, returning its metrics."""
+    value = stage.prepare(source)
+    seconds = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        stage.run(value)
+        seconds = min(seconds, time.perf_counter() - start)
+    # Memory is measured in a separate run, since tracing slows everything down.
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = stage.run(value)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+    del result
+    return {
+        "seconds": seconds,
+        "tokens_per_second": tokens / seconds,
+        "mb_per_second": len(source.encode("utf-8")) / 1e6 / seconds,
+        "peak_memory": peak,
+        "allocated_blocks": blocks,
+    }
+
+
+def run_suite(size: int = DEFAULT_SIZE, repeat: int = DEFAULT_REPEAT, seed: int = DEFAULT_SEED,
+              kinds: typing.Iterable[str] = KINDS, stages: typing.Iterable[str] = STAGES,
+              log: typing.TextIO | None = sys.stderr) -> dict[str, typing.Any]:
+    """Run every stage on every kind of corpus, returning the results in the JSON format of the suite."""
+    stages = list(stages)
+    results: dict[str, dict[str, float]] = {}
+    for kind in kinds:
+        source = generate(kind, size, seed)
+        tokens = _lex(source)
+        for name in stages:
+            results[f"{kind}/{name}"] = measure(STAGES[name], source, tokens, repeat)
+            if log is not None:
+                print(f"{kind}/{name}: {results[f'{kind}/{name}']['mb_per_second']:.2f} MB/s", file=log)
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "implementation": sys.implementation.name,
+        "platform": platform.platform(),
+        "size": size,
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(baseline: dict[str, typing.Any], current: dict[str, typing.Any],
+            threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """Compare two sets of results, returning a description of each throughput which fell by more than `threshold`.
+
+    :raises ValueError: if the results are of different versions, or from corpora of different sizes or seeds
+    """
+    for field in ("version", "size", "seed"):
+        if baseline.get(field) != current.get(field):
+            raise ValueError(f"Cannot compare results with different {field}: {baseline.get(field)} and "
+                             f"{current.get(field)}")
+    regressions = []
+    for name, metrics in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["mb_per_second"]
+        after = metrics["mb_per_second"]
+        if after < before * (1 - threshold):
+            regressions.append(f"{name}: {before:.2f} -> {after:.2f} MB/s ({after / before - 1:+.1%})")
+    return regressions
+
+
+def print_results(results: dict[str, typing.Any], baseline: dict[str, typing.Any] | None = None) -> None:
+    print(f"{'benchmark':<24}{'Mtok/s':>9}{'MB/s':>9}{'peak MB':>9}{'blocks':>10}{'change':>9}")
+    for name, metrics in results["results"].items():
+        change = ""
+        if baseline is not None and name in baseline["results"]:
+            change = f"{metrics['mb_per_second'] / baseline['results'][name]['mb_per_second'] - 1:+.1%}"
+        print(f"{name:<24}{metrics['tokens_per_second'] / 1e6:>9.2f}{metrics['mb_per_second']:>9.2f}"
+              f"{metrics['peak_memory'] / 1e6:>9.1f}{metrics['allocated_blocks']:>10}{change:>9}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="benchmarks.suite", description="Run the Beech benchmark suite.")
+    arg_parser.add_argument("--size", type=int, default=DEFAULT_SIZE,
+                            help=f"characters in each corpus (default: {DEFAULT_SIZE})")
+    arg_parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                            help=f"timed runs of each benchmark, keeping the best (default: {DEFAULT_REPEAT})")
+    arg_parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="seed for the corpus generator")
+    arg_parser.add_argument("--kind", action="append", choices=list(KINDS), help="corpus to run (default: all)")
+    arg_parser.add_argument("--stage", action="append", choices=list(STAGES), help="stage to run (default: all)")
+    arg_parser.add_argument("-o", "--output", help="file to write the results to, as JSON")
+    arg_parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare with")
+    arg_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help=f"largest allowed fall in throughput (default: {DEFAULT_THRESHOLD})")
+    args = arg_parser.parse_args(argv)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+    results = run_suite(args.size, args.repeat, args.seed, args.kind or KINDS, args.stage or STAGES)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    print_results(results, baseline)
+    if baseline is None:
+        return 0
+    regressions = compare(baseline, results, args.threshold)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
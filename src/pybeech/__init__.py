@@ -1,7 +1,78 @@
+"""Parse, query and write Beech, a simple tree-based language.
+
+Submodules, and the names re-exported from them below, are only imported when they are first used (see PEP 562),
+so that importing the package, or one of its modules, does not import all the others (and their dependencies,
+such as `asyncio`).
+"""
+import importlib
+import typing
+
+if typing.TYPE_CHECKING:
+    from .emitter import dump, dumps
+    from .batch import LoadResult, load, load_many, parse_parallel
+    from .aio import parse_async
+    from .schema import Schema
+    from .columns import extract_column, extract_table
+    from .parser import SymbolTable, query, query_all
+
 __all__ = [
     "errors",
     "lexer",
     "parser",
     "beech_types",
-    "transformer"
+    "transformer",
+    "batch",
+    "cache",
+    "emitter",
+    "profiling",
+    "incremental",
+    "aio",
+    "default_mode",
+    "schema",
+    "columns",
+    "query",
+    "query_all",
+    "SymbolTable",
+    "load",
+    "load_many",
+    "LoadResult",
+    "parse_parallel",
+    "parse_async",
+    "Schema",
+    "extract_column",
+    "extract_table",
+    "dump",
+    "dumps",
 ]
+
+# The submodule defining each re-exported name.
+_EXPORTS = {
+    "dump": "emitter",
+    "dumps": "emitter",
+    "LoadResult": "batch",
+    "load": "batch",
+    "load_many": "batch",
+    "parse_parallel": "batch",
+    "parse_async": "aio",
+    "Schema": "schema",
+    "extract_column": "columns",
+    "extract_table": "columns",
+    "SymbolTable": "parser",
+    "query": "parser",
+    "query_all": "parser",
+}
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif name in __all__:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # Later lookups find it directly.
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -1,67 +1,68 @@
-"""Main script for pybeech package."""
-from typing import Union
+"""Main script for pybeech package: parse a batch of Beech files.
 
-from src.pybeech.beech_types import Symbol
-from src.pybeech.default_mode.extension_types import Date, Time, DateTime
-from src.pybeech.default_mode.symbol_parser import parse_symbol
-from src.pybeech.lexer import Lexer
-from src.pybeech.parser import Parser
-from src.pybeech.transformer import transformer
+Usage: `python -m src.pybeech [-j WORKERS] [--default-mode] [--print] [--profile] FILE...`
 
-source = r"""
-hello {
-    "world" !
-}
-General Kenobi  # You are a bold one
-~{
-    this is a
-    block comment
-}~
-string "This is a
-       'multiline "string", \
-       "which includes escaped \
-       'characters.
-       "\t\x00 \x37 \u0041\b\f\a\v"
-list (
-    "this" is a
-    list of ~{comment}~
-    many, (items)
-)
-number 42
-date 2023-08-10
-"not a date" abc2023-08-10efg
-timestamp 2023-11-08T05:01:00+01:00
-utc 2038-01-19T03:14:07Z
+With `--profile`, each file is parsed in this process and a report of where the time went is printed for it.
 """
-lexer = Lexer(source)
+from __future__ import annotations
 
-print(*lexer, sep="\n")
+import argparse
+import sys
 
-parser = Parser(source)
-tree = parser.parse()
-print(tree)
+from .batch import FILE_ERRORS, load_many
+from .transformer import Mode
 
 
-# class NumberSymbol(Symbol):
-#     def __init__(self, number: int):
-#         super().__init__(str(int))
-#         self._number = number
-#
-#     def __repr__(self) -> str:
-#         return f"NumberSymbol({self._number})"
-#
-#
-# def transform_symbol(symbol: Symbol) -> Union[NumberSymbol, Symbol]:
-#     try:
-#         return NumberSymbol(int(str(symbol)))
-#     except ValueError:
-#         return symbol
-#
+def main(argv: list[str] | None = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="pybeech", description="Parse a batch of Beech files.")
+    arg_parser.add_argument("files", nargs="+", help="Beech files to parse")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None,
+                            help="number of worker processes (default: number of CPUs)")
+    arg_parser.add_argument("--default-mode", action="store_true", help="transform the trees with default mode")
+    arg_parser.add_argument("--print", action="store_true", help="print each parsed tree")
+    arg_parser.add_argument("--encoding", default="utf-8", help="encoding of the files (default: utf-8)")
+    arg_parser.add_argument("--profile", action="store_true",
+                            help="print a profile of lexing and parsing each file, instead of parsing in parallel")
+    args = arg_parser.parse_args(argv)
+    mode = None
+    if args.default_mode:
+        # Imported only when needed, to keep startup fast for the many short runs which don't need it.
+        from .default_mode.symbol_parser import DEFAULT_MODE
+        mode = DEFAULT_MODE
 
-trans = transformer(transform_symbol=parse_symbol)
-print(trans(tree))
+    if args.profile:
+        return _profile_files(args.files, mode, args.encoding, args.print)
+    results = load_many(args.files, workers=args.workers, mode=mode,
+                        encoding=args.encoding)
+    failed = 0
+    for result in results:
+        if result.error is not None:
+            failed += 1
+            print(f"{result.path}: {type(result.error).__name__}: {result.error}", file=sys.stderr)
+        elif args.print:
+            print(f"{result.path}: {result.tree}")
+    print(f"Parsed {len(results) - failed} of {len(results)} files.", file=sys.stderr)
+    return 1 if failed else 0
 
-date = Date(2023, 8, 10)
-time = Time(0, 4, 34, 1, 0)
-dt = DateTime(date, time)
-print(dt, repr(dt))
+
+def _profile_files(paths: list[str], mode: Mode | None, encoding: str, print_tree: bool) -> int:
+    from .profiling import profile
+
+    failed = 0
+    for path in paths:
+        try:
+            with open(path, encoding=encoding) as file:
+                result = profile(file.read(), mode=mode)
+        except FILE_ERRORS as e:
+            failed += 1
+            print(f"{path}: {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        print(f"{path}:")
+        print(result.report())
+        if print_tree:
+            print(result.tree)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+/* Optional compiled accelerator for the fast engine of `Lexer` (see lexer.py).
+ *
+ * This mirrors `Lexer._fast_next_token()` and the methods it calls, and must give exactly the same tokens and
+ * errors. The Python implementation stays the reference: `Lexer` uses this module automatically when it has been
+ * built, and falls back to pure Python otherwise. Build it in place with:
+ *
+ *     cc -O2 -shared -fPIC $(python3-config --includes) src/pybeech/_speedups.c \
+ *         -o src/pybeech/_speedups$(python3-config --extension-suffix)
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+
+/* Token type codes, which index `_COMPILED_TOKEN_TYPES` in lexer.py. */
+enum {
+    TOKEN_EMPTY,
+    TOKEN_STRING,
+    TOKEN_SYMBOL,
+    TOKEN_LEFT_BRACE,
+    TOKEN_RIGHT_BRACE,
+    TOKEN_LEFT_BRACKET,
+    TOKEN_RIGHT_BRACKET,
+    TOKEN_LEFT_SQUARE_BRACKET,
+    TOKEN_RIGHT_SQUARE_BRACKET,
+};
+
+/* Set by `configure()`: the `LexError` exception and the `_decode_hex()` function from lexer.py. */
+static PyObject *lex_error = NULL;
+static PyObject *decode_hex = NULL;
+
+/* The source being lexed, and the comments found before the current token. */
+typedef struct {
+    PyObject *source;
+    int kind;
+    const void *data;
+    Py_ssize_t length;
+    PyObject *comments; /* NULL until the first comment. */
+} Scanner;
+
+/* A growable buffer of code points, for decoding a string literal. */
+typedef struct {
+    Py_UCS4 *data;
+    Py_ssize_t length;
+    Py_ssize_t capacity;
+} Buffer;
+
+#define CHAR(s, i) PyUnicode_READ((s)->kind, (s)->data, (i))
+
+static int
+starts_with(Scanner *s, Py_ssize_t index, Py_UCS4 first, Py_UCS4 second)
+{
+    return index + 1 < s->length && CHAR(s, index) == first && CHAR(s, index + 1) == second;
+}
+
+static void
+raise_lex_error(const char *message)
+{
+    PyErr_SetString(lex_error, message);
+}
+
+static int
+buffer_reserve(Buffer *buffer, Py_ssize_t extra)
+{
+    if (buffer->length + extra <= buffer->capacity) {
+        return 0;
+    }
+    Py_ssize_t capacity = buffer->capacity ? buffer->capacity : 64;
+    while (capacity < buffer->length + extra) {
+        capacity *= 2;
+    }
+    Py_UCS4 *data = PyMem_Realloc(buffer->data, capacity * sizeof(Py_UCS4));
+    if (data == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    buffer->data = data;
+    buffer->capacity = capacity;
+    return 0;
+}
+
+static int
+buffer_append(Buffer *buffer, Py_UCS4 c)
+{
+    if (buffer_reserve(buffer, 1) < 0) {
+        return -1;
+    }
+    buffer->data[buffer->length++] = c;
+    return 0;
+}
+
+/* Mirror of `Lexer._fast_comment_block()`. Returns the index after the block comment, or -1 on error. */
+static Py_ssize_t
+comment_block(Scanner *s, Py_ssize_t index)
+{
+    Py_ssize_t depth = 1;
+    for (;;) {
+        /* Find the next "}~" or "~{". */
+        while (index + 1 < s->length
+               && !starts_with(s, index, '}', '~') && !starts_with(s, index, '~', '{')) {
+            index++;
+        }
+        if (index + 1 >= s->length) {
+            raise_lex_error("Unterminated block comment.");
+            return -1;
+        }
+        int opens = CHAR(s, index) == '~';
+        index += 2;
+        if (opens) {
+            depth++;
+            continue;
+        }
+        if (--depth == 0) {
+            return index;
+        }
+        index++;
+    }
+}
+
+/* Mirror of `Lexer._fast_comments()`. Returns the index after the comments, or -1 on error. */
+static Py_ssize_t
+comments(Scanner *s, Py_ssize_t index)
+{
+    Py_ssize_t start = index;
+    for (;;) {
+        if (index < s->length && CHAR(s, index) == '#') {
+            while (index < s->length && CHAR(s, index) != '\n') {
+                index++;
+            }
+        }
+        else if (starts_with(s, index, '~', '{')) {
+            index = comment_block(s, index + 2);
+            if (index < 0) {
+                return -1;
+            }
+        }
+        else {
+            break;
+        }
+    }
+    PyObject *text = PyUnicode_Substring(s->source, start, index);
+    if (text == NULL) {
+        return -1;
+    }
+    if (s->comments == NULL && (s->comments = PyList_New(0)) == NULL) {
+        Py_DECREF(text);
+        return -1;
+    }
+    int result = PyList_Append(s->comments, text);
+    Py_DECREF(text);
+    return result < 0 ? -1 : index;
+}
+
+/* Mirror of `Lexer._fast_consume_whitespace()`. Returns the index after the whitespace, or -1 on error.
+ * Sets `*found` if there was any whitespace. */
+static Py_ssize_t
+consume_whitespace(Scanner *s, Py_ssize_t index, int *found)
+{
+    if (index >= s->length || !Py_UNICODE_ISSPACE(CHAR(s, index))) {
+        return index;
+    }
+    *found = 1;
+    for (;;) {
+        while (index < s->length && Py_UNICODE_ISSPACE(CHAR(s, index))) {
+            index++;
+        }
+        /* Comments are only recognised after whitespace. */
+        if ((index < s->length && CHAR(s, index) == '#') || starts_with(s, index, '~', '{')) {
+            index = comments(s, index);
+            if (index < 0) {
+                return -1;
+            }
+        }
+        if (index >= s->length || !Py_UNICODE_ISSPACE(CHAR(s, index))) {
+            return index;
+        }
+    }
+}
+
+/* Mirror of `Lexer._fast_symbol_end()`. */
+static Py_ssize_t
+symbol_end(Scanner *s, Py_ssize_t index)
+{
+    while (index < s->length) {
+        Py_UCS4 c = CHAR(s, index);
+        if (Py_UNICODE_ISSPACE(c) || c == '\'' || c == '"' || c == '{' || c == '}' || c == '(' || c == ')'
+            || c == '[' || c == ']' || c == '#' || (c == '~' && index + 1 < s->length && CHAR(s, index + 1) == '{')
+            || !Py_UNICODE_ISPRINTABLE(c)) {
+            break;
+        }
+        index++;
+    }
+    return index;
+}
+
+static int
+hex_value(Py_UCS4 c)
+{
+    if (c >= '0' && c <= '9') {
+        return c - '0';
+    }
+    if (c >= 'a' && c <= 'f') {
+        return c - 'a' + 10;
+    }
+    if (c >= 'A' && c <= 'F') {
+        return c - 'A' + 10;
+    }
+    return -1;
+}
+
+/* Decode the hex escape sequence whose digits start at `index`, appending it to `buffer`.
+ * Anything other than a valid code point is left to `_decode_hex()`, so that the same error is raised. */
+static int
+hex_escape(Scanner *s, Py_ssize_t index, Py_ssize_t length, Buffer *buffer)
+{
+    Py_UCS4 code = 0;
+    int valid = index + length <= s->length;
+    for (Py_ssize_t i = 0; valid && i < length; i++) {
+        int digit = hex_value(CHAR(s, index + i));
+        valid = digit >= 0;
+        code = code * 16 + digit;
+    }
+    if (valid && code <= 0x10FFFF && !(code >= 0xD800 && code <= 0xDFFF)) {
+        return buffer_append(buffer, code);
+    }
+    PyObject *digits = PyUnicode_Substring(s->source, index, Py_MIN(index + length, s->length));
+    if (digits == NULL) {
+        return -1;
+    }
+    PyObject *decoded = PyObject_CallFunction(decode_hex, "On", digits, length);
+    Py_DECREF(digits);
+    if (decoded == NULL) {
+        return -1;
+    }
+    /* Only reached if `_decode_hex()` accepts something this function doesn't. */
+    Py_ssize_t n = PyUnicode_GET_LENGTH(decoded);
+    int result = buffer_reserve(buffer, n);
+    for (Py_ssize_t i = 0; result == 0 && i < n; i++) {
+        buffer->data[buffer->length++] = PyUnicode_READ_CHAR(decoded, i);
+    }
+    Py_DECREF(decoded);
+    return result;
+}
+
+/* Mirror of `Lexer._fast_string()`, for a string whose opening quote is just before `*index`.
+ * Returns the decoded string and sets `*index` to just after it, or returns NULL on error. */
+static PyObject *
+string(Scanner *s, Py_ssize_t *index_ptr)
+{
+    Py_ssize_t index = *index_ptr;
+    Py_UCS4 opener = CHAR(s, index - 1);
+    Buffer buffer = {NULL, 0, 0};
+    for (;;) {
+        Py_ssize_t segment = index;
+        while (index < s->length) {
+            Py_UCS4 c = CHAR(s, index);
+            if (c == '\\' || c == opener || c == '\n') {
+                break;
+            }
+            if (!Py_UNICODE_ISPRINTABLE(c)) {
+                PyErr_Format(lex_error, "Illegal character in string literal: 0x%x", (unsigned int)c);
+                goto error;
+            }
+            index++;
+        }
+        if (buffer_reserve(&buffer, index - segment) < 0) {
+            goto error;
+        }
+        for (Py_ssize_t i = segment; i < index; i++) {
+            buffer.data[buffer.length++] = CHAR(s, i);
+        }
+        if (index >= s->length) {
+            raise_lex_error("Unterminated string literal.");
+            goto error;
+        }
+        Py_UCS4 c = CHAR(s, index++);
+        if (c == opener) {
+            break; /* End of string. */
+        }
+        if (c == '\\') {
+            Py_UCS4 escape = index < s->length ? CHAR(s, index) : 0;
+            Py_UCS4 simple = 0;
+            Py_ssize_t hex_length = 0;
+            switch (escape) {
+            case '\n':
+                /* Escaped newline: the newline itself is dropped. */
+                index++;
+                break;
+            case '\'': case '"': case '\\': simple = escape; break;
+            case 'n': simple = '\n'; break;
+            case 'r': simple = '\r'; break;
+            case 't': simple = '\t'; break;
+            case 'v': simple = '\v'; break;
+            case 'f': simple = '\f'; break;
+            case 'a': simple = '\a'; break;
+            case 'b': simple = '\b'; break;
+            case 'x': hex_length = 2; break;
+            case 'u': hex_length = 4; break;
+            case 'U': hex_length = 8; break;
+            default:
+                raise_lex_error("Invalid escape sequence.");
+                goto error;
+            }
+            if (simple) {
+                if (buffer_append(&buffer, simple) < 0) {
+                    goto error;
+                }
+                index++;
+                continue;
+            }
+            if (hex_length) {
+                if (hex_escape(s, index + 1, hex_length, &buffer) < 0) {
+                    goto error;
+                }
+                index += 1 + hex_length;
+                continue;
+            }
+        }
+        else if (buffer_append(&buffer, '\n') < 0) {
+            /* Multiline string. */
+            goto error;
+        }
+        int found = 0;
+        index = consume_whitespace(s, index, &found);
+        if (index < 0) {
+            goto error;
+        }
+        if (index >= s->length || (CHAR(s, index) != '"' && CHAR(s, index) != '\'')) {
+            raise_lex_error("Unterminated string literal.");
+            goto error;
+        }
+        opener = CHAR(s, index);
+        index++;
+    }
+    *index_ptr = index;
+    PyObject *result = PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, buffer.data, buffer.length);
+    PyMem_Free(buffer.data);
+    return result;
+
+error:
+    PyMem_Free(buffer.data);
+    return NULL;
+}
+
+PyDoc_STRVAR(next_token_doc,
+"next_token(source, index)\n--\n\n"
+"Lex the next token from `index` with the fast engine.\n\n"
+"`index` must be between 0 and the length of `source` (inclusive), or IndexError is raised.\n"
+"Return a tuple of the token type code, the start and end index, the decoded value of a string\n"
+"(or None), whether there was whitespace before the token and the list of comments before it (or None).");
+
+static PyObject *
+next_token(PyObject *module, PyObject *args)
+{
+    (void)module;
+    PyObject *source;
+    Py_ssize_t index;
+    if (!PyArg_ParseTuple(args, "Un:next_token", &source, &index)) {
+        return NULL;
+    }
+    if (lex_error == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "configure() must be called first");
+        return NULL;
+    }
+    Scanner s = {source, PyUnicode_KIND(source), PyUnicode_DATA(source), PyUnicode_GET_LENGTH(source), NULL};
+    if (index < 0 || index > s.length) {
+        PyErr_Format(PyExc_IndexError, "index %zd out of range for a source of length %zd", index, s.length);
+        return NULL;
+    }
+    int has_whitespace_before = 0;
+    int token_type = TOKEN_EMPTY;
+    PyObject *value = NULL;
+
+    index = consume_whitespace(&s, index, &has_whitespace_before);
+    if (index < 0) {
+        goto error;
+    }
+    Py_ssize_t start = index;
+    if (index < s.length) {
+        Py_UCS4 c = CHAR(&s, index);
+        Py_ssize_t end;
+        if (starts_with(&s, index, '}', '~')) {
+            raise_lex_error("Unmatched '}~'");
+            goto error;
+        }
+        else if (c == '"' || c == '\'') {
+            token_type = TOKEN_STRING;
+            index++;
+            if ((value = string(&s, &index)) == NULL) {
+                goto error;
+            }
+        }
+        else if ((end = symbol_end(&s, index)) > index) {
+            token_type = TOKEN_SYMBOL;
+            index = end;
+        }
+        else {
+            switch (c) {
+            case '{': token_type = TOKEN_LEFT_BRACE; break;
+            case '}': token_type = TOKEN_RIGHT_BRACE; break;
+            case '(': token_type = TOKEN_LEFT_BRACKET; break;
+            case ')': token_type = TOKEN_RIGHT_BRACKET; break;
+            case '[': token_type = TOKEN_LEFT_SQUARE_BRACKET; break;
+            case ']': token_type = TOKEN_RIGHT_SQUARE_BRACKET; break;
+            default: {
+                PyObject *character = PyUnicode_Substring(source, index, index + 1);
+                if (character != NULL) {
+                    PyErr_Format(lex_error, "Invalid character %U", character);
+                    Py_DECREF(character);
+                }
+                goto error;
+            }
+            }
+            index++;
+        }
+    }
+    return Py_BuildValue("(innNNN)", token_type, start, index,
+                         value ? value : Py_NewRef(Py_None),
+                         PyBool_FromLong(has_whitespace_before),
+                         s.comments ? s.comments : Py_NewRef(Py_None));
+
+error:
+    Py_XDECREF(value);
+    Py_XDECREF(s.comments);
+    return NULL;
+}
+
+PyDoc_STRVAR(configure_doc,
+"configure(lex_error, decode_hex)\n--\n\n"
+"Set the exception raised for lexical errors and the function which decodes unusual hex escape sequences.");
+
+static PyObject *
+configure(PyObject *module, PyObject *args)
+{
+    (void)module;
+    PyObject *error, *decode;
+    if (!PyArg_ParseTuple(args, "OO:configure", &error, &decode)) {
+        return NULL;
+    }
+    Py_XSETREF(lex_error, Py_NewRef(error));
+    Py_XSETREF(decode_hex, Py_NewRef(decode));
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"next_token", next_token, METH_VARARGS, next_token_doc},
+    {"configure", configure, METH_VARARGS, configure_doc},
+    {NULL, NULL, 0, NULL},
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "_speedups",
+    "Optional compiled accelerator for the fast engine of `Lexer`.",
+    -1,
+    speedups_methods,
+    NULL,
+    NULL,
+    NULL,
+    NULL,
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    return PyModule_Create(&speedups_module);
+}
@@ -0,0 +1,218 @@
+"""Parse Beech source code from asyncio streams without blocking the event loop."""
+from __future__ import annotations
+
+import asyncio
+import codecs
+import typing
+
+from .beech_types import Key, OrderedTree, Tree
+from .errors import LexError
+from .lexer import DEFAULT_CHUNK_SIZE, Lexer, _BufferedLexer, _speedups
+from .parser import EventType, Parser
+from .transformer import Mode
+
+if typing.TYPE_CHECKING:
+    import concurrent.futures
+
+# Number of tokens to parse between giving control back to the event loop.
+DEFAULT_YIELD_EVERY = 1000
+# Number of tokens to check at a time for being complete in the source read so far.
+_SCAN_AHEAD = 64
+
+# A source of Beech code: a stream, or an async iterator of chunks of text (or of encoded text).
+AsyncSource = typing.Union[asyncio.StreamReader, typing.AsyncIterable[typing.Union[str, bytes]]]
+
+_CONTAINERS: dict[EventType, type] = {
+    EventType.START_TREE: dict,
+    EventType.START_LIST: list,
+    EventType.START_ORDERED_TREE: OrderedTree,
+}
+
+
+async def parse_async(source: AsyncSource, mode: Mode | None = None, encoding: str = "utf-8",
+                      yield_every: int = DEFAULT_YIELD_EVERY, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      executor_threshold: int | None = None,
+                      executor: concurrent.futures.Executor | None = None) -> Tree:
+    """Parse Beech source code as it is read from an asyncio stream, giving control back to the event loop regularly.
+
+    The source is lexed chunk by chunk as it arrives, and only read further when the next token is not complete
+    yet, so that just a bounded window of it is held in memory (as with `Lexer.from_file()`). Between every
+    `yield_every` tokens the parser gives control back to the event loop, so that a large document does not stall
+    other tasks. The result and errors are the same as from `Parser.parse()`.
+
+    Passing `executor_threshold` hands a document longer than that many characters to `executor` (by default, the
+    event loop's default executor) to be parsed in one go instead. Parsing then only starts once the first
+    `executor_threshold` characters (or the whole document, if it is longer) have been read. The mode must be
+    picklable for a process pool executor, so its rules should be module-level functions (as in default mode).
+
+    :param source: stream, or async iterator of chunks of text or encoded text (such as uploaded data)
+    :param mode: (optional) mode to transform the tree with while parsing (see `Parser`)
+    :param encoding: (optional) encoding of a source giving bytes
+    :param yield_every: (optional) number of tokens to parse between giving control back to the event loop
+    :param chunk_size: (optional) number of bytes to read from a stream at a time
+    :param executor_threshold: (optional) length above which a document is parsed in `executor`
+    :param executor: (optional) executor to parse long documents in
+
+    :return: parsed tree
+    """
+    if yield_every < 1:
+        raise ValueError("Number of tokens between yields must be positive.")
+    chunks = _text_chunks(source, encoding, chunk_size).__aiter__()
+    lexer = _FedLexer(chunk_size)
+    if executor_threshold is not None:
+        length = 0
+        head: list[str] = []
+        async for text in chunks:
+            head.append(text)
+            length += len(text)
+            if length > executor_threshold:
+                head += [text async for text in chunks]
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, _parse, "".join(head), mode)
+        # The whole document is short enough to parse here.
+        for text in head:
+            lexer.feed(text)
+        lexer.close()
+    await _feed_until_ready(lexer, chunks, chunk_size)
+    parser = Parser(lexer, mode=mode)
+    # Build the tree from the parse events, which can be interrupted between any two of them.
+    events = parser.events()
+    ready = lexer.ready
+    stack: list[typing.Any] = []
+    keys: list[Key] = []
+    while True:
+        for _ in range(yield_every):
+            # The parser lexes at most one token for each event.
+            if not ready():
+                await _feed_until_ready(lexer, chunks, chunk_size)
+            event_type, value = next(events)
+            if event_type is EventType.KEY:
+                keys.append(typing.cast(Key, value))
+                continue
+            if event_type in _CONTAINERS:
+                stack.append(_CONTAINERS[event_type]())
+                continue
+            if event_type is not EventType.VALUE:
+                value = stack.pop()
+                if not stack:
+                    return typing.cast(Tree, value)
+            container = stack[-1]
+            if type(container) is list:
+                container.append(value)
+            elif type(container) is dict:
+                container[keys.pop()] = value
+            else:
+                container.append(keys.pop(), value)
+        await asyncio.sleep(0)
+
+
+def _parse(source: str, mode: Mode | None) -> Tree:
+    return Parser(source, mode=mode).parse()
+
+
+async def _text_chunks(source: AsyncSource, encoding: str, chunk_size: int) -> typing.AsyncIterator[str]:
+    # Read the source as chunks of text, decoding any bytes.
+    decoder: codecs.IncrementalDecoder | None = None
+    if isinstance(source, asyncio.StreamReader):
+        reader = source
+
+        async def read() -> typing.AsyncIterator[bytes]:
+            while data := await reader.read(chunk_size):
+                yield data
+
+        source = read()
+    async for chunk in source:
+        if isinstance(chunk, str):
+            yield chunk
+            continue
+        if decoder is None:
+            decoder = codecs.getincrementaldecoder(encoding)()
+        yield decoder.decode(chunk)
+    if decoder is not None:
+        yield decoder.decode(b"", final=True)
+
+
+async def _feed_until_ready(lexer: _FedLexer, chunks: typing.AsyncIterator[str], chunk_size: int) -> None:
+    # Read from the source until the lexer can lex its next token.
+    while not lexer.ready():
+        # Read at least as much again as is already waiting, so that a long token is not scanned too often.
+        wanted = max(lexer.unscanned, chunk_size)
+        fed = 0
+        while fed < wanted:
+            try:
+                text = await chunks.__anext__()
+            except StopAsyncIteration:
+                lexer.close()
+                return
+            lexer.feed(text)
+            fed += len(text)
+
+
+class _FedLexer(_BufferedLexer):
+    """Lexer whose source is fed to it as it is read, for `parse_async()`.
+
+    The next token may only be lexed once `ready()` returns True: either the source has been fed in full, or the
+    token was found to end before the end of the source fed so far. Tokens are checked by lexing them ahead of
+    time, a few at a time, so each part of the source is checked only once.
+    """
+    def __init__(self, chunk_size: int) -> None:
+        super().__init__(None, chunk_size, "utf-8", fast=True, intern_symbols=False, compiled=True)
+        self._scanned: int = 0  # Index in the whole source of the end of the last token found complete.
+
+    @property
+    def unscanned(self) -> int:
+        """Number of characters fed which are not yet known to hold a complete token."""
+        return self._offset + len(self._source) - max(self.index, self._scanned)
+
+    def feed(self, text: str) -> None:
+        """Add the text which follows the source fed so far."""
+        self._source += text
+
+    def close(self) -> None:
+        """Mark the end of the source."""
+        self._at_eof = True
+
+    def ready(self) -> bool:
+        """Return whether the next token can be lexed from the source fed so far."""
+        if self._at_eof or self._offset + self._index < self._scanned:
+            return True
+        # Lex a few tokens ahead, restoring the lexer's state afterwards.
+        state = self._index, self._has_whitespace_before, self._preceding_comments
+        index = max(self._index, self._scanned - self._offset)
+        try:
+            for _ in range(_SCAN_AHEAD):
+                try:
+                    end = self._token_end(index)
+                except LexError:
+                    # The token is either invalid or cut off, which `skip_token()` tells apart for a string. Any
+                    # other error is reported once the rest of the source has been fed.
+                    self._index = index
+                    Lexer.skip_token(self)
+                    end = self._index
+                if end >= len(self._source):
+                    break  # The token might continue in the next chunk.
+                index = end
+                self._scanned = self._offset + end
+        except LexError:
+            pass
+        finally:
+            self._index, self._has_whitespace_before, self._preceding_comments = state
+        return self._offset + self._index < self._scanned
+
+    def _token_end(self, index: int) -> int:
+        # Lex the token at `index` (after any whitespace and comments), and return the index of its end.
+        if _speedups is not None:
+            return _speedups.next_token(self._source, index)[2]
+        self._index = index
+        Lexer.next_token(self)
+        return self._index
+
+    def _fill(self) -> None:
+        # Discard the consumed source once it is at least a chunk long, so that it isn't copied too often.
+        if self._index >= self._chunk_size:
+            self._discard()
+
+    def _buffered(self, lex: typing.Callable[[], typing.Any]) -> typing.Any:
+        # The source fed so far holds the whole token (see `ready()`), so it is lexed straight away.
+        self._fill()
+        return lex()
@@ -0,0 +1,165 @@
+"""Load many Beech files at once, or one large Beech document in chunks, in parallel worker processes."""
+from __future__ import annotations
+
+import itertools
+import os
+import typing
+
+from .beech_types import Tree
+from .errors import LexError, ParseError
+from .lexer import Lexer, TokenType
+from .parser import Parser
+from .transformer import Mode
+
+PathLike = typing.Union[str, "os.PathLike[str]"]
+
+# Smallest chunk of a document worth sending to a worker process (see `parse_parallel()`).
+DEFAULT_MIN_CHUNK_SIZE = 1 << 20
+
+_CLOSERS = {
+    TokenType.LEFT_BRACE: TokenType.RIGHT_BRACE,
+    TokenType.LEFT_BRACKET: TokenType.RIGHT_BRACKET,
+    TokenType.LEFT_SQUARE_BRACKET: TokenType.RIGHT_SQUARE_BRACKET,
+}
+
+# Errors which are reported for a file rather than aborting the whole batch.
+FILE_ERRORS = (LexError, ParseError, OSError, UnicodeDecodeError)
+
+
+class LoadResult(typing.NamedTuple):
+    """The result of loading one file: either its tree or the error raised while loading it."""
+    path: PathLike
+    tree: Tree | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load(path: PathLike, mode: Mode | None = None, encoding: str = "utf-8") -> Tree:
+    """Parse a Beech file.
+
+    :param path: path to the file
+    :param mode: (optional) mode to transform the tree with while parsing (see `Parser`)
+    :param encoding: (optional) encoding of the file
+
+    :return: parsed tree
+    """
+    with open(path, encoding=encoding) as file:
+        source = file.read()
+    return Parser(source, mode=mode).parse()
+
+
+def load_many(paths: typing.Iterable[PathLike], workers: int | None = None, mode: Mode | None = None,
+              encoding: str = "utf-8", chunksize: int = 8) -> list[LoadResult]:
+    """Parse many Beech files, spreading them over a pool of worker processes.
+
+    An error in one file is recorded in its result instead of stopping the others. The mode must be picklable,
+    so its rules should be module-level functions (as in default mode).
+
+    :param paths: paths to the files
+    :param workers: (optional) number of worker processes, defaulting to the number of CPUs; with a single worker,
+      the files are parsed in this process
+    :param mode: (optional) mode to transform the trees with while parsing (see `Parser`)
+    :param encoding: (optional) encoding of the files
+    :param chunksize: (optional) number of files to send to a worker at a time
+
+    :return: result for each file, in the same order as `paths`
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(paths))
+    if workers <= 1:
+        return [_load_result(path, mode, encoding) for path in paths]
+    import concurrent.futures  # Only imported once it is needed, since it is slow to import.
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_load_result, paths, itertools.repeat(mode), itertools.repeat(encoding),
+                                 chunksize=chunksize))
+
+
+def _load_result(path: PathLike, mode: Mode | None, encoding: str) -> LoadResult:
+    try:
+        return LoadResult(path, tree=load(path, mode, encoding))
+    except FILE_ERRORS as e:
+        return LoadResult(path, error=e)
+
+
+def parse_parallel(source: str, workers: int | None = None, mode: Mode | None = None,
+                   min_chunk_size: int = DEFAULT_MIN_CHUNK_SIZE) -> Tree:
+    """Parse a large Beech document by splitting its top-level tree into chunks and parsing them in parallel.
+
+    The source is first scanned for the boundaries between top-level key-value pairs, skipping over nested values,
+    strings and comments without building them. The chunks are parsed in worker processes and merged in order,
+    checking for duplicate keys across chunks. The result and errors are the same as from `Parser.parse()`: if
+    any chunk fails, the whole source is parsed again in this process to report the error.
+
+    :param source: source code
+    :param workers: (optional) number of worker processes, defaulting to the number of CPUs
+    :param mode: (optional) mode to transform the tree with while parsing (see `Parser`); it must be picklable
+    :param min_chunk_size: (optional) smallest number of characters to give to each worker
+
+    :return: parsed tree
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _split_top_level(source, min(workers, len(source) // max(min_chunk_size, 1)))
+    if len(chunks) <= 1:
+        return Parser(source, mode=mode).parse()
+    import concurrent.futures
+    tree: Tree = {}
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            for chunk_tree in executor.map(_parse_chunk, chunks, itertools.repeat(mode)):
+                if not tree.keys().isdisjoint(chunk_tree):
+                    raise ParseError("Keys in a tree must be unique.")
+                tree.update(chunk_tree)
+    except (LexError, ParseError):
+        # Parse the whole source to report the first error, with its position in the whole source.
+        return Parser(source, mode=mode).parse()
+    return tree
+
+
+def _parse_chunk(source: str, mode: Mode | None) -> Tree:
+    return Parser(source, mode=mode).parse()
+
+
+def _split_top_level(source: str, count: int) -> list[str]:
+    # Split the source into about `count` chunks of similar size, each holding whole top-level key-value pairs.
+    # Where the scan finds something unexpected, the rest of the source is left in the last chunk, so that the
+    # parser reports it.
+    lexer = Lexer(source)
+    targets = [len(source) * i // count for i in range(count - 1, 0, -1)]  # In reverse, to pop from the end.
+    boundaries = [0]
+    try:
+        while targets:
+            if lexer.skip_token() not in (TokenType.SYMBOL, TokenType.STRING) or not _skip_value(lexer):
+                break
+            index = lexer.index
+            # The parser needs whitespace between pairs, which a chunk boundary would hide.
+            if index >= targets[-1] and source[index:index + 1].isspace():
+                boundaries.append(index)
+                while targets and targets[-1] <= index:
+                    targets.pop()
+    except LexError:
+        pass
+    boundaries.append(len(source))
+    return [source[start:end] for start, end in zip(boundaries, boundaries[1:])]
+
+
+def _skip_value(lexer: Lexer) -> bool:
+    # Skip the value at the lexer's position, returning False if it is not a valid value.
+    token_type = lexer.skip_token()
+    if token_type is TokenType.SYMBOL or token_type is TokenType.STRING:
+        return True
+    if token_type not in _CLOSERS:
+        return False
+    closers = [_CLOSERS[token_type]]
+    while closers:
+        token_type = lexer.skip_to_bracket()
+        if token_type in _CLOSERS:
+            closers.append(_CLOSERS[token_type])
+        elif token_type is not closers.pop():
+            return False
+    return True
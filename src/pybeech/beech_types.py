@@ -5,6 +5,8 @@ import typing
 
 
 class Symbol:
+    __slots__ = ("_value",)
+
     def __init__(self, value: str) -> None:
         self._value = value
 
@@ -16,6 +18,12 @@ class Symbol:
         # Wrap in an extra call to `str` in case a subclass changes the value type
         return str(self._value)
 
+    def __eq__(self, other: object) -> bool:
+        # Symbols are equal by value, consistently with `__hash__`. They are never equal to strings.
+        if not isinstance(other, Symbol):
+            return NotImplemented
+        return self._value == other._value
+
     def __hash__(self) -> int:
         return hash(self._value)
 
@@ -23,7 +31,109 @@ class Symbol:
         return Symbol(self._value[item])
 
 
+class OrderedTree:
+    """An ordered tree: a sequence of key-value pairs in which a key may appear more than once.
+
+    The keys and values are kept in two parallel lists, so iterating over the pairs in order is cheap and each pair
+    takes up two list slots rather than an object of its own. Looking up every value of a key takes O(1) time
+    (plus the number of values found) using an index from each key to its positions, which is only built the first
+    time a key is looked up and is then kept up to date as pairs are appended.
+
+    Iterating over an ordered tree gives its keys in order, repeated keys included (like iterating over a dict).
+    """
+    __slots__ = ("_keys", "_values", "_index")
+
+    def __init__(self, pairs: typing.Iterable[tuple[Key, Value]] = ()) -> None:
+        self._keys: list[Key] = []
+        self._values: list[Value] = []
+        self._index: dict[Key, list[int]] | None = None
+        for key, value in pairs:
+            self._keys.append(key)
+            self._values.append(value)
+
+    @classmethod
+    def from_lists(cls, keys: list[Key], values: list[Value]) -> OrderedTree:
+        """Return an ordered tree of the given parallel lists of keys and values, which it takes over without copying.
+
+        :raises ValueError: if the lists are not the same length
+        """
+        if len(keys) != len(values):
+            raise ValueError(f"Got {len(keys)} keys but {len(values)} values.")
+        tree = cls()
+        tree._keys = keys
+        tree._values = values
+        return tree
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> typing.Iterator[Key]:
+        return iter(self._keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._key_index()
+
+    def __getitem__(self, key: Key) -> Value:
+        """Return the first value of `key`."""
+        return self._values[self._key_index()[key][0]]
+
+    def __eq__(self, other: object) -> bool:
+        # Ordered trees are equal if they have the same pairs in the same order. They are never equal to dicts.
+        if not isinstance(other, OrderedTree):
+            return NotImplemented
+        return self._keys == other._keys and self._values == other._values
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self.items())!r})"
+
+    def get(self, key: Key, default: Value | None = None) -> Value | None:
+        """Return the first value of `key`, or `default` if it has none."""
+        positions = self._key_index().get(key)
+        return default if positions is None else self._values[positions[0]]
+
+    def get_all(self, key: Key) -> list[Value]:
+        """Return every value of `key`, in order (an empty list if it has none)."""
+        values = self._values
+        return [values[i] for i in self._key_index().get(key, ())]
+
+    def keys(self) -> typing.Iterator[Key]:
+        return iter(self._keys)
+
+    def values(self) -> typing.Iterator[Value]:
+        return iter(self._values)
+
+    def items(self) -> typing.Iterator[tuple[Key, Value]]:
+        return zip(self._keys, self._values)
+
+    def append(self, key: Key, value: Value) -> None:
+        """Add a pair to the end of the tree."""
+        if self._index is not None:
+            self._index.setdefault(key, []).append(len(self._keys))
+        self._keys.append(key)
+        self._values.append(value)
+
+    def clear(self) -> None:
+        """Remove every pair from the tree."""
+        self._keys = []
+        self._values = []
+        self._index = None
+
+    def _key_index(self) -> dict[Key, list[int]]:
+        if self._index is None:
+            index: dict[Key, list[int]] = {}
+            for i, key in enumerate(self._keys):
+                positions = index.get(key)
+                if positions is None:
+                    index[key] = [i]
+                else:
+                    positions.append(i)
+            self._index = index
+        return self._index
+
+
 Key = typing.Union[str, Symbol]
-Value = typing.Union[Key, 'Tree', 'List']
+Value = typing.Union[Key, 'Tree', 'List', OrderedTree]
 Tree = dict[Key, Value]
 List = list[Value]
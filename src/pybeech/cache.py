@@ -0,0 +1,310 @@
+"""Cache parsed Beech trees on disk, keyed by a hash of their source."""
+from __future__ import annotations
+
+import hashlib
+import marshal
+import mmap
+import os
+import sys
+import typing
+
+from .beech_types import OrderedTree, Symbol, Tree, Value
+from .default_mode.extension_types import Date, Time, DateTime
+from .default_mode.symbol_parser import TextSymbol, NumberSymbol, DateSymbol, TimeSymbol, DateTimeSymbol
+from .parser import Parser
+from .transformer import Mode
+
+PathLike = typing.Union[str, "os.PathLike[str]"]
+
+# Version of the parser output and of the cache format. Bump this whenever either changes.
+CACHE_VERSION = 2
+DEFAULT_MAX_SIZE = 256 << 20
+
+_MAGIC = b"BEECH-CACHE\0"
+_HEADER = _MAGIC + CACHE_VERSION.to_bytes(2, "big")
+_SUFFIX = ".beechc"
+
+# In the binary format, a tree is stored as a dict, a list as a list and a number symbol as an int (see `_Encoder`
+# for strings and symbols). Every other value is stored as a tuple starting with one of these codes.
+# An ordered tree is stored as its code followed by a list of its keys and a list of its values.
+_SYMBOL, _TEXT, _DATE_SYMBOL, _TIME_SYMBOL, _DATE_TIME_SYMBOL, _DATE, _TIME, _DATE_TIME, _ORDERED_TREE = range(9)
+_TEXT_SYMBOL_CODES: dict[type[Symbol], int] = {Symbol: _SYMBOL, TextSymbol: _TEXT}
+_TEXT_SYMBOL_TYPES = {code: symbol_type for symbol_type, code in _TEXT_SYMBOL_CODES.items()}
+
+
+class CacheError(Exception):
+    """Exception raised when a tree cannot be stored in the cache format."""
+
+
+def encode_tree(tree: Tree) -> bytes:
+    """Serialize a tree into the compact binary format used by the cache.
+
+    Trees, ordered trees, lists, strings, symbols, the default mode symbol types and `Date`, `Time` and `DateTime`
+    are supported. Equal strings and symbol texts are stored once and referred back to.
+
+    :raises CacheError: if the tree holds any other type of value, or is nested too deeply
+    """
+    encoder = _Encoder()
+    try:
+        data = encoder.encode(tree)
+        text_code = _TEXT_SYMBOL_CODES[encoder.text_type or Symbol]
+        return _HEADER + marshal.dumps((text_code, data))
+    except (ValueError, RecursionError) as e:
+        raise CacheError(f"Cannot encode tree: {e}") from e
+
+
+def decode_tree(data: bytes | memoryview) -> Tree:
+    """Deserialize a tree from the binary format written by `encode_tree()`.
+
+    :raises CacheError: if the data is not in the expected format
+    """
+    if data[:len(_HEADER)] != _HEADER:
+        raise CacheError("Not a Beech cache file, or from another version.")
+    # Note: the view must be released before a memory-mapped file can be closed.
+    with memoryview(data) as view, view[len(_HEADER):] as body:
+        try:
+            text_code, data = marshal.loads(body)
+            return _decode(data, _TEXT_SYMBOL_TYPES[text_code])
+        except (ValueError, EOFError, TypeError, KeyError, IndexError) as e:
+            raise CacheError(f"Corrupt Beech cache data: {e}") from e
+
+
+class ParseCache:
+    """A cache of parsed trees in a directory, keyed by a hash of the source, the mode and the cache version.
+
+    The cache is bounded: once its files take up more than `max_size` bytes, the least recently used are removed.
+    Passing `use_mmap=True` reads cached trees through a memory-mapped file instead of reading them into memory
+    first. Trees which cannot be encoded (see `encode_tree()`) are parsed as usual but not cached.
+    """
+    def __init__(self, directory: PathLike, max_size: int = DEFAULT_MAX_SIZE, use_mmap: bool = False) -> None:
+        self._directory = os.fspath(directory)
+        self._max_size = max_size
+        self._use_mmap = use_mmap
+        self.hits: int = 0
+        self.misses: int = 0
+        os.makedirs(self._directory, exist_ok=True)
+
+    def parse(self, source: str, mode: Mode | None = None) -> Tree:
+        """Return the tree parsed from `source` (see `Parser`), from the cache if possible.
+
+        Trees parsed in a mode with a rule which is not a module-level function (such as a lambda or a closure) are
+        never cached, as such a rule cannot be told apart from another with the same name.
+        """
+        mode_id = _mode_id(mode)
+        if mode_id is None:
+            return Parser(source, mode=mode).parse()
+        path = self._path(source, mode_id)
+        tree = self._read(path)
+        if tree is not None:
+            self.hits += 1
+            return tree
+        self.misses += 1
+        tree = Parser(source, mode=mode).parse()
+        try:
+            data = encode_tree(tree)
+        except CacheError:
+            return tree
+        self._write(path, data)
+        return tree
+
+    def load(self, path: PathLike, mode: Mode | None = None, encoding: str = "utf-8") -> Tree:
+        """Return the tree parsed from a Beech file, from the cache if possible."""
+        with open(path, encoding=encoding) as file:
+            return self.parse(file.read(), mode)
+
+    def clear(self) -> None:
+        """Remove every cached tree."""
+        for entry in self._entries():
+            _remove(entry.path)
+
+    def _path(self, source: str, mode_id: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{CACHE_VERSION} {sys.implementation.cache_tag} {marshal.version} {mode_id}\0".encode())
+        digest.update(source.encode("utf-8", "surrogatepass"))
+        return os.path.join(self._directory, digest.hexdigest() + _SUFFIX)
+
+    def _read(self, path: str) -> Tree | None:
+        try:
+            with open(path, "rb") as file:
+                if self._use_mmap:
+                    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        tree = decode_tree(mapped)
+                else:
+                    tree = decode_tree(file.read())
+            os.utime(path)  # Mark as recently used.
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, CacheError):
+            # Note: `mmap` raises ValueError for an empty file, as left by an interrupted write.
+            _remove(path)
+            return None
+        return tree
+
+    def _write(self, path: str, data: bytes) -> None:
+        if len(data) > self._max_size:
+            return
+        # Write to a temporary file first, so that a concurrent reader never sees a partial file.
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            _remove(temp_path)
+            return
+        self._evict()
+
+    def _entries(self) -> list[os.DirEntry[str]]:
+        with os.scandir(self._directory) as entries:
+            return [entry for entry in entries if entry.name.endswith(_SUFFIX)]
+
+    def _evict(self) -> None:
+        # Remove the least recently used files until the cache fits in its maximum size.
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self._max_size:
+                break
+            _remove(path)
+            total -= size
+
+
+def _mode_id(mode: Mode | None) -> str | None:
+    # Identify a mode by the names of its rules, so that trees parsed in different modes are cached separately.
+    # Return None if a rule cannot be found again by its name, as two such rules (say two lambdas) may share it.
+    if mode is None:
+        return "-"
+    names = []
+    for rule in mode:
+        if rule is None:
+            names.append("-")
+            continue
+        module = sys.modules.get(getattr(rule, "__module__", None) or "")
+        qualname = getattr(rule, "__qualname__", None)
+        if module is None or qualname is None or _find(module, qualname) is not rule:
+            return None
+        names.append(f"{rule.__module__}.{qualname}")
+    return " ".join(names)
+
+
+def _find(owner: typing.Any, qualname: str) -> typing.Any:
+    # Look up a dotted qualified name from a module, returning None if any part of it is missing.
+    for name in qualname.split("."):
+        owner = getattr(owner, name, None)
+        if owner is None:
+            return None
+    return owner
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _Encoder:
+    """Converter from a tree into values which `marshal` can store.
+
+    Symbols are by far the most common values, so the first kind of textual symbol found (`Symbol` or `TextSymbol`)
+    is stored as a bare `str`, and strings are stored as UTF-8 `bytes`. Equal texts are replaced with one shared
+    object, which `marshal` then stores only once.
+    """
+    def __init__(self) -> None:
+        self.text_type: type[Symbol] | None = None
+        self._strings: dict[str, str] = {}
+
+    def encode(self, value: Value) -> typing.Any:
+        value_type = type(value)
+        if value_type is Symbol or value_type is TextSymbol:
+            if self.text_type is None:
+                self.text_type = value_type
+            text = str(value)
+            text = self._strings.setdefault(text, text)
+            return text if value_type is self.text_type else (_TEXT_SYMBOL_CODES[value_type], text)
+        if value_type is str:
+            return value.encode("utf-8", "surrogatepass")
+        if value_type is dict:
+            return {self.encode(k): self.encode(v) for k, v in value.items()}
+        if value_type is list:
+            return [self.encode(v) for v in value]
+        if value_type is OrderedTree:
+            return _ORDERED_TREE, [self.encode(k) for k in value], [self.encode(v) for v in value.values()]
+        if value_type is NumberSymbol:
+            return value.value
+        if value_type is DateSymbol or value_type is Date:
+            date = value.value if value_type is DateSymbol else value
+            return _DATE_SYMBOL if value_type is DateSymbol else _DATE, _pack_date(date)
+        if value_type is TimeSymbol or value_type is Time:
+            time = value.value if value_type is TimeSymbol else value
+            return _TIME_SYMBOL if value_type is TimeSymbol else _TIME, *_pack_time(time)
+        if value_type is DateTimeSymbol or value_type is DateTime:
+            date_time = value.value if value_type is DateTimeSymbol else value
+            return (_DATE_TIME_SYMBOL if value_type is DateTimeSymbol else _DATE_TIME,
+                    _pack_date(date_time.date), *_pack_time(date_time.time))
+        raise CacheError(f"Cannot encode value of type {value_type}")
+
+
+def _decode(value: typing.Any, text_type: type[Symbol]) -> typing.Any:
+    value_type = type(value)
+    if value_type is str:
+        return text_type(value)
+    if value_type is bytes:
+        return value.decode("utf-8", "surrogatepass")
+    if value_type is int:
+        return NumberSymbol(value)
+    if value_type is dict:
+        return {_decode(k, text_type): _decode(v, text_type) for k, v in value.items()}
+    if value_type is list:
+        return [_decode(v, text_type) for v in value]
+    code = value[0]
+    if code == _ORDERED_TREE:
+        return OrderedTree.from_lists([_decode(k, text_type) for k in value[1]],
+                                      [_decode(v, text_type) for v in value[2]])
+    if code == _SYMBOL:
+        return Symbol(value[1])
+    if code == _TEXT:
+        return TextSymbol(value[1])
+    if code == _DATE_SYMBOL:
+        return DateSymbol(*_unpack_date(value[1]))
+    if code == _TIME_SYMBOL:
+        return TimeSymbol(*_unpack_time(value[1:]))
+    if code == _DATE_TIME_SYMBOL:
+        return DateTimeSymbol(Date(*_unpack_date(value[1])), Time(*_unpack_time(value[2:])))
+    if code == _DATE:
+        return Date(*_unpack_date(value[1]))
+    if code == _TIME:
+        return Time(*_unpack_time(value[1:]))
+    if code == _DATE_TIME:
+        return DateTime(Date(*_unpack_date(value[1])), Time(*_unpack_time(value[2:])))
+    raise ValueError(f"Unknown value code {code}")
+
+
+# Dates and times are packed into decimal integers (such as 20230810 for 2023-08-10), which `marshal` stores
+# in a few bytes. A time's timezone offset follows it only if it has one.
+
+def _pack_date(date: Date) -> int:
+    return (date.year * 100 + date.month) * 100 + date.day
+
+
+def _unpack_date(packed: int) -> tuple[int, int, int]:
+    year_month, day = divmod(packed, 100)
+    return *divmod(year_month, 100), day
+
+
+def _pack_time(time: Time) -> tuple[int, ...]:
+    packed = (time.hour * 100 + time.minute) * 100 + time.second
+    return (packed,) if time.tz_hour is None else (packed, time.tz_hour, time.tz_minute)
+
+
+def _unpack_time(packed: tuple[int, ...]) -> tuple[int, ...]:
+    hour_minute, second = divmod(packed[0], 100)
+    return *divmod(hour_minute, 100), second, *packed[1:]
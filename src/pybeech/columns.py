@@ -0,0 +1,371 @@
+"""Extract long lists from Beech source code straight into columns of machine values."""
+from __future__ import annotations
+
+import array
+import collections.abc
+import datetime
+import typing
+
+from .default_mode.extension_types import Date, DateTime, Time
+from .default_mode.symbol_parser import DateSymbol, DateTimeSymbol, NumberSymbol, _patterns, classify, parse_number
+from .errors import LexError, SchemaError
+from .lexer import _COMPILED_TOKEN_TYPES, Lexer, TokenType, _speedups
+from .parser import Path
+from .schema import _Decoder, _describe
+
+# The array type code for the data of each kind of column (see `Column`).
+_TYPECODES = {
+    "number": "q",
+    "date": "q",
+    "date-time": "q",
+    "text": "i",
+}
+# The NumPy type of the data of each kind of column but text, which `Column.to_numpy()` views it as.
+_NUMPY_TYPES = {
+    "number": "int64",
+    "date": "datetime64[D]",
+    "date-time": "datetime64[s]",
+}
+# The kind of column inferred from the first item of a list, by the default mode type of a symbol.
+_INFERRED_KINDS: dict[type, str] = {
+    NumberSymbol: "number",
+    DateSymbol: "date",
+    DateTimeSymbol: "date-time",
+}
+_DESCRIPTIONS = {
+    "number": "a number",
+    "date": "a date",
+    "date-time": "a date and time",
+    "text": "a symbol or string",
+}
+
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+_SECONDS_PER_DAY = 24 * 60 * 60
+
+# A token as lexed by `_token_reader()`: its type, index in the source, value and whether whitespace precedes it.
+_RawToken = tuple[TokenType, int, str, bool]
+
+
+class Column(collections.abc.Sequence):
+    """A column of values of a single kind, held in an `array.array` rather than as Python objects.
+
+    The values are held in `data`, which also gives a `memoryview()` of them without copying, as:
+
+    - "number": 64-bit integers
+    - "date": 64-bit days since 1970-01-01
+    - "date-time": 64-bit seconds since 1970-01-01T00:00:00Z (a date-time without a time zone is taken as UTC)
+    - "text": indices into `values`, a list which holds each distinct symbol or string once
+
+    Indexing a column gives its values as an `int`, `Date`, `DateTime` (in UTC) or `str`.
+    """
+    __slots__ = ("kind", "data", "values")
+
+    def __init__(self, kind: str) -> None:
+        if kind not in _TYPECODES:
+            raise ValueError(f"Unknown kind of column: {kind!r}")
+        self.kind = kind
+        self.data = array.array(_TYPECODES[kind])
+        self.values: list[str] | None = [] if kind == "text" else None
+
+    @typing.overload
+    def __getitem__(self, index: int) -> typing.Any: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> list[typing.Any]: ...
+
+    def __getitem__(self, index: int | slice) -> typing.Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.data)))]
+        item = self.data[index]
+        if self.kind == "number":
+            return item
+        if self.kind == "text":
+            return typing.cast(list[str], self.values)[item]
+        days, seconds = divmod(item, _SECONDS_PER_DAY) if self.kind == "date-time" else (item, 0)
+        date = datetime.date.fromordinal(days + _EPOCH)
+        if self.kind == "date":
+            return Date(date.year, date.month, date.day)
+        return DateTime(Date(date.year, date.month, date.day),
+                        Time(seconds // 3600, seconds // 60 % 60, seconds % 60, 0, 0))
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.kind!r}, {list(self)!r})"
+
+    def to_numpy(self) -> typing.Any:
+        """Return the column as a NumPy array, which is a view of `data` for any kind of column but text.
+
+        A text column is returned as an array of objects, which is a copy. The data of a column must not be
+        extended while a view of it is in use.
+
+        :raises ImportError: if NumPy is not installed
+        """
+        import numpy
+
+        if self.kind == "text":
+            return numpy.array(self.values, dtype=object)[numpy.frombuffer(self.data, dtype=numpy.int32)]
+        return numpy.frombuffer(self.data, dtype=numpy.int64).view(_NUMPY_TYPES[self.kind])
+
+
+def extract_column(source: str | Lexer, path: Path, kind: str | None = None) -> Column:
+    """Extract a list of symbols or strings of the same kind from Beech source code into a column.
+
+    The list at `path` (found as by `parser.query()`) is converted as it is lexed, item by item, without building a
+    token or symbol for each one. Parsing stops at the end of the list.
+
+    :param source: source code, or a lexer over it
+    :param path: keys leading to the list, either separated by "/" or as a tuple
+    :param kind: (optional) kind of column (see `Column`), by default inferred from the first item in default mode
+      (a number, date or date-time, or else text)
+
+    Numbers must fit in 64 bits, and dates must be real days from year 1 to 9999 (as for `datetime.date`), although
+    default mode accepts any day from 1 to 31 of any month and year 0. Any other item raises a `SchemaError` with its
+    path, saying that it is out of the range of a column.
+
+    :return: column of the items in the list
+
+    :raises KeyError: if there is no value at `path`
+    :raises SchemaError: if the value at `path` is not a list, or an item is not of the kind of the column or is out
+      of its range
+    """
+    extractor = _Extractor(source, path)
+    read = extractor.read_list()
+    token = read()
+    column = Column(kind or _infer_kind(token))
+    add = extractor.adder(column)
+    count = 0
+    while token[0] is not TokenType.RIGHT_BRACKET:
+        if token[0] is TokenType.EMPTY or (count and not token[3]):
+            extractor.check_item(token, count == 0)
+        add(token, count)
+        count += 1
+        token = read()
+    return column
+
+
+def extract_table(source: str | Lexer, path: Path, kinds: dict[str, str] | None = None) -> dict[str, Column]:
+    """Extract a list of trees with the same keys from Beech source code into a column for each key.
+
+    Every tree in the list at `path` must have the keys of the first one, with a symbol or string as the value of
+    each. Their values are converted as they are lexed, as by `extract_column()`.
+
+    :param source: source code, or a lexer over it
+    :param path: keys leading to the list, either separated by "/" or as a tuple
+    :param kinds: (optional) kind of column for some or all of the keys, which are otherwise inferred from the value
+      in the first tree
+
+    :return: dictionary mapping the text of each key to its column, in the order of the first tree
+
+    :raises KeyError: if there is no value at `path`
+    :raises SchemaError: if the value at `path` is not a list of trees, a tree has different keys from the first, or
+      a value is not of the kind of its column or is out of its range
+    """
+    kinds = kinds or {}
+    extractor = _Extractor(source, path)
+    read = extractor.read_list()
+    columns: dict[str, Column] = {}
+    adders: dict[str, typing.Callable[[_RawToken, int, str | None], None]] = {}
+    row = 0
+    while True:
+        token = read()
+        if token[0] is TokenType.RIGHT_BRACKET:
+            break
+        extractor.check_item(token, row == 0)
+        if token[0] is not TokenType.LEFT_BRACE:
+            raise extractor.mismatch("a tree", token, (row,))
+        filled = 0
+        while True:
+            token_type, start, key, whitespace = read()
+            if token_type is TokenType.RIGHT_BRACE:
+                break
+            if token_type is not TokenType.SYMBOL and token_type is not TokenType.STRING:
+                raise extractor._error(f"Expected {TokenType.RIGHT_BRACE} but got {token_type}", start)
+            if filled and not whitespace:
+                raise extractor._error(f"Expect whitespace before {token_type}", start)
+            value = read()
+            if not value[3]:
+                raise extractor._error(f"Expect whitespace before {value[0]}", value[1])
+            column = columns.get(key)
+            if column is None:
+                if row:
+                    raise extractor._schema_error(f"Key {key!r} is not in the first tree", start,
+                                                  (*extractor.path, row, key))
+                column = columns[key] = Column(kinds.get(key) or _infer_kind(value))
+                adders[key] = extractor.adder(column)
+            elif len(column) > row:
+                raise extractor._error("Keys in a tree must be unique.", start)
+            adders[key](value, row, key)
+            filled += 1
+        if filled < len(columns):
+            missing = next(key for key, column in columns.items() if len(column) == row)
+            raise extractor._schema_error(f"Missing key {missing!r}", start, (*extractor.path, row))
+        row += 1
+    return columns
+
+
+class _Extractor(_Decoder):
+    """Parser which finds a list and then lexes its items as plain tuples (see `extract_column()`)."""
+    def __init__(self, source: str | Lexer, path: Path) -> None:
+        super().__init__(source)
+        self.path = tuple(path.split("/") if isinstance(path, str) else path)
+
+    def read_list(self) -> typing.Callable[[], _RawToken]:
+        """Find the list at `path`, and return a function which lexes each token after its opening bracket.
+
+        :raises KeyError: if there is no value at `path`
+        """
+        if not self._seek():
+            raise KeyError(self.path)
+        token = self._current_token
+        if token.type is not TokenType.LEFT_BRACKET:
+            raise self._schema_error(f"Expected a list but got {_describe(token.type, token.value)}", path=self.path)
+        return _token_reader(self._lexer)
+
+    def check_item(self, token: _RawToken, first: bool) -> None:
+        """Check that an item of a list is not the end of the source, and is separated from the one before it.
+
+        The caller may skip this for an item it has checked for both already, as it would always succeed.
+        """
+        token_type, start, _, whitespace = token
+        if token_type is TokenType.EMPTY:
+            raise self._error(f"Expected {TokenType.RIGHT_BRACKET} but got {token_type}", start)
+        if not first and not whitespace:
+            raise self._error(f"Expect whitespace before {token_type}", start)
+
+    def adder(self, column: Column) -> typing.Callable[[_RawToken, int, str | None], None]:
+        """Return a function which converts a token and adds it to `column`, or else raises a `SchemaError`.
+
+        The function is passed the token, and the index in the list and key (for a table) at which it was found.
+        """
+        convert = _converter(column)
+        append = column.data.append
+        strings = column.kind == "text"
+        description = _DESCRIPTIONS[column.kind]
+        name = column.kind.capitalize()
+
+        def add(token: _RawToken, index: int, key: str | None = None) -> None:
+            token_type, start, text, _ = token
+            if token_type is TokenType.SYMBOL or (strings and token_type is TokenType.STRING):
+                try:
+                    value = convert(text)
+                    if value is not None:
+                        return append(value)
+                except OverflowError:
+                    raise self._schema_error(f"{name} {text} is out of the range of a column", start,
+                                             (*self.path, *_item_path(index, key))) from None
+            raise self.mismatch(description, token, _item_path(index, key))
+
+        return add
+
+    def mismatch(self, description: str, token: _RawToken, path: tuple[str | int, ...]) -> SchemaError:
+        """Return an error for a token in the list which is not of the type described."""
+        token_type, start, text, _ = token
+        return self._schema_error(f"Expected {description} but got {_describe(token_type, text)}", start,
+                                  (*self.path, *path))
+
+    def _seek(self) -> bool:
+        # Move to the value at `path` in the top-level tree, returning whether it was found.
+        for depth, key in enumerate(self.path):
+            while True:
+                token = self._current_token
+                if token.type is not TokenType.SYMBOL and token.type is not TokenType.STRING:
+                    return False  # End of tree.
+                self._advance()
+                self._expect_whitespace()
+                if token.value == key:
+                    break  # The first occurrence of a key is used, as by `query()`.
+                self._skip_value()
+                if self._check_any(TokenType.SYMBOL, TokenType.STRING):
+                    self._expect_whitespace()
+            if depth < len(self.path) - 1 and not self._match_any(TokenType.LEFT_BRACE,
+                                                                  TokenType.LEFT_SQUARE_BRACKET):
+                return False
+        return True
+
+
+def _token_reader(lexer: Lexer) -> typing.Callable[[], _RawToken]:
+    # Return a function which lexes the next token as a tuple, calling the compiled accelerator directly if it is
+    # used, since building a `Token` for each one would take most of the time.
+    if type(lexer) is not Lexer or not lexer._fast or not lexer._compiled or _speedups is None:
+        def read_token() -> _RawToken:
+            token = lexer.next_token()
+            return token.type, token.start_index, token.value, token.has_whitespace_before
+
+        return read_token
+
+    next_token = _speedups.next_token
+    source = lexer._source
+    index = lexer._index
+
+    def read() -> _RawToken:
+        nonlocal index
+        try:
+            code, start, index, value, whitespace, _ = next_token(source, index)
+        except LexError as e:
+            raise lexer._locate(e, index) from None
+        return _COMPILED_TOKEN_TYPES[code], start, source[start:index] if value is None else value, whitespace
+
+    return read
+
+
+def _item_path(index: int, key: str | None) -> tuple[str | int, ...]:
+    return (index,) if key is None else (index, key)
+
+
+def _infer_kind(token: _RawToken) -> str:
+    # Note: the kind of an empty list doesn't matter, and other tokens are reported by `_Extractor.adder()`.
+    if token[0] is not TokenType.SYMBOL:
+        return "text"
+    return _INFERRED_KINDS.get(type(classify(token[2])), "text")
+
+
+def _converter(column: Column) -> typing.Callable[[str], int | None]:
+    # Return a function which converts the text of an item to its value in `column.data`, or else returns None.
+    # A date which default mode accepts but `datetime.date` doesn't (such as 2023-02-31) raises `OverflowError`.
+    if column.kind == "number":
+        return parse_number
+    if column.kind == "text":
+        values = typing.cast(list[str], column.values)
+        codes = {text: code for code, text in enumerate(values)}
+
+        def text_code(text: str) -> int:
+            code = codes.get(text)
+            if code is None:
+                code = codes[text] = len(values)
+                values.append(text)
+            return code
+
+        return text_code
+    if column.kind == "date":
+        date_pattern = _patterns().date
+
+        def days(text: str) -> int | None:
+            if date_pattern.fullmatch(text) is None:
+                return None
+            try:
+                return datetime.date.fromisoformat(text).toordinal() - _EPOCH
+            except ValueError:
+                raise OverflowError(text) from None  # Not a day of the month, or year 0.
+
+        return days
+    date_time_pattern = _patterns().date_time
+
+    def seconds(text: str) -> int | None:
+        match = date_time_pattern.fullmatch(text)
+        if match is None or match["hour"] is None:
+            return None
+        year, month, day, hour, minute, second, tz_sign, tz_hour, tz_minute = match.group(
+            "year", "month", "day", "hour", "minute", "second", "tz_sign", "tz_hour", "tz_minute")
+        try:
+            days = datetime.date(int(year), int(month), int(day)).toordinal() - _EPOCH
+        except ValueError:
+            raise OverflowError(text) from None  # Not a day of the month, or year 0.
+        total = days * _SECONDS_PER_DAY + int(hour) * 3600 + int(minute) * 60 + int(second)
+        if tz_sign is not None:
+            offset = int(tz_hour) * 3600 + int(tz_minute) * 60
+            total += -offset if tz_sign == "+" else offset
+        return total
+
+    return seconds
@@ -0,0 +1,16 @@
+"""Default mode, which transforms symbols into numbers, dates and times (see `symbol_parser.DEFAULT_MODE`)."""
+import importlib
+import typing
+
+__all__ = [
+    "extension_types",
+    "symbol_parser",
+]
+
+
+def __getattr__(name: str) -> typing.Any:
+    # Import submodules when they are first used (see PEP 562).
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = globals()[name] = importlib.import_module(f".{name}", __name__)
+    return module
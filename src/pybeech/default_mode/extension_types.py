@@ -5,13 +5,18 @@ from dataclasses import dataclass
 
 
 class StrHashMixin:
-    """Mixin for a class whose hash is just that of its string value."""
+    """Mixin for a class whose hash is just that of its string value.
+
+    Note: a dataclass using this must assign `__hash__` explicitly, or `dataclass` will replace it with None.
+    """
+
+    __slots__ = ()
 
     def __hash__(self) -> int:
         return hash(str(self))
 
 
-@dataclass
+@dataclass(slots=True)
 class Date(StrHashMixin):
     """ISO 8601 date."""
 
@@ -19,11 +24,13 @@ class Date(StrHashMixin):
     month: int
     day: int
 
+    __hash__ = StrHashMixin.__hash__
+
     def __str__(self) -> str:
         return f"{self.year:04}-{self.month:02}-{self.day:02}"
 
 
-@dataclass
+@dataclass(slots=True)
 class Time(StrHashMixin):
     """ISO 8601 time."""
 
@@ -33,6 +40,8 @@ class Time(StrHashMixin):
     tz_hour: int | None = None
     tz_minute: int | None = None  # Note: this is only used if `tz_hour` is not None.
 
+    __hash__ = StrHashMixin.__hash__
+
     def __str__(self) -> str:
         simple_time = f"{self.hour:02}:{self.minute:02}:{self.second:02}"
         tz_offset = (f"{self.tz_hour:+03}{f':{self.tz_minute:02}' if self.tz_minute is not None else ''}"
@@ -40,12 +49,14 @@ class Time(StrHashMixin):
         return f"{simple_time}{tz_offset}"
 
 
-@dataclass
+@dataclass(slots=True)
 class DateTime(StrHashMixin):
     """ISO 8601 date and time."""
 
     date: Date
     time: Time
 
+    __hash__ = StrHashMixin.__hash__
+
     def __str__(self) -> str:
         return f"{self.date}T{self.time}"
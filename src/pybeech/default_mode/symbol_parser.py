@@ -1,15 +1,46 @@
 """Module containing the default symbol transformations."""
 from __future__ import annotations
 
+import functools
 import re
+import typing
 
-from src.pybeech.beech_types import Symbol
+from ..beech_types import Symbol
+from ..transformer import Mode
 from .extension_types import Date, Time, DateTime
 
 
+# Maximum number of symbol texts whose classification is remembered by `classify()`.
+SYMBOL_CACHE_SIZE = 1 << 16
+
+# An ASCII integer literal, as accepted by `int(value, base=0)`.
+_NUMBER_PATTERN = r"[+-]?(?:0[xX](?:_?[0-9a-fA-F])+|0[oO](?:_?[0-7])+|0[bB](?:_?[01])+|0(?:_?0)*|[1-9](?:_?[0-9])*)"
+_DATE_PATTERN = r"(?P<year>[0-9]{4})-(?P<month>0[1-9]|1[0-2])-(?P<day>0[1-9]|[12][0-9]|3[01])"
+_TIME_PATTERN = (r"(?P<hour>[01][0-9]|2[0-4]):(?P<minute>[0-5][0-9]):(?P<second>[0-5][0-9]|60)"
+                 r"(?:(?P<utc>Z)|(?P<tz_sign>[-+\u2212])(?P<tz_hour>[01][0-9]|2[0-4]):?(?P<tz_minute>[0-5][0-9]))?")
+
+
+class _Patterns(typing.NamedTuple):
+    number: re.Pattern[str]
+    date: re.Pattern[str]
+    time: re.Pattern[str]
+    date_time: re.Pattern[str]  # A date with an optional time, so that a date-time is matched in a single pass.
+
+
+@functools.cache
+def _patterns() -> _Patterns:
+    # The patterns are compiled when first needed rather than on import, which short-lived processes pay for.
+    return _Patterns(number=re.compile(_NUMBER_PATTERN),
+                     date=re.compile(_DATE_PATTERN),
+                     time=re.compile(f"T?{_TIME_PATTERN}"),
+                     date_time=re.compile(f"{_DATE_PATTERN}(?:T{_TIME_PATTERN})?"))
+
+
 class TextSymbol(Symbol):
     """Symbol which is purely textual."""
 
+    __slots__ = ()
+
     @classmethod
     def from_base_symbol(cls, symbol: Symbol) -> TextSymbol:
         return cls(str(symbol))
@@ -18,6 +49,8 @@ class TextSymbol(Symbol):
 class NumberSymbol(Symbol):
     """Symbol representing a number."""
 
+    __slots__ = ()
+
     def __init__(self, value: int) -> None:
         super().__init__("")  # Dummy value
         self._value = value
@@ -25,15 +58,19 @@ class NumberSymbol(Symbol):
     @classmethod
     def try_parse(cls, value: str) -> NumberSymbol | None:
         """Try to parse the value as a number, or return None if failed."""
-        try:
-            return cls(int(value, base=0))
-        except ValueError:
-            return None
+        number = parse_number(value)
+        return None if number is None else cls(number)
+
+    @property
+    def value(self) -> int:
+        return self._value
 
 
 class DateSymbol(Symbol):
     """Symbol representing a date in the ISO 8601 format."""
 
+    __slots__ = ()
+
     def __init__(self, year: int, month: int, day: int):
         super().__init__("")
         self._value = Date(year, month, day)
@@ -41,12 +78,10 @@ class DateSymbol(Symbol):
     @classmethod
     def try_parse(cls, value: str) -> DateSymbol | None:
         """Try to parse the value as an ISO 8601 date, or return None if failed."""
-        date_match = re.match(
-            r"^(?P<year>[0-9]{4})-(?P<month>0[1-9]|1[0-2])-(?P<day>0[1-9]|[12][0-9]|3[01])$",
-            value)
+        date_match = _patterns().date.fullmatch(value)
         if date_match is None:
             return None
-        return cls(**{k: int(v) for k, v in date_match.groupdict().items()})
+        return cls(*_date_fields(date_match))
 
     @property
     def value(self):
@@ -56,6 +91,8 @@ class DateSymbol(Symbol):
 class TimeSymbol(Symbol):
     """Symbol representing a time in the ISO 8601 format."""
 
+    __slots__ = ()
+
     def __init__(self, hour: int, minute: int, second: int, tz_hour: int | None = None, tz_minute: int | None = None) -> None:
         super().__init__("")
         self._value = Time(hour, minute, second, tz_hour, tz_minute)
@@ -63,23 +100,10 @@ class TimeSymbol(Symbol):
     @classmethod
     def try_parse(cls, value: str) -> TimeSymbol | None:
         """Try to parse the value as an ISO 8601 time, or return None if failed."""
-        time_match = re.match(
-            r"^T?(?P<hour>[01][0-9]|2[0-4]):(?P<minute>[0-5][0-9]):(?P<second>[0-5][0-9]|60)"
-            r"(?P<timezone>Z|[-+\u2212](?:[01][0-9]|2[0-4]):?[0-5][0-9])?$",
-            value
-        )
+        time_match = _patterns().time.fullmatch(value)
         if time_match is None:
             return None
-        time_dict = time_match.groupdict()
-        timezone = time_dict.pop("timezone")
-        if timezone is not None:
-            hour, minute = "0", "0"
-            if timezone != "Z":
-                # tz_offset = timezone.replace("\u2212", "-").replace(":", "")
-                hour, minute = re.match(r"([+-]?\d{2}):?(\d{2})", timezone).groups()
-            time_dict["tz_hour"] = hour
-            time_dict["tz_minute"] = minute
-        return cls(**{k: int(v) for k, v in time_dict.items()})
+        return cls(*_time_fields(time_match))
 
     @property
     def value(self):
@@ -89,20 +113,22 @@ class TimeSymbol(Symbol):
 class DateTimeSymbol(Symbol):
     """Symbol representing a date and time in the ISO 8601 format."""
 
+    __slots__ = ()
+
     def __init__(self, date: Date, time: Time):
         super().__init__("")
         self._value = DateTime(date, time)
 
     @classmethod
     def try_parse(cls, value: str):
-        date_part, t, time_part = value.partition("T")
-        if t == "":
-            return None
-        if (date := DateSymbol.try_parse(date_part)) is None:
+        date_time_match = _patterns().date_time.fullmatch(value)
+        if date_time_match is None or date_time_match["hour"] is None:
             return None
-        if (time := TimeSymbol.try_parse(t + time_part)) is None:
-            return None
-        return cls(date.value, time.value)
+        return cls(Date(*_date_fields(date_time_match)), Time(*_time_fields(date_time_match)))
+
+    @property
+    def value(self) -> DateTime:
+        return self._value
 
 
 EXTENDED_SYMBOLS = [
@@ -115,8 +141,90 @@ EXTENDED_SYMBOLS = [
 
 def parse_symbol(symbol: Symbol) -> Symbol:
     """Parse a symbol into its corresponding default mode subtype."""
-    value = str(symbol)
-    for cls in EXTENDED_SYMBOLS:
-        if (sym := cls.try_parse(value)) is not None:
+    return classify(str(symbol))
+
+
+# Default mode, to pass to `Parser` or `mode_transformer()`.
+DEFAULT_MODE = Mode(transform_symbol=parse_symbol)
+
+
+@functools.lru_cache(maxsize=SYMBOL_CACHE_SIZE)
+def classify(value: str) -> Symbol:
+    """Parse the text of a symbol into its corresponding default mode subtype.
+
+    The candidate subtype is chosen from the first character, so that each symbol is matched against at most one
+    or two patterns. The result for each text is cached (see `functools.lru_cache`), so a symbol which occurs many
+    times is only parsed once and every occurrence shares the same symbol object.
+    """
+    patterns = _patterns()
+    c = value[:1]
+    if "0" <= c <= "9":
+        if (sym := NumberSymbol.try_parse(value)) is not None:
+            return sym
+        if value[4:5] == "-":
+            if (date_time_match := patterns.date_time.fullmatch(value)) is not None:
+                date = _date_fields(date_time_match)
+                if date_time_match["hour"] is None:
+                    return DateSymbol(*date)
+                return DateTimeSymbol(Date(*date), Time(*_time_fields(date_time_match)))
+        elif (time_match := patterns.time.fullmatch(value)) is not None:
+            return TimeSymbol(*_time_fields(time_match))
+    elif c == "T":
+        if (time_match := patterns.time.fullmatch(value)) is not None:
+            return TimeSymbol(*_time_fields(time_match))
+    elif c == "+" or c == "-" or not c.isascii():
+        if (sym := NumberSymbol.try_parse(value)) is not None:
             return sym
     return TextSymbol(value)
+
+
+def parse_number(value: str) -> int | None:
+    """Parse the text of a symbol as a number, or return None if it is not one."""
+    if _patterns().number.fullmatch(value):
+        return int(value, base=0)
+    if value.isascii():
+        return None
+    # `int` also accepts digits from other scripts.
+    try:
+        return int(value, base=0)
+    except ValueError:
+        return None
+
+
+def parse_date(value: str) -> Date | None:
+    """Parse the text of a symbol as an ISO 8601 date, or return None if it is not one."""
+    date_match = _patterns().date.fullmatch(value)
+    return None if date_match is None else Date(*_date_fields(date_match))
+
+
+def parse_time(value: str) -> Time | None:
+    """Parse the text of a symbol as an ISO 8601 time, or return None if it is not one."""
+    time_match = _patterns().time.fullmatch(value)
+    return None if time_match is None else Time(*_time_fields(time_match))
+
+
+def parse_date_time(value: str) -> DateTime | None:
+    """Parse the text of a symbol as an ISO 8601 date and time, or return None if it is not one."""
+    date_time_match = _patterns().date_time.fullmatch(value)
+    if date_time_match is None or date_time_match["hour"] is None:
+        return None
+    return DateTime(Date(*_date_fields(date_time_match)), Time(*_time_fields(date_time_match)))
+
+
+def _date_fields(match: re.Match[str]) -> tuple[int, int, int]:
+    year, month, day = match.group("year", "month", "day")
+    return int(year), int(month), int(day)
+
+
+def _time_fields(match: re.Match[str]) -> tuple[int, int, int, int | None, int | None]:
+    # The groups are looked up all at once, since each lookup by name is a separate call.
+    hour, minute, second, utc, tz_sign, tz_hour_text, tz_minute_text = match.group(
+        "hour", "minute", "second", "utc", "tz_sign", "tz_hour", "tz_minute")
+    tz_hour: int | None = None
+    tz_minute: int | None = None
+    if utc is not None:
+        tz_hour, tz_minute = 0, 0
+    elif tz_sign is not None:
+        sign = "+" if tz_sign == "+" else "-"
+        tz_hour, tz_minute = int(sign + tz_hour_text), int(tz_minute_text)
+    return int(hour), int(minute), int(second), tz_hour, tz_minute
@@ -0,0 +1,173 @@
+"""Write Beech trees back out as Beech source code."""
+from __future__ import annotations
+
+import io
+import re
+import typing
+
+from .beech_types import OrderedTree, Symbol, Tree, Value
+from .default_mode.extension_types import Date, DateTime, Time
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+# A valid symbol, as lexed by `Lexer` (which also requires every character to be printable).
+_SYMBOL = re.compile(r"(?:[^\s'\"{}()\[\]#~]|~(?!\{))+")
+_ESCAPES = {
+    '"': '\\"',
+    "\\": "\\\\",
+    "\n": "\\n",
+    "\r": "\\r",
+    "\t": "\\t",
+    "\v": "\\v",
+    "\f": "\\f",
+    "\a": "\\a",
+    "\b": "\\b",
+}
+_NEEDS_ESCAPE = re.compile(r'["\\]|[^\S ]|[^ -~]')
+_OPENERS = {dict: "{", list: "(", OrderedTree: "["}
+_CLOSERS = {dict: "}", list: ")", OrderedTree: "]"}
+# The kind of container (a key of `_OPENERS`) of each type of value found so far, or None for other values.
+_CONTAINER_TYPES: dict[type, type | None] = {container_type: container_type for container_type in _OPENERS}
+_UNKNOWN: typing.Any = object()
+
+
+def dumps(tree: Tree, indent: int | None = None) -> str:
+    """Return Beech source code for a tree (see `dump()`)."""
+    buffer = io.StringIO()
+    dump(tree, buffer, indent)
+    return buffer.getvalue()
+
+
+def dump(tree: Tree, fp: typing.TextIO, indent: int | None = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Write Beech source code for a tree to a text stream.
+
+    Trees, ordered trees and lists (or subclasses of them), strings and symbols are supported, including the default
+    mode symbol types, which are written as their text, and bare `Date`, `Time` and `DateTime` values (as produced by
+    `schema` and `columns`), which are written in the ISO 8601 form that default mode parses back. The output is
+    written in chunks of about `chunk_size` characters, and nested values are handled with an explicit stack, so
+    there is no limit on nesting depth.
+
+    :param tree: top-level tree to write
+    :param fp: text stream to write to
+    :param indent: (optional) number of spaces to indent nested trees by; by default, everything is written on
+      one line
+    :param chunk_size: (optional) number of characters to buffer before writing to `fp`
+
+    :raises TypeError: if the tree holds a value which is not a Beech value
+    :raises ValueError: if a symbol's text is not a valid symbol, or a string holds a surrogate character
+    """
+    if _container_type(tree) is not dict:
+        raise TypeError(f"Expected a tree at the top level, not {type(tree)}")
+    parts: list[str] = []
+    size = 0
+    symbols: set[str] = set()
+    pretty = indent is not None
+    pad = " " * indent if indent is not None else ""
+    # Each frame holds an iterator over an unfinished tree or list, its type, its depth and whether it is written
+    # over several lines. The top-level tree has no brackets.
+    stack: list[tuple[typing.Iterator[typing.Any], type, int, bool]] = [(iter(tree.items()), dict, 0, pretty)]
+    first = True
+    container_type_of = _CONTAINER_TYPES.get
+    unknown = _UNKNOWN
+    while stack:
+        items, container_type, depth, multiline = stack[-1]
+        item = next(items, stack)  # The stack itself marks the end, since it can't be an item.
+        if item is stack:
+            stack.pop()
+            if depth > 0:
+                parts.append(f"\n{pad * (depth - 1)}{_CLOSERS[container_type]}" if multiline
+                             else _CLOSERS[container_type])
+            first = False
+            continue
+        if multiline:
+            if not first or depth > 0:
+                parts.append(f"\n{pad * depth}")
+        elif not first:
+            parts.append(" ")
+        first = False
+        if container_type is not list:
+            key, value = item
+            text = _scalar(key, "key", symbols)
+            parts.append(text)
+            parts.append(" ")
+            size += len(text)
+        else:
+            value = item
+        value_type = container_type_of(type(value), unknown)
+        if value_type is unknown:
+            value_type = _container_type(value)
+        if value_type is not None:
+            if not value:
+                parts.append(_OPENERS[value_type] + _CLOSERS[value_type])
+                continue
+            parts.append(_OPENERS[value_type])
+            nested_multiline = pretty and (value_type is not list or any(_container_type(v) for v in value))
+            stack.append((iter(value if value_type is list else value.items()), value_type, depth + 1,
+                          nested_multiline))
+            first = True
+        else:
+            text = _scalar(value, "value", symbols)
+            parts.append(text)
+            size += len(text)
+        if size >= chunk_size:
+            fp.write("".join(parts))
+            parts.clear()
+            size = 0
+    fp.write("".join(parts))
+
+
+def _container_type(value: typing.Any) -> type | None:
+    # Return the kind of container a value is (including subclasses of dict, list and `OrderedTree`), if any.
+    value_type = type(value)
+    container_type = _CONTAINER_TYPES.get(value_type, _UNKNOWN)
+    if container_type is _UNKNOWN:
+        container_type = next((t for t in _OPENERS if issubclass(value_type, t)), None)
+        _CONTAINER_TYPES[value_type] = container_type
+    return container_type
+
+
+def _scalar(value: Value, kind: str, symbols: set[str]) -> str:
+    # Return the source code for a string or symbol. Symbol texts already found to be valid are kept in `symbols`.
+    if isinstance(value, str):
+        return _quote(value)
+    if isinstance(value, Symbol):
+        text = str(value)
+        if text not in symbols:
+            if _SYMBOL.fullmatch(text) is None or not text.isprintable():
+                raise ValueError(f"Not a valid symbol: {text!r}")
+            symbols.add(text)
+        return text
+    if isinstance(value, (Date, Time, DateTime)):
+        return _date_time_text(value)
+    raise TypeError(f"Unexpected {kind} type: {type(value)}")
+
+
+def _date_time_text(value: Date | Time | DateTime) -> str:
+    # The canonical text of a date or time. A time zone offset is always written with its minutes, since default
+    # mode only parses it back with them.
+    if isinstance(value, DateTime):
+        return f"{value.date}T{_date_time_text(value.time)}"
+    if isinstance(value, Time) and value.tz_hour is not None and value.tz_minute is None:
+        return str(Time(value.hour, value.minute, value.second, value.tz_hour, 0))
+    return str(value)
+
+
+def _quote(string: str) -> str:
+    if _NEEDS_ESCAPE.search(string) is None:
+        return f'"{string}"'
+    return '"' + "".join(_escape(c) for c in string) + '"'
+
+
+def _escape(c: str) -> str:
+    if c in _ESCAPES:
+        return _ESCAPES[c]
+    if c.isprintable():
+        return c
+    code = ord(c)
+    if 0xD800 <= code <= 0xDFFF:
+        raise ValueError(f"Cannot write a surrogate character in a string: {hex(code)}")
+    if code < 0x100:
+        return f"\\x{code:02x}"
+    if code < 0x10000:
+        return f"\\u{code:04x}"
+    return f"\\U{code:08x}"
@@ -1,9 +1,53 @@
 """Module containing all exceptions raised by the package."""
+from __future__ import annotations
 
 
-class LexError(Exception):
+class _SourceError(Exception):
+    """Base class for errors at a position in the source code.
+
+    The position is given as an index into the source and as a line and column (both numbered from 1). It is
+    filled in by the lexer or parser which raised the error, and is None if unknown.
+    """
+    def __init__(self, message: str, index: int | None = None, line: int | None = None,
+                 column: int | None = None) -> None:
+        super().__init__(message)
+        self.message = message
+        self.index = index
+        self.line = line
+        self.column = column
+
+    def __str__(self) -> str:
+        if self.line is None:
+            return self.message
+        return f"{self.message} (line {self.line}, column {self.column})"
+
+    def __reduce__(self):
+        # Keep the position when pickled (for example, when raised in a worker process).
+        return type(self), (self.message, self.index, self.line, self.column)
+
+
+class LexError(_SourceError):
     """Exception raised when a syntactical error occurs."""
 
 
-class ParseError(Exception):
+class ParseError(_SourceError):
     """Exception raised in parsing."""
+
+
+class SchemaError(ParseError):
+    """Exception raised when a value does not match the schema it is decoded with (see `schema.Schema`).
+
+    The path gives the keys (and the indices in lists) which lead to the value from the top-level tree.
+    """
+    def __init__(self, message: str, index: int | None = None, line: int | None = None,
+                 column: int | None = None, path: tuple[str | int, ...] = ()) -> None:
+        super().__init__(message, index, line, column)
+        self.path = path
+
+    def __str__(self) -> str:
+        if not self.path:
+            return super().__str__()
+        return f"{'/'.join(map(str, self.path))}: {super().__str__()}"
+
+    def __reduce__(self):
+        return type(self), (self.message, self.index, self.line, self.column, self.path)
@@ -0,0 +1,337 @@
+"""Reparse Beech documents incrementally after small edits, for editors and language servers."""
+from __future__ import annotations
+
+import bisect
+import typing
+
+from .beech_types import Key, List, OrderedTree, Symbol, Tree, Value
+from .errors import LexError, ParseError
+from .parser import EventType, Parser
+from .transformer import Mode, Transform
+
+# The sentinel which stands in for the next key (or list item) after a reparsed region (see `_parse_region()`).
+_SENTINEL = "k"
+# A sentinel which behaves like the end of the source: a newline ends a line comment as the end would.
+_END_SENTINEL = "\nk v"
+
+_STARTS = (EventType.START_TREE, EventType.START_LIST, EventType.START_ORDERED_TREE)
+_ENDS = (EventType.END_TREE, EventType.END_LIST, EventType.END_ORDERED_TREE)
+
+
+class _Node:
+    """The layout of a tree or list in the source, recorded so that part of it can be reparsed.
+
+    Offsets are relative to the opening bracket of the node (for the top-level tree, the index just before the
+    source), so that an edit only moves the offsets of the nodes around it. Each entry (a key-value pair, or a
+    list item) starts at its key (or item) and runs up to the start of the next entry, or the closing bracket.
+    A child is stored with the offset of its opening bracket from the start of its entry.
+
+    The starts of the entries from `shift_from` on are to be moved by `shift`. Edits in the same place move the
+    same entries, so this lets a node share its list of starts with the node before the edit.
+
+    Ordered trees have no nodes of their own: an edit within one reparses the whole entry holding it.
+    """
+    __slots__ = ("value", "close", "starts", "shift_from", "shift", "children", "keys")
+
+    def __init__(self, value: Tree | List, close: int, starts: list[int],
+                 children: list[tuple[int, _Node] | None], keys: list[Key] | None, shift_from: int = 0,
+                 shift: int = 0) -> None:
+        self.value = value
+        self.close = close
+        self.starts = starts
+        self.shift_from = shift_from
+        self.shift = shift
+        self.children = children
+        self.keys = keys
+
+    def start(self, i: int) -> int:
+        """Return the offset of entry `i`."""
+        return self.starts[i] + self.shift if i >= self.shift_from else self.starts[i]
+
+    def find(self, offset: int) -> int:
+        """Return the index of the entry at `offset`, or -1 if it is before every entry."""
+        shift_from = self.shift_from if self.shift else len(self.starts)
+        i = bisect.bisect_right(self.starts, offset, 0, shift_from)
+        if i < shift_from:
+            return i - 1
+        return bisect.bisect_right(self.starts, offset - self.shift, shift_from) - 1
+
+    def offsets(self) -> list[int]:
+        """Return the offsets of the entries, with the shift applied."""
+        if not self.shift:
+            return self.starts
+        return self.starts[:self.shift_from] + [start + self.shift for start in self.starts[self.shift_from:]]
+
+    def moved(self, shift_from: int, delta: int) -> tuple[list[int], int, int]:
+        """Return the starts, `shift_from` and `shift` after moving the entries from `shift_from` on by `delta`."""
+        if not delta:
+            return self.starts, self.shift_from, self.shift
+        if not self.shift or self.shift_from == shift_from:
+            return self.starts, shift_from, self.shift + delta
+        return self.offsets(), shift_from, delta
+
+
+# The entries parsed from a region: their offsets, children, keys (for a tree) and values.
+_Region = tuple[list[int], list[typing.Optional[tuple[int, _Node]]], list[Key], list[Value]]
+
+
+class Document:
+    """A parsed Beech document which can be reparsed incrementally after each edit.
+
+    `edit()` returns a new document, reparsing only the smallest part of the tree around the edit and reusing
+    every other tree and list from this one (this document is left unchanged). The tree and any error raised are
+    always the same as from parsing the whole new source with `Parser`. The options are the same as for `Parser`.
+
+    Where an edit cannot be shown to stay within one region (for example, it opens a string which runs to the end
+    of the file), the next larger region is reparsed instead, up to the whole document.
+    """
+    def __init__(self, source: str, transform_symbol: Transform[Symbol] | None = None,
+                 transform_string: Transform[str] | None = None, mode: Mode | None = None) -> None:
+        self._options: dict[str, typing.Any] = {
+            "transform_symbol": transform_symbol,
+            "transform_string": transform_string,
+            "mode": mode,
+        }
+        self._source = source
+        self._tree: Tree
+        self._root: _Node | None
+        self._tree, self._root = self._parse_document(source)
+
+    @property
+    def source(self) -> str:
+        return self._source
+
+    @property
+    def tree(self) -> Tree:
+        return self._tree
+
+    def edit(self, offset: int, removed: int, inserted: str) -> Document:
+        """Return the document after replacing `removed` characters of the source at `offset` with `inserted`.
+
+        :raises ValueError: if the replaced characters are not within the source
+        :raises LexError, ParseError: if the new source is not valid, as from `Parser.parse()`
+        """
+        end = offset + removed
+        if offset < 0 or removed < 0 or end > len(self._source):
+            raise ValueError(f"Edit of {removed} characters at {offset} is outside the source.")
+        source = f"{self._source[:offset]}{inserted}{self._source[end:]}"
+        document = object.__new__(Document)
+        document._options = self._options
+        document._source = source
+        root = None
+        if self._root is not None:
+            root = self._reparse(source, offset, end, len(inserted) - removed)
+        if root is not None:
+            document._tree, document._root = typing.cast(Tree, root.value), root
+        else:
+            document._tree, document._root = document._parse_document(source)
+        return document
+
+    def _parse_document(self, source: str) -> tuple[Tree, _Node | None]:
+        # Parse the whole source, recording its layout if possible.
+        region = self._parse_region(source, 0, len(source), None, False)
+        if region is None:
+            # Parse again normally, to raise the error (or give the tree of a source which stops at a stray
+            # closing bracket, whose layout is not recorded).
+            return Parser(source, **self._options).parse(), None
+        starts, children, keys, values = region
+        root = _Node(dict(zip(keys, values)), len(source) + 1, [s + 1 for s in starts], children, keys)
+        return typing.cast(Tree, root.value), root
+
+    def _reparse(self, source: str, start: int, end: int, delta: int) -> _Node | None:
+        # Reparse the smallest node around the edit of the old source from `start` to `end`, returning the new
+        # root, or None if the whole document must be reparsed.
+        node = typing.cast(_Node, self._root)
+        node_open = -1
+        path: list[tuple[_Node, int, int]] = []  # Each node around the edit, its opening index and child entry.
+        while True:
+            k = node.find(start - node_open)
+            child = node.children[k] if k >= 0 else None
+            if child is None:
+                break
+            child_open = node_open + node.start(k) + child[0]
+            if not (child_open < start and end <= child_open + child[1].close):
+                break
+            path.append((node, node_open, k))
+            node, node_open = child[1], child_open
+        new_node = None
+        while new_node is None:
+            new_node = self._reparse_node(source, node, node_open, start, end, delta)
+            if new_node is None:
+                if not path:
+                    return None
+                node, node_open, _ = path.pop()
+        # Rebuild each node around the new node, sharing everything else.
+        while path:
+            parent, _, k = path.pop()
+            value: Tree | List
+            if parent.keys is None:
+                value = list(typing.cast(List, parent.value))
+                value[k] = new_node.value
+            else:
+                value = dict(typing.cast(Tree, parent.value))
+                value[parent.keys[k]] = new_node.value
+            children = parent.children.copy()
+            children[k] = (typing.cast(tuple[int, _Node], children[k])[0], new_node)
+            starts, shift_from, shift = parent.moved(k + 1, delta)
+            new_node = _Node(value, parent.close + delta, starts, children, parent.keys, shift_from, shift)
+        return new_node
+
+    def _reparse_node(self, source: str, node: _Node, node_open: int, start: int, end: int,
+                      delta: int) -> _Node | None:
+        # Reparse the entries of `node` around the edit, returning the new node, or None if they cannot be
+        # reparsed on their own.
+        first = node.find(start - node_open)
+        last = node.find(end - node_open)
+        region_start = node_open + (node.start(first) if first >= 0 else 1)
+        first = max(first, 0)
+        followed = last + 1 < len(node.starts)
+        region_end = node_open + (node.start(last + 1) if followed else node.close) + delta
+        is_list = node.keys is None
+        region = self._parse_region(source, region_start, region_end, is_list if node_open >= 0 else None,
+                                    followed)
+        if region is None:
+            return None
+        new_starts, new_children, new_keys, new_values = region
+        value: Tree | List
+        keys = None
+        if is_list:
+            old_list = typing.cast(List, node.value)
+            value = old_list[:first] + new_values + old_list[last + 1:]
+        else:
+            tree = typing.cast(Tree, node.value)
+            old_keys = typing.cast(list[Key], node.keys)
+            removed_keys = old_keys[first:last + 1]
+            keys = old_keys
+            if new_keys == removed_keys:
+                value = dict(tree)
+                value.update(zip(new_keys, new_values))
+            else:
+                removed_key_set = set(removed_keys)
+                if any(key in tree and key not in removed_key_set for key in new_keys):
+                    return None  # A duplicate key, which is reported by reparsing the whole tree.
+                keys = old_keys[:first] + new_keys + old_keys[last + 1:]
+                if last + 1 == len(old_keys):
+                    # The keys at the end of a tree can be replaced without rebuilding it.
+                    value = dict(tree)
+                    for key in removed_keys:
+                        del value[key]
+                    value.update(zip(new_keys, new_values))
+                else:
+                    values = list(tree.values())
+                    value = dict(zip(keys, values[:first] + new_values + values[last + 1:]))
+        offset = region_start - len(_prefix(source, region_start, node_open < 0, is_list)) - node_open
+        new_starts = [start + offset for start in new_starts]
+        # Keep the shift of the following entries pending if it applies to all of them and none before.
+        if node.shift and not first <= node.shift_from <= last + 1:
+            starts, shift = node.offsets(), 0
+        else:
+            starts, shift = node.starts, node.shift
+        return _Node(value, node.close + delta, starts[:first] + new_starts + starts[last + 1:],
+                     node.children[:first] + new_children + node.children[last + 1:], keys,
+                     first + len(new_starts), shift + delta)
+
+    def _parse_region(self, source: str, start: int, end: int, is_list: bool | None,
+                      followed: bool) -> _Region | None:
+        # Parse the entries of a tree or list (or of the top-level tree, if `is_list` is None) from `start` to
+        # `end` in the source, returning their offsets in the parsed text, children, keys and values. None is
+        # returned if the region is not valid on its own, or might be lexed differently within the whole source.
+        #
+        # The region is parsed inside a bracket (except at the top level) and followed by a sentinel standing in
+        # for the next entry (if `followed`), or by the closing bracket or end of the source. It must end exactly
+        # there: for example, a line comment left open at the end of the region would swallow the sentinel.
+        prefix = _prefix(source, start, is_list is None, bool(is_list))
+        text = source[start:end]
+        stop = len(prefix) + len(text)
+        if is_list is None:
+            suffix = _SENTINEL + " v" if followed else _END_SENTINEL
+            stop += 0 if followed else 1
+        elif is_list:
+            suffix = f"{_SENTINEL if followed else ''})"
+        else:
+            suffix = f"{_SENTINEL + ' v' if followed else ''}}}"
+        region_depth = 1 if is_list is None else 2
+        try:
+            parser = Parser(f"{prefix}{text}{suffix}", **self._options)
+            return _build(parser, region_depth, stop, is_list is not None and not followed)
+        except (LexError, ParseError):
+            return None
+
+
+def _prefix(source: str, start: int, top_level: bool, is_list: bool) -> str:
+    # Return the text to parse before a region, so that the region starts in the same context as in the source:
+    # within a tree or list, and after whitespace if it is after whitespace (which allows comments).
+    space = " " if start > 0 and source[start - 1].isspace() else ""
+    if top_level:
+        return space
+    return f"{_SENTINEL} {'(' if is_list else '{'}{space}"
+
+
+class _Frame:
+    # An unfinished tree, list or ordered tree while building nodes from parse events.
+    __slots__ = ("open", "is_list", "ordered", "starts", "children", "keys", "values", "key", "key_index")
+
+    def __init__(self, open_index: int, is_list: bool, ordered: bool = False) -> None:
+        self.open = open_index
+        self.is_list = is_list
+        self.ordered = ordered
+        self.starts: list[int] = []
+        self.children: list[tuple[int, _Node] | None] = []
+        self.keys: list[Key] = []
+        self.values: list[Value] = []
+        self.key: Key | None = None
+        self.key_index = 0
+
+    def add(self, value: Value, index: int, child: _Node | None, child_open: int) -> None:
+        start = index if self.is_list else self.key_index
+        self.starts.append(start)
+        self.children.append(None if child is None else (child_open - start, child))
+        if not self.is_list:
+            self.keys.append(typing.cast(Key, self.key))
+        self.values.append(value)
+
+
+def _build(parser: Parser, region_depth: int, stop: int, closed: bool) -> _Region | None:
+    # Build the entries of the container at `region_depth` from the parser's events, with nodes for every tree and
+    # list in them. The container must end at the token at index `stop`: its closing bracket if `closed`, or
+    # else a sentinel key (or item).
+    frames: list[_Frame] = []
+    depth = 0
+    for event in parser.events():
+        event_type = event.type
+        index = parser.token_index
+        if event_type in _STARTS:
+            depth += 1
+            if depth >= region_depth:
+                frames.append(_Frame(index if depth > 1 else -1, event_type is EventType.START_LIST,
+                                     event_type is EventType.START_ORDERED_TREE))
+        elif depth < region_depth:
+            if event_type in _ENDS:
+                depth -= 1
+        elif depth == region_depth and index == stop and not closed:
+            # The sentinel must be parsed as the next key of a tree, or the next item of a list.
+            if (event_type is EventType.VALUE) is frames[-1].is_list:
+                break
+            return None
+        elif event_type is EventType.KEY:
+            frames[-1].key, frames[-1].key_index = event.value, index
+        elif event_type is EventType.VALUE:
+            frames[-1].add(typing.cast(Value, event.value), index, None, 0)
+        else:
+            if depth == region_depth:
+                if closed and index == stop:
+                    break
+                return None
+            frame = frames.pop()
+            depth -= 1
+            if frame.ordered:
+                frames[-1].add(OrderedTree.from_lists(frame.keys, frame.values), frame.open, None, 0)
+                continue
+            value: Tree | List = frame.values if frame.is_list else dict(zip(frame.keys, frame.values))
+            node = _Node(value, index - frame.open, [s - frame.open for s in frame.starts], frame.children,
+                         None if frame.is_list else frame.keys)
+            frames[-1].add(value, frame.open, node, frame.open)
+    else:
+        return None
+    region = frames[0]
+    return region.starts, region.children, region.keys, region.values
@@ -2,8 +2,13 @@
 
 from __future__ import annotations
 
+import bisect
+import codecs
 from dataclasses import dataclass
 import enum
+import re
+import sys
+import typing
 
 from .errors import LexError
 
@@ -14,6 +19,8 @@ class TokenType(enum.Enum):
     RIGHT_BRACE = "'}' token"
     LEFT_BRACKET = "'(' token"
     RIGHT_BRACKET = "')' token"
+    LEFT_SQUARE_BRACKET = "'[' token"
+    RIGHT_SQUARE_BRACKET = "']' token"
     STRING = "string token"
     SYMBOL = "symbol token"
 
@@ -23,28 +30,156 @@ class TokenType(enum.Enum):
         return self != type(self).EMPTY
 
 
-@dataclass
+# Shared by every token without comments before it, so that these don't each allocate an empty list.
+_NO_COMMENTS: tuple[str, ...] = ()
+
+
+@dataclass(slots=True)
 class Token:
     """A Beech syntax token."""
     type: TokenType
     start_index: int
     value: str
     has_whitespace_before: bool
-    preceding_comments: list[str]
+    preceding_comments: typing.Sequence[str]
 
     @classmethod
     def empty(cls) -> Token:
         return cls(type=TokenType.EMPTY, start_index=0, value="",
-                   has_whitespace_before=False, preceding_comments=[])
+                   has_whitespace_before=False, preceding_comments=_NO_COMMENTS)
+
+
+# Patterns used by the fast engine to scan whole runs of characters at once.
+_WHITESPACE = re.compile(r"\s+")
+# Note: `re` has no class for printable characters, so that is checked separately.
+_SYMBOL = re.compile(r"(?:[^\s'\"{}()\[\]#~]|~(?!\{))+")
+_BLOCK_COMMENT_DELIMITERS = re.compile(r"}~|~\{")
+# Characters which may start a token other than a symbol, or a comment.
+_NON_SYMBOL_START = re.compile(r"[{}()\[\]\"'#]|~\{")
+_STRING_SEGMENTS = {
+    '"': re.compile(r'[^\\"\n]*'),
+    "'": re.compile(r"[^\\'\n]*"),
+}
+_SIMPLE_ESCAPES = {
+    "'": "'",
+    '"': '"',
+    "\\": "\\",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+    "f": "\f",
+    "a": "\a",
+    "b": "\b",
+}
+_HEX_ESCAPE_LENGTHS = {"x": 2, "u": 4, "U": 8}
+_HEX_DIGITS = re.compile("[0-9a-fA-F]*")
+# A run of escape sequences which Python's "unicode_escape" codec decodes the same way as Beech.
+_ESCAPE_RUN = re.compile(r"(?:\\(?:[nrtvfab'\"\\]|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}))+")
+_SURROGATES = re.compile("[\ud800-\udfff]")
+_PUNCTUATION = {
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    "(": TokenType.LEFT_BRACKET,
+    ")": TokenType.RIGHT_BRACKET,
+    "[": TokenType.LEFT_SQUARE_BRACKET,
+    "]": TokenType.RIGHT_SQUARE_BRACKET,
+}
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_NEWLINE = re.compile("\n")
+
+T = typing.TypeVar("T")
+
+# A readable source for `Lexer.from_file()`: a text stream, or a binary stream or `mmap.mmap` holding encoded text.
+Readable = typing.Union[typing.TextIO, typing.BinaryIO, typing.Any]
+
+
+class LineIndex:
+    """An index of the offsets at which the lines of a source start, to convert between offsets and positions.
+
+    Lines and columns are numbered from 1, and columns count characters. Looking up a position takes O(log n) time
+    in the number of lines, without rescanning the source. The index can be extended as more of the source is read.
+    """
+    def __init__(self, source: str = "") -> None:
+        self._starts: list[int] = [0]
+        self._length: int = 0
+        self.extend(source)
+
+    def __len__(self) -> int:
+        """Number of lines indexed so far."""
+        return len(self._starts)
+
+    def extend(self, text: str) -> None:
+        """Add the text which follows the source indexed so far."""
+        offset = self._length
+        self._starts.extend(offset + match.end() for match in _NEWLINE.finditer(text))
+        self._length += len(text)
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Return the line and column of an index into the source."""
+        if index < 0:
+            raise ValueError(f"Negative index into source: {index}")
+        line = bisect.bisect_right(self._starts, index)
+        return line, index - self._starts[line - 1] + 1
+
+    def index(self, line: int, column: int = 1) -> int:
+        """Return the index into the source of a line and column (the inverse of `position()`)."""
+        if not 1 <= line <= len(self._starts) or column < 1:
+            raise ValueError(f"No line {line}, column {column} in source.")
+        return self._starts[line - 1] + column - 1
 
 
 class Lexer:
-    """A class to lex Beech source files on the fly."""
-    def __init__(self, source: str) -> None:
+    """A class to lex Beech source files on the fly.
+
+    By default, the lexer uses a fast engine which scans whole runs of characters with compiled patterns.
+    Passing `fast=False` selects the original character-by-character engine, which produces the same tokens
+    and errors and is kept as the reference implementation.
+
+    Passing `intern_symbols=True` interns the text of symbol tokens with `sys.intern()`, so that repeated symbols
+    share a single string.
+
+    If the optional `_speedups` extension module has been built (see `_speedups.c`), the fast engine uses it to lex
+    tokens, unless `compiled=False` is passed. It gives the same tokens and errors as the pure Python fast engine.
+
+    Every `LexError` is given the position of the token (or comment) in which it occurred, from the lexer's
+    `line_index`. The index is only built once it is first needed, so lexing without errors does not pay for it.
+    """
+    def __init__(self, source: str, fast: bool = True, intern_symbols: bool = False, compiled: bool = True) -> None:
         self._source: str = source
         self._index: int = 0
         self._has_whitespace_before: bool = False
-        self._preceding_comments: list[str] = []
+        self._preceding_comments: typing.Sequence[str] = _NO_COMMENTS
+        self._fast: bool = fast
+        self._intern_symbols: bool = intern_symbols
+        self._compiled: bool = compiled and _speedups is not None
+        self._line_index: LineIndex | None = None
+
+    @classmethod
+    def from_file(cls, file: Readable, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  encoding: str = "utf-8", fast: bool = True, intern_symbols: bool = False,
+                  compiled: bool = True) -> Lexer:
+        """Return a lexer which reads its source incrementally from `file`.
+
+        :param file: text stream, or binary stream or memory-mapped file which is decoded with `encoding`
+        :param chunk_size: number of characters (or bytes) to read at a time
+        :param encoding: (optional) encoding of a binary `file`
+        :param fast: (optional) whether to use the fast lexing engine
+        :param intern_symbols: (optional) whether to intern the text of symbol tokens
+        :param compiled: (optional) whether to use the compiled accelerator, if available
+
+        :return: lexer over the contents of `file`
+
+        Only a bounded window of the source is held in memory: roughly `chunk_size` characters plus
+        the last token lexed and the longest single token (including the comments before it).
+
+        Positions are worked out from the window and a count of the lines read before it, rather than from a
+        `line_index` of the whole source. So `position()` is only known from the start of the line holding the last
+        token lexed, and raises ValueError for an index before it.
+        """
+        return _BufferedLexer(file, chunk_size, encoding, fast, intern_symbols, compiled)
 
     def __iter__(self) -> Lexer:
         return self
@@ -57,10 +192,35 @@ class Lexer:
     def __bool__(self) -> bool:
         return not self._is_at_end()
 
+    @property
+    def index(self) -> int:
+        """Index in the source of the next character to be lexed."""
+        return self._index
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Index of the lines in the source, to find the line and column of a token's `start_index`."""
+        if self._line_index is None:
+            self._line_index = LineIndex(self._source)
+        return self._line_index
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Return the line and column (numbered from 1) of an index into the source."""
+        return self.line_index.position(index)
+
     def next_token(self) -> Token:
         """Get the next valid token in source."""
+        start = self._index
+        try:
+            if self._fast:
+                return self._fast_next_token()
+            return self._reference_next_token()
+        except LexError as e:
+            raise self._locate(e, start)
+
+    def _reference_next_token(self) -> Token:
         self._has_whitespace_before = False
-        self._preceding_comments = []
+        self._preceding_comments = _NO_COMMENTS
         self._consume_whitespace()
 
         token_type: TokenType = TokenType.EMPTY
@@ -77,6 +237,8 @@ class Lexer:
         elif self._is_symbolic():
             token_type = TokenType.SYMBOL
             self._symbol()
+            if self._intern_symbols:
+                value = sys.intern(self._source[start:self._index])
         elif self._match("{"):
             token_type = TokenType.LEFT_BRACE
         elif self._match("}"):
@@ -85,15 +247,84 @@ class Lexer:
             token_type = TokenType.LEFT_BRACKET
         elif self._match(")"):
             token_type = TokenType.RIGHT_BRACKET
+        elif self._match("["):
+            token_type = TokenType.LEFT_SQUARE_BRACKET
+        elif self._match("]"):
+            token_type = TokenType.RIGHT_SQUARE_BRACKET
         elif not self._is_at_end():
             raise LexError(f"Invalid character {self._peek()}")
 
         return Token(type=token_type,
                      start_index=start,
-                     value=(value or self._source[start:self._index]),
+                     value=(value if value or token_type is TokenType.STRING else self._source[start:self._index]),
                      has_whitespace_before=self._has_whitespace_before,
                      preceding_comments=self._preceding_comments)
 
+    def skip_token(self) -> TokenType:
+        """Lex the next token without building it, and return its type.
+
+        This always uses the fast engine. String literals are scanned without being decoded, so invalid escape
+        sequences and illegal characters in them are not reported.
+        """
+        start = self._index
+        self._preceding_comments = _NO_COMMENTS
+        try:
+            self._fast_consume_whitespace(report=False)
+            return self._fast_scan(self._index, decode=False)[0]
+        except LexError as e:
+            raise self._locate(e, start)
+
+    def skip_to_bracket(self) -> TokenType:
+        """Skip to just after the next bracket token and return its type, or EMPTY at the end of the source.
+
+        This is a faster equivalent of calling `skip_token()` until it returns a bracket, but it only finds
+        the tokens in between, without checking them. Use it only to skip over parts of the source which
+        are not needed.
+        """
+        source = self._source
+        index = self._index
+        match = None
+        try:
+            while True:
+                match = _NON_SYMBOL_START.search(source, index)
+                if match is None:
+                    self._index = len(source)
+                    return TokenType.EMPTY
+                c = match.group()
+                index = match.end()
+                if c == '"' or c == "'":
+                    self._index = index
+                    self._fast_skip_string()
+                    index = self._index
+                elif c == "#":
+                    index = source.find("\n", index)
+                    if index < 0:
+                        index = len(source)
+                elif c == "~{":
+                    index = self._fast_comment_block(index)
+                elif c == "}" and source.startswith("~", index):
+                    raise LexError("Unmatched '}~'")
+                else:
+                    self._index = index
+                    return _PUNCTUATION[c]
+        except LexError as e:
+            # Locate the error at the start of the string or comment being skipped.
+            raise self._locate(e, self._index if match is None else match.start())
+
+    def _locate(self, error: LexError, start: int) -> LexError:
+        # Give the error the position of the token (or comment) after any whitespace at `start`.
+        if error.index is None:
+            self._index = start
+            try:
+                self._fast_consume_whitespace(report=False)
+            except LexError:
+                # The error is in a comment, so locate it at the first comment.
+                match = _WHITESPACE.match(self._source, start)
+                self._index = start if match is None else match.end()
+            error.index = self.index
+            error.line, error.column = self.position(error.index)
+        return error
+
     def _advance(self, n: int = 1) -> None:
         # Don't check for end of source. This is checked by the lexer anyway
         self._index += n
@@ -120,7 +351,14 @@ class Lexer:
                 self._comment_block()
             else:
                 break
-        self._preceding_comments.append(self._source[start:self._index])
+        self._add_comments(self._source[start:self._index])
+
+    def _add_comments(self, comments: str) -> None:
+        # The list of comments is only allocated once the token has some.
+        if self._preceding_comments:
+            typing.cast(list[str], self._preceding_comments).append(comments)
+        else:
+            self._preceding_comments = [comments]
 
     def _consume_whitespace(self, report: bool = True) -> None:
         if report and self._peek().isspace():
@@ -132,7 +370,7 @@ class Lexer:
 
     def _is_reserved(self) -> bool:
         # Note: the check for "}" includes a closing "}~"
-        return self._check_any("~{", "'", '"', "{", "}", "(", ")", "#")
+        return self._check_any("~{", "'", '"', "{", "}", "(", ")", "[", "]", "#")
 
     def _is_symbolic(self) -> bool:
         if self._is_at_end():
@@ -160,47 +398,47 @@ class Lexer:
 
     def _string(self) -> str:
         opener: str = self._previous()
-        out_string: str = ""
+        parts: list[str] = []  # Joined at the end, to keep decoding linear in the length of the literal.
         start_index: int = self._index
         while not self._is_at_end():
             if self._match("\\"):
-                out_string += self._source[start_index:self._index - 1]
+                parts.append(self._source[start_index:self._index - 1])
                 start_index = self._index + 1  # Index of character after escape sequence
                 if self._check("\n"):
                     continue  # Handle the multiline string separately.
                 if self._match_any("'", '"', "\\"):
                     start_index -= 1  # Index of escaped character
                 elif self._match("n"):
-                    out_string += "\n"
+                    parts.append("\n")
                 elif self._match("r"):
-                    out_string += "\r"
+                    parts.append("\r")
                 elif self._match("t"):
-                    out_string += "\t"
+                    parts.append("\t")
                 elif self._match("v"):
-                    out_string += "\v"
+                    parts.append("\v")
                 elif self._match("f"):
-                    out_string += "\f"
+                    parts.append("\f")
                 elif self._match("a"):
-                    out_string += "\a"
+                    parts.append("\a")
                 elif self._match("b"):
-                    out_string += "\b"
+                    parts.append("\b")
                 elif self._match("x"):
-                    out_string += self._parse_hex(2)
+                    parts.append(self._parse_hex(2))
                     start_index += 2
                 elif self._match("u"):
-                    out_string += self._parse_hex(4)
+                    parts.append(self._parse_hex(4))
                     start_index += 4
                 elif self._match("U"):
-                    out_string += self._parse_hex(8)
+                    parts.append(self._parse_hex(8))
                     start_index += 8
                 else:
                     raise LexError("Invalid escape sequence.")
             elif self._match(opener):
-                out_string += self._source[start_index:self._index - 1]
-                return out_string  # End of string.
+                parts.append(self._source[start_index:self._index - 1])
+                return "".join(parts)  # End of string.
             elif self._match("\n"):
                 # Multiline string.
-                out_string += self._source[start_index:self._index]
+                parts.append(self._source[start_index:self._index])
                 self._consume_whitespace(report=False)
                 if self._match_any("'", '"'):
                     opener = self._previous()
@@ -216,12 +454,14 @@ class Lexer:
 
     def _comment_block(self) -> None:
         while not self._match("}~"):
+            if self._is_at_end():
+                raise LexError("Unterminated block comment.")
             if self._match("~{"):
                 self._comment_block()
             self._advance()
 
     def _comment_line(self) -> None:
-        while not self._check("\n"):
+        while not self._is_at_end() and not self._check("\n"):
             self._advance()
 
     def _symbol(self) -> None:
@@ -229,10 +469,345 @@ class Lexer:
             self._advance()
 
     def _parse_hex(self, length: int) -> str:
-        digits = self._source[self._index:self._index + length]
-        x = bytearray(4)
-        try:
-            x[4 - length//2:] = bytes.fromhex(digits)
-        except ValueError:
-            raise LexError(f"Invalid hex escape sequence in string literal '{digits}'")
+        return _decode_hex(self._source[self._index:self._index + length], length)
+
+    # Fast engine.
+    # Each method below mirrors one of the reference methods above, but scans whole runs of characters at once.
+
+    def _fast_next_token(self) -> Token:
+        if self._compiled:
+            return self._compiled_next_token()
+        self._has_whitespace_before = False
+        self._preceding_comments = _NO_COMMENTS
+        self._fast_consume_whitespace()
+        start = self._index
+        token_type, value = self._fast_scan(start, decode=True)
+        return Token(type=token_type,
+                     start_index=start,
+                     value=(value if value or token_type is TokenType.STRING else self._source[start:self._index]),
+                     has_whitespace_before=self._has_whitespace_before,
+                     preceding_comments=self._preceding_comments)
+
+    def _compiled_next_token(self) -> Token:
+        # Equivalent to `_fast_next_token()`, using the compiled accelerator.
+        code, start, end, value, whitespace, comments = _speedups.next_token(self._source, self._index)
+        self._has_whitespace_before = whitespace
+        self._index = end
+        self._preceding_comments = _NO_COMMENTS if comments is None else comments
+        if value is None:
+            value = self._source[start:end]
+            if self._intern_symbols and code == _COMPILED_SYMBOL:
+                value = sys.intern(value)
+        return Token(type=_COMPILED_TOKEN_TYPES[code],
+                     start_index=start,
+                     value=value,
+                     has_whitespace_before=self._has_whitespace_before,
+                     preceding_comments=self._preceding_comments)
+
+    def _fast_scan(self, start: int, decode: bool) -> tuple[TokenType, str]:
+        # Scan the token at `start`, returning its type and the decoded value of a string (if `decode` is true).
+        source = self._source
+        if start >= len(source):
+            # An empty token is returned if already at the end of tokens.
+            return TokenType.EMPTY, ""
+        c = source[start]
+        if c == "}" and source.startswith("~", start + 1):
+            raise LexError("Unmatched '}~'")
+        elif c == '"' or c == "'":
+            self._index = start + 1
+            return TokenType.STRING, (self._fast_string() if decode else self._fast_skip_string())
+        elif (end := self._fast_symbol_end(start)) > start:
+            self._index = end
+            return TokenType.SYMBOL, (sys.intern(source[start:end]) if self._intern_symbols and decode else "")
+        elif c in _PUNCTUATION:
+            self._index = start + 1
+            return _PUNCTUATION[c], ""
+        raise LexError(f"Invalid character {c}")
+
+    def _fast_consume_whitespace(self, report: bool = True) -> None:
+        source = self._source
+        match = _WHITESPACE.match(source, self._index)
+        if match is None:
+            return
+        if report:
+            self._has_whitespace_before = True
+        index = match.end()
+        while True:
+            # Comments are only recognised after whitespace.
+            if source.startswith("#", index) or source.startswith("~{", index):
+                index = self._fast_comments(index)
+            match = _WHITESPACE.match(source, index)
+            if match is None:
+                break
+            index = match.end()
+        self._index = index
+
+    def _fast_comments(self, index: int) -> int:
+        # Consume a run of adjacent comments starting at `index` and return the index after it.
+        source = self._source
+        start = index
+        while True:
+            if source.startswith("#", index):
+                index = source.find("\n", index)
+                if index < 0:
+                    index = len(source)
+            elif source.startswith("~{", index):
+                index = self._fast_comment_block(index + 2)
+            else:
+                break
+        self._add_comments(source[start:index])
+        return index
+
+    def _fast_comment_block(self, index: int) -> int:
+        # Consume the rest of a block comment opened just before `index`.
+        # This must agree with `_comment_block`, which steps over one extra character after a nested comment.
+        depth = 1
+        while True:
+            match = _BLOCK_COMMENT_DELIMITERS.search(self._source, index)
+            if match is None:
+                raise LexError("Unterminated block comment.")
+            index = match.end()
+            if match.group() == "~{":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 0:
+                return index
+            index += 1
+
+    def _fast_symbol_end(self, index: int) -> int:
+        match = _SYMBOL.match(self._source, index)
+        if match is None:
+            return index
+        symbol = match.group()
+        if symbol.isprintable():
+            return match.end()
+        # Stop at the first non-printable character.
+        for offset, c in enumerate(symbol):
+            if not c.isprintable():
+                return index + offset
+        raise AssertionError("unreachable")
+
+    def _fast_skip_string(self) -> str:
+        # Like `_fast_string()`, but only find the end of the string, without decoding or checking it.
+        source = self._source
+        index = self._index
+        opener = source[index - 1]
+        while True:
+            index = _STRING_SEGMENTS[opener].match(source, index).end()
+            if index >= len(source):
+                raise LexError("Unterminated string literal.")
+            c = source[index]
+            index += 1
+            if c == opener:
+                self._index = index
+                return ""  # End of string.
+            if c == "\\":
+                if not source.startswith("\n", index):
+                    index += 1  # Skip the escaped character.
+                    continue
+                index += 1
+            self._index = index
+            self._fast_consume_whitespace(report=False)
+            index = self._index
+            opener = source[index:index + 1]
+            if opener != '"' and opener != "'":
+                raise LexError("Unterminated string literal.")
+            index += 1
+
+    def _fast_string(self) -> str:
+        source = self._source
+        index = self._index
+        opener = source[index - 1]
+        parts: list[str] = []
+        while True:
+            segment = _STRING_SEGMENTS[opener].match(source, index).group()
+            if segment:
+                if not segment.isprintable():
+                    c = next(c for c in segment if not c.isprintable())
+                    raise LexError(f"Illegal character in string literal: {hex(ord(c))}")
+                parts.append(segment)
+                index += len(segment)
+            if index >= len(source):
+                raise LexError("Unterminated string literal.")
+            c = source[index]
+            index += 1
+            if c == opener:
+                self._index = index
+                return "".join(parts)  # End of string.
+            if c == "\\":
+                escape = source[index:index + 1]
+                if escape == "\n":
+                    # Escaped newline: the newline itself is dropped.
+                    index += 1
+                elif (match := _ESCAPE_RUN.match(source, index - 1)) and (run := _decode_escapes(match.group())):
+                    parts.append(run)
+                    index = match.end()
+                    continue
+                elif escape in _SIMPLE_ESCAPES:
+                    parts.append(_SIMPLE_ESCAPES[escape])
+                    index += 1
+                    continue
+                elif escape in _HEX_ESCAPE_LENGTHS:
+                    length = _HEX_ESCAPE_LENGTHS[escape]
+                    parts.append(_decode_hex(source[index + 1:index + 1 + length], length))
+                    index += 1 + length
+                    continue
+                else:
+                    raise LexError("Invalid escape sequence.")
+            else:
+                # Multiline string.
+                parts.append("\n")
+            self._index = index
+            self._fast_consume_whitespace(report=False)
+            index = self._index
+            opener = source[index:index + 1]
+            if opener != '"' and opener != "'":
+                raise LexError("Unterminated string literal.")
+            index += 1
+
+
+class _BufferedLexer(Lexer):
+    """Lexer reading its source through a bounded buffer (see `Lexer.from_file()`)."""
+    def __init__(self, file: Readable, chunk_size: int, encoding: str, fast: bool, intern_symbols: bool,
+                 compiled: bool) -> None:
+        super().__init__("", fast=fast, intern_symbols=intern_symbols, compiled=compiled)
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be positive.")
+        self._file = file
+        self._chunk_size = chunk_size
+        self._encoding = encoding
+        self._decoder: codecs.IncrementalDecoder | None = None
+        self._offset: int = 0  # Index of the start of the buffer within the whole source.
+        self._lines: int = 0  # Number of newlines before the buffer.
+        self._line_start: int = 0  # Index in the whole source of the start of the line the buffer starts in.
+        self._token_start: int = 0  # Index in the buffer of the last token lexed, which is kept for `position()`.
+        self._at_eof: bool = False
+
+    def __next__(self) -> Token:
+        self._fill()
+        return super().__next__()
+
+    def __bool__(self) -> bool:
+        self._fill()
+        return super().__bool__()
+
+    @property
+    def index(self) -> int:
+        return self._offset + self._index
+
+    @property
+    def line_index(self) -> LineIndex:
+        raise ValueError("A lexer reading from a file keeps no index of the lines of the whole source.")
+
+    def position(self, index: int) -> tuple[int, int]:
+        local = index - self._offset
+        if local > len(self._source):
+            raise ValueError(f"Index {index} is past the source read so far.")
+        if local > 0 and (newlines := self._source.count("\n", 0, local)):
+            return self._lines + newlines + 1, local - self._source.rfind("\n", 0, local)
+        if index < self._line_start:
+            raise ValueError(f"Index {index} is in source which has been discarded.")
+        return self._lines + 1, index - self._line_start + 1
+
+    def next_token(self) -> Token:
+        token = self._buffered(super().next_token)
+        self._token_start = token.start_index
+        token.start_index += self._offset
+        return token
+
+    def skip_token(self) -> TokenType:
+        token_type = self._buffered(super().skip_token)
+        self._token_start = self._index
+        return token_type
+
+    def skip_to_bracket(self) -> TokenType:
+        # Skip token by token, since a long run without brackets would otherwise have to be buffered in full.
+        while (token_type := self.skip_token()) not in _PUNCTUATION.values() and token_type:
+            pass
+        return token_type
+
+    def _buffered(self, lex: typing.Callable[[], T]) -> T:
+        # Call `lex` on the buffer, reading more source and trying again if it got as far as the end.
+        self._fill()
+        resume = self._index
+        while True:
+            try:
+                result = lex()
+            except LexError:
+                # The error may be caused by the buffer cutting off a token.
+                if self._at_eof:
+                    raise
+            else:
+                # A token reaching the end of the buffer might continue past it.
+                if self._at_eof or self._index < len(self._source):
+                    return result
+            self._index = resume
+            self._read(max(self._chunk_size, len(self._source)))
+
+    def _fill(self) -> None:
+        # Make sure at least a chunk of unconsumed source is buffered, discarding consumed source.
+        if self._at_eof or len(self._source) - self._index >= self._chunk_size:
+            return
+        self._discard()
+        self._read(self._chunk_size)
+
+    def _discard(self) -> None:
+        # Discard the source before the last token lexed, counting the lines in it.
+        keep = min(self._token_start, self._index)
+        if newlines := self._source.count("\n", 0, keep):
+            self._lines += newlines
+            self._line_start = self._offset + self._source.rfind("\n", 0, keep) + 1
+        self._offset += keep
+        self._source = self._source[keep:]
+        self._index -= keep
+        self._token_start = 0
+
+    def _read(self, size: int) -> None:
+        data = self._file.read(size)
+        if not data:
+            self._at_eof = True
+        if not isinstance(data, str):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder(self._encoding)()
+            data = self._decoder.decode(data, final=self._at_eof)
+        self._source += data
+
+
+def _decode_hex(digits: str, length: int) -> str:
+    # Decode the hex digits of a `\x`, `\u` or `\U` escape sequence.
+    # Note: `bytes.fromhex` would skip whitespace, so the digits are checked first.
+    if len(digits) != length or _HEX_DIGITS.fullmatch(digits) is None:
+        raise LexError(f"Invalid hex escape sequence in string literal '{digits}'")
+    x = bytearray(4)
+    x[4 - length//2:] = bytes.fromhex(digits)
+    try:
         return x.decode(encoding="utf-32-be")
+    except UnicodeDecodeError:
+        raise LexError(f"Invalid code point in string literal '{digits}'") from None  # A surrogate, or too large.
+
+
+def _decode_escapes(run: str) -> str | None:
+    # Decode a run of escape sequences in bulk, or return None if it should be decoded one escape at a time
+    # (which raises the appropriate error).
+    try:
+        decoded = run.encode("ascii").decode("unicode_escape")
+    except UnicodeDecodeError:
+        return None  # Code point out of range.
+    if _SURROGATES.search(decoded):
+        return None
+    return decoded
+
+
+try:
+    from . import _speedups
+except ImportError:
+    _speedups = None
+else:
+    _speedups.configure(LexError, _decode_hex)
+
+# Token types by their code in the compiled accelerator.
+_COMPILED_TOKEN_TYPES = (TokenType.EMPTY, TokenType.STRING, TokenType.SYMBOL, TokenType.LEFT_BRACE,
+                         TokenType.RIGHT_BRACE, TokenType.LEFT_BRACKET, TokenType.RIGHT_BRACKET,
+                         TokenType.LEFT_SQUARE_BRACKET, TokenType.RIGHT_SQUARE_BRACKET)
+_COMPILED_SYMBOL = _COMPILED_TOKEN_TYPES.index(TokenType.SYMBOL)
@@ -1,35 +1,417 @@
 """Parse Beech source code into a Beech Tree object."""
 from __future__ import annotations
 
+import enum
+import typing
+
 from .errors import ParseError
-from .lexer import Lexer, Token, TokenType
-from .beech_types import Tree, Key, Value, List, Symbol
+from .lexer import DEFAULT_CHUNK_SIZE, Lexer, Readable, Token, TokenType
+from .beech_types import Tree, Key, Value, List, OrderedTree, Symbol
+from .transformer import Mode, Transform
+
+
+class EventType(enum.Enum):
+    """Enum for the type of a parse event."""
+    START_TREE = "start of tree"
+    END_TREE = "end of tree"
+    START_LIST = "start of list"
+    END_LIST = "end of list"
+    START_ORDERED_TREE = "start of ordered tree"
+    END_ORDERED_TREE = "end of ordered tree"
+    KEY = "key"
+    VALUE = "scalar value"
+
+
+class Event(typing.NamedTuple):
+    """A parse event, as yielded by `Parser.events()`.
+
+    The value is the key for a KEY event, the string or symbol for a VALUE event and None otherwise.
+    """
+    type: EventType
+    value: Key | None = None
+
+
+# A path to a value: either keys separated by "/", or a tuple of keys.
+Path = typing.Union[str, tuple[str, ...]]
+# A trie of paths. The paths which end at a node are listed under the `None` key.
+_PathTrie = dict[typing.Optional[str], typing.Any]
+
+# A frame of `Parser.events()` (see there).
+_Frame = typing.Union[set[Key], type[list], type[OrderedTree], None]
+
+_MISSING: typing.Any = object()
+
+_CLOSERS = {
+    TokenType.LEFT_BRACE: TokenType.RIGHT_BRACE,
+    TokenType.LEFT_BRACKET: TokenType.RIGHT_BRACKET,
+    TokenType.LEFT_SQUARE_BRACKET: TokenType.RIGHT_SQUARE_BRACKET,
+}
+# The type of container opened by each opening bracket.
+_CONTAINERS: dict[TokenType, type] = {
+    TokenType.LEFT_BRACE: dict,
+    TokenType.LEFT_BRACKET: list,
+    TokenType.LEFT_SQUARE_BRACKET: OrderedTree,
+}
+
+class SymbolTable:
+    """A table of interned symbols, so that equal symbols share a single `Symbol` object.
+
+    A table can be shared between several parsers. It counts how many symbols were found in it (hits) and
+    how many had to be added to it (misses).
+    """
+    def __init__(self) -> None:
+        self._symbols: dict[str, Symbol] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, text: str) -> bool:
+        return text in self._symbols
+
+    def symbol(self, text: str) -> Symbol:
+        """Return the symbol with the given text, adding it to the table if it isn't there already."""
+        symbol = self._symbols.get(text)
+        if symbol is None:
+            self.misses += 1
+            symbol = self._symbols[text] = Symbol(text)
+        else:
+            self.hits += 1
+        return symbol
+
+    def clear(self) -> None:
+        """Remove every symbol from the table and reset the statistics."""
+        self._symbols.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+_START_TREE = Event(EventType.START_TREE)
+_END_TREE = Event(EventType.END_TREE)
+_START_LIST = Event(EventType.START_LIST)
+_END_LIST = Event(EventType.END_LIST)
+_START_ORDERED_TREE = Event(EventType.START_ORDERED_TREE)
+_END_ORDERED_TREE = Event(EventType.END_ORDERED_TREE)
 
 
 class Parser:
-    def __init__(self, source: str):
-        self._lexer = Lexer(source)
+    """A class to parse Beech source code.
+
+    By default, nested trees and lists are parsed recursively. Passing `iterative=True` selects a parser driven by
+    an explicit stack instead, which gives the same results and errors but has no limit on nesting depth.
+
+    Passing `intern_symbols=True` interns the text of every symbol (see `Lexer`). Passing a `symbol_table` goes
+    further, so that equal symbols are parsed as the same `Symbol` object.
+
+    Symbols and strings can be transformed as they are parsed, by passing `transform_symbol` and `transform_string`
+    rules or a `mode` which bundles them (rules passed directly take precedence). This builds the same tree as
+    transforming the parsed tree with `transformer()`, but in a single pass.
+
+    Every `ParseError` is given the position of the token at which it occurred (for a duplicate key, the key).
+
+    The source is either source code or a `Lexer` over it (such as one from `Lexer.from_file()`). A lexer is used as
+    it is, so `fast_lexer` and `intern_symbols` must then be passed to the lexer instead, and passing either of them
+    to the parser raises TypeError.
+    """
+    def __init__(self, source: str | Lexer, fast_lexer: bool | None = None, iterative: bool = False,
+                 intern_symbols: bool | None = None, symbol_table: SymbolTable | None = None,
+                 transform_symbol: Transform[Symbol] | None = None, transform_string: Transform[str] | None = None,
+                 mode: Mode | None = None):
+        if isinstance(source, Lexer):
+            if fast_lexer is not None or intern_symbols is not None:
+                raise TypeError("Pass fast_lexer and intern_symbols to the lexer, not to a parser given a lexer.")
+            self._lexer = source
+        else:
+            self._lexer = Lexer(source, fast=True if fast_lexer is None else fast_lexer,
+                                intern_symbols=False if intern_symbols is None else intern_symbols)
+        self._iterative = iterative
+        if mode is not None:
+            transform_symbol = transform_symbol or mode.transform_symbol
+            transform_string = transform_string or mode.transform_string
+        make_symbol: typing.Callable[[str], Symbol] = Symbol if symbol_table is None else symbol_table.symbol
+        if transform_symbol is not None:
+            self._symbol: typing.Callable[[str], Symbol] = lambda text: transform_symbol(make_symbol(text))
+        else:
+            self._symbol = make_symbol
+        # Note: `str` returns a string unchanged, and is cheaper to call than an identity function.
+        self._string: Transform[str] = str if transform_string is None else transform_string
         self._current_token: Token = self._lexer.next_token()  # Start with the first token.
         self._previous_token: Token = Token.empty()  # Initialise with an empty token to avoid using None.
-        self._current_tree: Tree | List = {}
+        self._current_tree: Tree | List | OrderedTree = {}
+
+    @classmethod
+    def from_file(cls, file: Readable, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  encoding: str = "utf-8", fast_lexer: bool = True, iterative: bool = False,
+                  intern_symbols: bool = False, symbol_table: SymbolTable | None = None,
+                  transform_symbol: Transform[Symbol] | None = None, transform_string: Transform[str] | None = None,
+                  mode: Mode | None = None) -> Parser:
+        """Return a parser which reads its source incrementally from `file` (see `Lexer.from_file()`)."""
+        return cls(Lexer.from_file(file, chunk_size, encoding, fast=fast_lexer, intern_symbols=intern_symbols),
+                   iterative=iterative, symbol_table=symbol_table, transform_symbol=transform_symbol,
+                   transform_string=transform_string, mode=mode)
+
+    @property
+    def token_index(self) -> int:
+        """Index in the source of the last token parsed, such as the key or value of the latest event from `events()`.
+
+        Pass it to `position()` to find its line and column.
+        """
+        return self._previous_token.start_index
+
+    def position(self, index: int) -> tuple[int, int]:
+        """Return the line and column (numbered from 1) of an index into the source (see `Lexer.position()`)."""
+        return self._lexer.position(index)
 
     def parse(self) -> Tree:
         """Parse the source code."""
+        if self._iterative:
+            return self._parse_iterative()
         return self._beech()
 
+    def _parse_iterative(self) -> Tree:
+        # Equivalent to `_beech()`, but keeps the unfinished trees and lists on a stack instead of recursing.
+        # Token types are compared directly rather than through `_match()` to keep the loop tight.
+        symbol, string = TokenType.SYMBOL, TokenType.STRING
+        make_symbol, make_string = self._symbol, self._string
+        root: Tree = {}
+        stack: list[Tree | List | OrderedTree] = [root]
+        keys: list[Key] = []  # The current key of each unfinished tree.
+        key_indices: list[int] = []  # The index in the source of each key in `keys`, to report duplicates.
+        container: Tree | List | OrderedTree = root
+        value: Value
+        while True:
+            token_type = self._current_token.type
+            if type(container) is list:
+                closed = token_type is TokenType.RIGHT_BRACKET or token_type is TokenType.EMPTY
+                if closed:
+                    self._expect(TokenType.RIGHT_BRACKET)
+            elif token_type is symbol or token_type is string:
+                self._advance()
+                keys.append(make_symbol(self._previous_token.value) if token_type is symbol
+                            else make_string(self._previous_token.value))
+                key_indices.append(self._previous_token.start_index)
+                self._expect_whitespace()
+                closed = False
+            else:
+                # End of tree.
+                if container is root:
+                    return root
+                self._expect(TokenType.RIGHT_BRACE if type(container) is dict else TokenType.RIGHT_SQUARE_BRACKET)
+                closed = True
+
+            if closed:
+                value = stack.pop()
+                container = stack[-1]
+            else:
+                token_type = self._current_token.type
+                if token_type is string:
+                    self._advance()
+                    value = make_string(self._previous_token.value)
+                elif token_type is symbol:
+                    self._advance()
+                    value = make_symbol(self._previous_token.value)
+                elif token_type in _CONTAINERS:
+                    self._advance()
+                    container = _CONTAINERS[token_type]()
+                    stack.append(container)
+                    continue
+                else:
+                    raise self._error(f"Unexpected token {self._current_token}")
+
+            token_type = self._current_token.type
+            if type(container) is list:
+                container.append(value)
+                if token_type is not TokenType.RIGHT_BRACKET:
+                    self._expect_whitespace()
+            else:
+                key = keys.pop()
+                key_index = key_indices.pop()
+                if type(container) is dict:
+                    if key in container:
+                        raise self._error("Keys in a tree must be unique.", key_index)
+                    container[key] = value
+                else:
+                    # Keys may be repeated in an ordered tree.
+                    typing.cast(OrderedTree, container).append(key, value)
+                if token_type is symbol or token_type is string:
+                    # If we're not at the end of the tree, expect whitespace before the next key.
+                    self._expect_whitespace()
+
+    def events(self, check_duplicates: bool = True) -> typing.Iterator[Event]:
+        """Parse the source code incrementally, yielding an event for each part of the tree.
+
+        The whole document is reported as a tree, so the first event is always START_TREE. Every START_TREE,
+        START_LIST and START_ORDERED_TREE event is matched by the corresponding END event, and within a tree or
+        ordered tree each KEY event is followed by the events for its value. The same errors are raised as by
+        `parse()`.
+
+        :param check_duplicates: (optional) whether to check for duplicate keys, which means remembering the keys
+          of every unfinished tree (keys may be repeated in an ordered tree, so those are never checked)
+
+        :return: iterator over the parse events
+        """
+        # Each frame is the set of keys seen so far in an unfinished tree (None if not checked),
+        # or the `list` or `OrderedTree` type for an unfinished list or ordered tree.
+        frames: list[_Frame] = [set() if check_duplicates else None]
+        keys: list[tuple[Key, int]] = []  # The current key of each unfinished tree, with its index in the source.
+        yield _START_TREE
+        while frames:
+            frame = frames[-1]
+            if frame is list:
+                if self._check_any(TokenType.RIGHT_BRACKET, TokenType.EMPTY):
+                    self._expect(TokenType.RIGHT_BRACKET)
+                    frames.pop()
+                    yield _END_LIST
+                    self._end_value(frames, keys)
+                    continue
+            else:
+                key: Key
+                if self._match(TokenType.SYMBOL):
+                    key = self._symbol(self._previous_token.value)
+                elif self._match(TokenType.STRING):
+                    key = self._string(self._previous_token.value)
+                else:
+                    # End of tree.
+                    frames.pop()
+                    if not frames:
+                        yield _END_TREE  # The top-level tree has no closing brace.
+                        return
+                    if frame is OrderedTree:
+                        self._expect(TokenType.RIGHT_SQUARE_BRACKET)
+                        yield _END_ORDERED_TREE
+                    else:
+                        self._expect(TokenType.RIGHT_BRACE)
+                        yield _END_TREE
+                    self._end_value(frames, keys)
+                    continue
+                key_index = self._previous_token.start_index
+                yield Event(EventType.KEY, key)
+                self._expect_whitespace()
+                keys.append((key, key_index))
+
+            if self._match(TokenType.STRING):
+                yield Event(EventType.VALUE, self._string(self._previous_token.value))
+                self._end_value(frames, keys)
+            elif self._match(TokenType.SYMBOL):
+                yield Event(EventType.VALUE, self._symbol(self._previous_token.value))
+                self._end_value(frames, keys)
+            elif self._match(TokenType.LEFT_BRACE):
+                frames.append(set() if check_duplicates else None)
+                yield _START_TREE
+            elif self._match(TokenType.LEFT_BRACKET):
+                frames.append(list)
+                yield _START_LIST
+            elif self._match(TokenType.LEFT_SQUARE_BRACKET):
+                frames.append(OrderedTree)
+                yield _START_ORDERED_TREE
+            else:
+                raise self._error(f"Unexpected token {self._current_token}")
+
+    def query(self, paths: typing.Iterable[Path]) -> dict[Path, Value]:
+        """Extract the values at the given paths in a single pass over the source code.
+
+        Each path is a sequence of keys leading down from the top-level tree through trees and ordered trees,
+        matched against the text of symbol and string keys alike. Subtrees which do not lead to a path are skipped
+        over by matching brackets, without building their values or decoding their strings, and parsing stops once
+        every path has been found. Errors are only reported for the parts of the source which are actually parsed,
+        and duplicate keys are not checked: the first occurrence of a key is used (as in an ordered tree).
+
+        :param paths: paths to extract, given either as a string of keys separated by "/" or as a tuple of keys
+
+        :return: dictionary mapping each path which was found to its value
+        """
+        trie: _PathTrie = {}
+        for path in paths:
+            node = trie
+            for key in (path.split("/") if isinstance(path, str) else path):
+                node = node.setdefault(key, {})
+            ends = node.setdefault(None, [])
+            if path not in ends:
+                ends.append(path)
+        results: dict[Path, Value] = {}
+        self._query_tree(trie, results, _count_paths(trie))
+        return results
+
+    def _query_tree(self, trie: _PathTrie, results: dict[Path, Value], total: int) -> bool:
+        # Search the tree at the current token for the paths in `trie`, returning True once all paths are found.
+        seen: set[str] = set()
+        while True:
+            if not self._match_any(TokenType.SYMBOL, TokenType.STRING):
+                return False  # End of tree.
+            key = self._previous_token.value
+            self._expect_whitespace()
+            node = trie.get(key)
+            if node is None or key in seen:
+                self._skip_value()
+                node = None
+            elif None in node:
+                value = self._value()
+                _lookup_paths(value, node, results)
+            elif self._check_any(TokenType.LEFT_BRACE, TokenType.LEFT_SQUARE_BRACKET):
+                closer = _CLOSERS[self._current_token.type]
+                self._advance()
+                if self._query_tree(node, results, total):
+                    return True
+                self._expect(closer)
+            else:
+                self._skip_value()
+            if node is not None:
+                seen.add(key)
+            if len(results) == total:
+                return True
+            if self._check_any(TokenType.SYMBOL, TokenType.STRING):
+                self._expect_whitespace()
+
+    def _skip_value(self) -> None:
+        # Skip over the value at the current token without building it.
+        if self._match_any(TokenType.SYMBOL, TokenType.STRING):
+            return
+        if self._current_token.type not in _CLOSERS:
+            raise self._error(f"Unexpected token {self._current_token}")
+        closers = [_CLOSERS[self._current_token.type]]
+        while closers:
+            token_type = self._lexer.skip_to_bracket()
+            if token_type in _CLOSERS:
+                closers.append(_CLOSERS[token_type])
+            else:
+                expected = closers.pop()
+                if token_type != expected:
+                    # Locate the error at the bracket just skipped (or the end of the source).
+                    raise self._error(f"Expected {expected} but got {token_type}",
+                                      self._lexer.index - (1 if token_type else 0))
+        self._current_token = self._lexer.next_token()
+
+    def _end_value(self, frames: list[_Frame], keys: list[tuple[Key, int]]) -> None:
+        # Finish a value in the innermost unfinished container, as `_beech()`, `_list()` or `_ordered_tree()` would.
+        frame = frames[-1]
+        if frame is list:
+            if not self._check(TokenType.RIGHT_BRACKET):
+                self._expect_whitespace()
+            return
+        key, key_index = keys.pop()
+        if type(frame) is set:
+            if key in frame:
+                raise self._error("Keys in a tree must be unique.", key_index)
+            frame.add(key)
+        if self._check_any(TokenType.SYMBOL, TokenType.STRING):
+            # If we're not at the end of the tree, expect whitespace before the next key.
+            self._expect_whitespace()
+
     def _beech(self) -> Tree:
         while not self._check(TokenType.EMPTY):
             key: Key
             if self._match(TokenType.SYMBOL):
-                key = Symbol(self._previous_token.value)
+                key = self._symbol(self._previous_token.value)
             elif self._match(TokenType.STRING):
-                key = self._previous_token.value
+                key = self._string(self._previous_token.value)
             else:
                 break  # End of tree.
+            key_index = self._previous_token.start_index
             self._expect_whitespace()
             value = self._value()
             if key in self._current_tree:
-                raise ParseError("Keys in a tree must be unique.")
+                raise self._error("Keys in a tree must be unique.", key_index)
             self._current_tree[key] = value
             if self._check_any(TokenType.SYMBOL, TokenType.STRING):
                 # If we're not at the end of the tree, expect whitespace before the next key.
@@ -57,17 +439,48 @@ class Parser:
         self._current_tree = previous_tree
         return new_list
 
+    def _ordered_tree(self) -> OrderedTree:
+        # Unlike `_beech()`, keys may be repeated, so the tree is not checked for duplicates.
+        new_tree = OrderedTree()
+        while True:
+            key: Key
+            if self._match(TokenType.SYMBOL):
+                key = self._symbol(self._previous_token.value)
+            elif self._match(TokenType.STRING):
+                key = self._string(self._previous_token.value)
+            else:
+                break  # End of tree.
+            self._expect_whitespace()
+            new_tree.append(key, self._value())
+            if self._check_any(TokenType.SYMBOL, TokenType.STRING):
+                # If we're not at the end of the tree, expect whitespace before the next key.
+                self._expect_whitespace()
+        self._expect(TokenType.RIGHT_SQUARE_BRACKET)
+        return new_tree
+
     def _value(self) -> Value:
         if self._match(TokenType.STRING):
-            return self._previous_token.value
+            return self._string(self._previous_token.value)
         elif self._match(TokenType.SYMBOL):
-            return Symbol(self._previous_token.value)
+            return self._symbol(self._previous_token.value)
         elif self._match(TokenType.LEFT_BRACE):
             return self._tree()
         elif self._match(TokenType.LEFT_BRACKET):
             return self._list()
+        elif self._match(TokenType.LEFT_SQUARE_BRACKET):
+            return self._ordered_tree()
         else:
-            raise ParseError(f"Unexpected token {self._current_token}")
+            raise self._error(f"Unexpected token {self._current_token}")
+
+    def _error(self, message: str, index: int | None = None) -> ParseError:
+        # Return an error located at `index`, or else at the current token.
+        if index is None:
+            index = self._current_token.start_index
+        try:
+            line, column = self._lexer.position(index)
+        except ValueError:
+            return ParseError(message, index)  # In source a lexer reading from a file has discarded.
+        return ParseError(message, index, line, column)
 
     def _advance(self):
         self._previous_token = self._current_token
@@ -75,11 +488,11 @@ class Parser:
 
     def _expect(self, token_type: TokenType) -> None:
         if not self._match(token_type):
-            raise ParseError(f"Expected {token_type} but got {self._current_token.type}")
+            raise self._error(f"Expected {token_type} but got {self._current_token.type}")
 
     def _expect_whitespace(self) -> None:
         if not self._current_token.has_whitespace_before:
-            raise ParseError(f"Expect whitespace before {self._current_token.type}")
+            raise self._error(f"Expect whitespace before {self._current_token.type}")
 
     def _check(self, token_type: TokenType) -> bool:
         return self._current_token.type == token_type
@@ -87,9 +500,64 @@ class Parser:
     def _check_any(self, *types: TokenType) -> bool:
         return any(self._check(t) for t in types)
 
+    def _match_any(self, *types: TokenType) -> bool:
+        return any(self._match(t) for t in types)
+
     def _match(self, token_type: TokenType) -> bool:
         if not self._check(token_type):
             return False
 
         self._advance()
         return True
+
+
+def iter_events(source: str | Lexer, check_duplicates: bool = True) -> typing.Iterator[Event]:
+    """Parse Beech source code incrementally (see `Parser.events()`)."""
+    return Parser(source).events(check_duplicates)
+
+
+def query(source: str | Lexer, path: Path, default: Value = _MISSING) -> Value:
+    """Extract the value at `path` from Beech source code without parsing the rest of it (see `Parser.query()`).
+
+    :param source: source code, or a lexer over it
+    :param path: keys leading to the value, either separated by "/" or as a tuple
+    :param default: (optional) value to return if there is no value at `path`
+
+    :return: value at `path`
+
+    :raises KeyError: if there is no value at `path` and no default is given
+    """
+    results = Parser(source).query([path])
+    if path in results:
+        return results[path]
+    if default is _MISSING:
+        raise KeyError(path)
+    return default
+
+
+def query_all(source: str | Lexer, paths: typing.Iterable[Path]) -> dict[Path, Value]:
+    """Extract the values at several paths from Beech source code in a single pass (see `Parser.query()`)."""
+    return Parser(source).query(paths)
+
+
+def _count_paths(trie: _PathTrie) -> int:
+    return sum(len(node) if key is None else _count_paths(node) for key, node in trie.items())
+
+
+def _lookup_paths(value: Value, trie: _PathTrie, results: dict[Path, Value]) -> None:
+    # Record the paths in `trie` which can be found in an already built value.
+    for path in trie.get(None, ()):
+        results.setdefault(path, value)
+    if not isinstance(value, (dict, OrderedTree)):
+        return
+    # Only the first occurrence of each key text is used, as in `Parser._query_tree()`: a key may be repeated in an
+    # ordered tree, and a tree may have both a symbol and a string key with the same text.
+    seen: set[str] = set()
+    for key, child in value.items():
+        text = str(key)
+        if text in seen:
+            continue
+        seen.add(text)
+        node = trie.get(text)
+        if node is not None:
+            _lookup_paths(child, node, results)
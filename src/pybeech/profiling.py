@@ -0,0 +1,171 @@
+"""Profile where the time goes when lexing and parsing Beech source code.
+
+Instrumentation is opt-in: it lives in `InstrumentedLexer`, a subclass of `Lexer`, so the ordinary `Lexer` and
+`Parser` are not slowed down at all when it is not used.
+"""
+from __future__ import annotations
+
+import collections
+from dataclasses import dataclass, field
+import re
+import time
+
+from .beech_types import Symbol, Tree
+from .lexer import Lexer, Token, TokenType
+from .parser import Parser, SymbolTable
+from .transformer import Mode, Transform
+
+# Phases of lexing which are timed separately. The rest of the time in the lexer is counted as "other".
+PHASES = ("whitespace and comments", "strings", "symbols")
+
+_OPENERS = (TokenType.LEFT_BRACE, TokenType.LEFT_BRACKET, TokenType.LEFT_SQUARE_BRACKET)
+_CLOSERS = (TokenType.RIGHT_BRACE, TokenType.RIGHT_BRACKET, TokenType.RIGHT_SQUARE_BRACKET)
+# An escape sequence in the raw text of a string literal (only its first character after the backslash).
+_ESCAPE = re.compile(r"\\.", re.DOTALL)
+
+
+@dataclass
+class LexerStats:
+    """Counters and timings collected by an `InstrumentedLexer`.
+
+    Sizes are in characters of source code. Payload is the text of the tokens themselves, as opposed to comments
+    and whitespace.
+    """
+    token_counts: collections.Counter[TokenType] = field(default_factory=collections.Counter)
+    payload_chars: int = 0
+    comment_chars: int = 0
+    escapes: int = 0
+    max_depth: int = 0
+    lexer_seconds: float = 0.0
+    phase_seconds: dict[str, float] = field(default_factory=lambda: dict.fromkeys(PHASES, 0.0))
+
+    @property
+    def tokens(self) -> int:
+        return sum(self.token_counts.values())
+
+
+class InstrumentedLexer(Lexer):
+    """A lexer which collects `LexerStats` as it lexes.
+
+    It always uses the pure Python fast engine, whose phases can be timed separately. Pass it to `Parser` to
+    profile parsing as well (see `profile()`). Timing every phase of every token makes lexing noticeably slower,
+    so the timings are best compared with each other rather than with an ordinary lexer.
+    """
+    def __init__(self, source: str, intern_symbols: bool = False) -> None:
+        super().__init__(source, fast=True, intern_symbols=intern_symbols, compiled=False)
+        self.stats = LexerStats()
+        self._depth = 0
+        # The spans of whitespace and comments between the lines of the string literal being lexed, if any.
+        self._string_gaps: list[tuple[int, int]] | None = None
+        self._gap_chars = 0  # Number of characters in such spans in the last token.
+
+    def next_token(self) -> Token:
+        self._gap_chars = 0
+        start = time.perf_counter()
+        token = super().next_token()
+        stats = self.stats
+        stats.lexer_seconds += time.perf_counter() - start
+        token_type = token.type
+        stats.token_counts[token_type] += 1
+        stats.payload_chars += self._index - token.start_index - self._gap_chars
+        if token_type in _OPENERS:
+            self._depth += 1
+            stats.max_depth = max(stats.max_depth, self._depth)
+        elif token_type in _CLOSERS:
+            self._depth -= 1
+        return token
+
+    def _add_comments(self, comments: str) -> None:
+        self.stats.comment_chars += len(comments)
+        super()._add_comments(comments)
+
+    def _fast_consume_whitespace(self, report: bool = True) -> None:
+        if not report:
+            start_index = self._index
+            super()._fast_consume_whitespace(report)
+            if self._string_gaps is not None:
+                # Whitespace and comments between the lines of a string literal are not part of its payload.
+                self._string_gaps.append((start_index, self._index))
+            return
+        start = time.perf_counter()
+        super()._fast_consume_whitespace(report)
+        self.stats.phase_seconds["whitespace and comments"] += time.perf_counter() - start
+
+    def _fast_string(self) -> str:
+        start_index = self._index
+        gaps = self._string_gaps = []
+        start = time.perf_counter()
+        try:
+            value = super()._fast_string()
+        finally:
+            self._string_gaps = None
+        self.stats.phase_seconds["strings"] += time.perf_counter() - start
+        # Count the escape sequences in each line of the literal, leaving out the whitespace and comments between.
+        for gap_start, gap_end in gaps:
+            self.stats.escapes += len(_ESCAPE.findall(self._source, start_index, gap_start))
+            self._gap_chars += gap_end - gap_start
+            start_index = gap_end
+        self.stats.escapes += len(_ESCAPE.findall(self._source, start_index, self._index))
+        return value
+
+    def _fast_symbol_end(self, index: int) -> int:
+        start = time.perf_counter()
+        end = super()._fast_symbol_end(index)
+        self.stats.phase_seconds["symbols"] += time.perf_counter() - start
+        return end
+
+
+@dataclass
+class Profile:
+    """The result of `profile()`: the parsed tree, with the lexer's statistics and the time taken."""
+    tree: Tree
+    stats: LexerStats
+    source_chars: int
+    parse_seconds: float
+
+    @property
+    def tree_seconds(self) -> float:
+        """Time spent in the parser outside the lexer, building the tree (and transforming its values)."""
+        return max(self.parse_seconds - self.stats.lexer_seconds, 0.0)
+
+    def report(self) -> str:
+        """Return a human-readable report of the profile."""
+        stats = self.stats
+        other_chars = self.source_chars - stats.payload_chars - stats.comment_chars
+        lexer_other = stats.lexer_seconds - sum(stats.phase_seconds.values())
+        lines = [
+            f"source: {self.source_chars} characters",
+            f"  payload: {stats.payload_chars} ({_share(stats.payload_chars, self.source_chars)})",
+            f"  comments: {stats.comment_chars} ({_share(stats.comment_chars, self.source_chars)})",
+            f"  whitespace: {other_chars} ({_share(other_chars, self.source_chars)})",
+            f"tokens: {stats.tokens}",
+        ]
+        lines += [f"  {token_type.name.lower()}: {count}" for token_type, count in stats.token_counts.most_common()]
+        lines += [
+            f"escapes decoded: {stats.escapes}",
+            f"maximum nesting depth: {stats.max_depth}",
+            f"time: {self.parse_seconds:.4f}s",
+        ]
+        phases = {**{f"lex {name}": t for name, t in stats.phase_seconds.items()},
+                  "lex other": max(lexer_other, 0.0), "build tree": self.tree_seconds}
+        lines += [f"  {name}: {t:.4f}s ({_share(t, self.parse_seconds)})" for name, t in phases.items()]
+        return "\n".join(lines)
+
+
+def profile(source: str, iterative: bool = False, intern_symbols: bool = False,
+            symbol_table: SymbolTable | None = None, transform_symbol: Transform[Symbol] | None = None,
+            transform_string: Transform[str] | None = None, mode: Mode | None = None) -> Profile:
+    """Parse the source with an `InstrumentedLexer` and return its profile.
+
+    The arguments are the same as for `Parser`.
+    """
+    lexer = InstrumentedLexer(source, intern_symbols=intern_symbols)
+    start = time.perf_counter()
+    parser = Parser(lexer, iterative=iterative, symbol_table=symbol_table, transform_symbol=transform_symbol,
+                    transform_string=transform_string, mode=mode)
+    tree = parser.parse()
+    return Profile(tree, lexer.stats, len(source), time.perf_counter() - start)
+
+
+def _share(part: float, total: float) -> str:
+    return f"{part / total:.1%}" if total else "-"
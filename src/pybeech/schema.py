@@ -0,0 +1,325 @@
+"""Decode Beech source code straight into typed values, as described by a schema."""
+from __future__ import annotations
+
+import inspect
+import types
+import typing
+
+from .beech_types import Key, Symbol, Tree, Value
+from .default_mode.extension_types import Date, DateTime, Time
+from .default_mode.symbol_parser import (DEFAULT_MODE, DateSymbol, DateTimeSymbol, NumberSymbol, TextSymbol,
+                                         TimeSymbol, classify, parse_date, parse_date_time, parse_number, parse_time)
+from .errors import SchemaError
+from .lexer import Lexer, TokenType
+from .parser import Parser
+
+# A compiled part of a schema, which decodes the value at the decoder's current token and moves past it.
+_Decode = typing.Callable[["_Decoder"], typing.Any]
+
+
+class Schema:
+    """A schema for Beech documents, compiled into a decoder which converts each value straight into its type.
+
+    Parsing a document in default mode tries to convert every symbol, keys included, into a number, date or time,
+    and leaves any checking of the result to the caller. A schema instead says which keys a tree has and what type
+    each value is, so the decoder converts each symbol once into that type (or reports a `SchemaError` with the path
+    to it), and skips over the values of any other keys without building them.
+
+    A schema is either a record class, or a tree as parsed from Beech source code (see `from_source()`).
+
+    In a record class, each parameter of the constructor (such as each field of a dataclass or named tuple) is a key
+    of the tree, and the annotation of the field of that name on the class is the type of the value:
+
+    - `str` for a string, `int` for a number, and `Date`, `Time` or `DateTime` for a date or time
+    - `Symbol` for any symbol, in default mode, or `TextSymbol`, `NumberSymbol`, `DateSymbol`, `TimeSymbol` or
+      `DateTimeSymbol` for that kind of symbol
+    - `typing.Any` for any value, in default mode
+    - `list[T]` for a list of values of type `T`, and another record class for a nested tree
+
+    The record is built by passing the values as keyword arguments, so it can be a dataclass with `slots=True` to
+    keep it small. A key is optional if its parameter has a default, or if it is annotated as `Optional` (in which
+    case None is passed when it is missing).
+
+    In a tree, each value names the type of the value of its key: `string`, `text` (a `TextSymbol`), `symbol` (any
+    symbol, in default mode), `number`, `date`, `time`, `date-time` (as the symbols of default mode) or `any`. A
+    nested tree describes a nested tree, and a list of a single type a list of values of that type. A key ending
+    with `?` is optional. The keys of the decoded tree are as in default mode, whether the schema spells them as
+    symbols or strings: a symbol key in the document comes out as its default mode symbol (such as a `TextSymbol`,
+    or a `NumberSymbol` for `1`), and a string key as a `str`. For example::
+
+        sensor text
+        readings ({at date-time value number note? string})
+
+    Keys are matched by their text, whether they are symbols or strings, so a key may only occur once in either form.
+    Unknown keys are not checked for duplicates.
+
+    :param spec: record class, or tree describing the document
+    :param skip_unknown: (optional) whether to skip keys which are not in the schema, rather than raise an error
+    """
+    def __init__(self, spec: type | Tree, skip_unknown: bool = True) -> None:
+        self._skip_unknown = skip_unknown
+        self._records: dict[type, _Record] = {}
+        if isinstance(spec, dict):
+            self._root = self._compile_tree(spec)
+        elif isinstance(spec, type):
+            self._root = self._compile_class(spec)
+        else:
+            raise TypeError(f"Expected a record class or a tree as the schema, but got {spec!r}")
+
+    @classmethod
+    def from_source(cls, source: str, skip_unknown: bool = True) -> Schema:
+        """Return the schema described by Beech source code (see `Schema`)."""
+        return cls(Parser(source).parse(), skip_unknown)
+
+    def decode(self, source: str | Lexer) -> typing.Any:
+        """Decode Beech source code according to the schema.
+
+        Pass a lexer from `Lexer.from_file()` to decode a file as it is read.
+
+        :param source: source code, or a lexer over it
+
+        :return: decoded record or tree
+
+        :raises SchemaError: if a value does not match the schema, or a key in it is missing or unknown (when
+          `skip_unknown` is False)
+        """
+        decoder = _Decoder(source)
+        value = self._root.decode_pairs(decoder)
+        decoder._expect(TokenType.EMPTY)
+        return value
+
+    def _compile_tree(self, spec: Tree) -> _Record:
+        record = _Record(None, self._skip_unknown)
+        for key, value in spec.items():
+            text = str(key)
+            optional = text.endswith("?")
+            if optional:
+                text = text[:-1]
+            # The name is used for symbol keys in the document; string keys are kept as strings (see `decode_pairs()`).
+            record.add(text, classify(text), self._compile_value(value), required=not optional)
+        return record
+
+    def _compile_value(self, spec: Value) -> _Decode:
+        if isinstance(spec, dict):
+            return self._compile_tree(spec).decode
+        if isinstance(spec, list):
+            if len(spec) != 1:
+                raise ValueError(f"A list in a schema must hold the type of its items, but got {spec!r}")
+            return _list_decoder(self._compile_value(spec[0]))
+        if isinstance(spec, Symbol) and str(spec) in _NAMED_TYPES:
+            return _NAMED_TYPES[str(spec)]
+        raise ValueError(f"Unknown type in schema: {spec!r}")
+
+    def _compile_class(self, cls: type) -> _Record:
+        # Records are compiled once per class, which also allows a class to contain itself.
+        if cls in self._records:
+            return self._records[cls]
+        record = self._records[cls] = _Record(lambda values: cls(**values), self._skip_unknown)
+        hints = typing.get_type_hints(cls)
+        for name, parameter in inspect.signature(cls).parameters.items():
+            if parameter.kind not in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY):
+                raise TypeError(f"Parameter {name!r} of record class {cls.__name__} must be a keyword parameter.")
+            if name not in hints:
+                raise TypeError(f"Field {name!r} of record class {cls.__name__} has no type annotation.")
+            annotation = hints[name]
+            optional = _is_optional(annotation)
+            if optional:
+                annotation, = (arg for arg in typing.get_args(annotation) if arg is not type(None))
+            has_default = parameter.default is not parameter.empty
+            record.add(name, name, self._compile_type(annotation), required=not (optional or has_default),
+                       missing_none=optional and not has_default)
+        return record
+
+    def _compile_type(self, annotation: typing.Any) -> _Decode:
+        if annotation in _PYTHON_TYPES:
+            return _PYTHON_TYPES[annotation]
+        if annotation is list:
+            return _list_decoder(_decode_any)
+        if typing.get_origin(annotation) is list:
+            return _list_decoder(self._compile_type(typing.get_args(annotation)[0]))
+        if isinstance(annotation, type) and typing.get_origin(annotation) is None:
+            return self._compile_class(annotation).decode
+        raise TypeError(f"Unsupported type in schema: {annotation!r}")
+
+
+class _Record:
+    """A compiled tree of known keys, which decodes into a dict or a record class."""
+    __slots__ = ("_build", "_skip_unknown", "_fields", "_required", "_missing_none")
+
+    def __init__(self, build: typing.Callable[[dict[typing.Any, typing.Any]], typing.Any] | None,
+                 skip_unknown: bool) -> None:
+        # Note: without `build`, the dict of values is returned as it is.
+        self._build = build
+        self._skip_unknown = skip_unknown
+        self._fields: dict[str, tuple[Key, _Decode]] = {}  # The name and decoder of each key, by its text.
+        self._required: list[str] = []
+        self._missing_none: list[str] = []  # Names to pass None for if missing.
+
+    def add(self, text: str, name: Key, decode: _Decode, required: bool, missing_none: bool = False) -> None:
+        if text in self._fields:
+            raise ValueError(f"Key {text!r} is given twice in schema.")
+        self._fields[text] = name, decode
+        if required:
+            self._required.append(text)
+        if missing_none:
+            self._missing_none.append(text)
+
+    def decode(self, decoder: _Decoder) -> typing.Any:
+        decoder._expect_value(TokenType.LEFT_BRACE, "a tree")
+        value = self.decode_pairs(decoder)
+        decoder._expect(TokenType.RIGHT_BRACE)
+        return value
+
+    def decode_pairs(self, decoder: _Decoder) -> typing.Any:
+        # Decode the pairs of the tree at the current token, up to its end.
+        symbol, string = TokenType.SYMBOL, TokenType.STRING
+        fields = self._fields
+        values: dict[typing.Any, typing.Any] = {}
+        found: set[str] = set()  # The text of each key found, as a symbol and a string key may share a field.
+        while True:
+            token = decoder._current_token
+            if token.type is not symbol and token.type is not string:
+                break  # End of tree.
+            decoder._advance()
+            decoder._expect_whitespace()
+            field = fields.get(token.value)
+            if field is None:
+                if not self._skip_unknown:
+                    raise decoder._schema_error(f"Unknown key {token.value!r}", token.start_index, (token.value,))
+                decoder._skip_value()
+            else:
+                if token.value in found:
+                    raise decoder._error("Keys in a tree must be unique.", token.start_index)
+                found.add(token.value)
+                name, decode = field
+                if token.type is string and self._build is None:
+                    name = token.value  # A tree keeps its string keys as strings.
+                try:
+                    values[name] = decode(decoder)
+                except SchemaError as e:
+                    e.path = (token.value, *e.path)
+                    raise
+            token_type = decoder._current_token.type
+            if token_type is symbol or token_type is string:
+                # If we're not at the end of the tree, expect whitespace before the next key.
+                decoder._expect_whitespace()
+        if len(found) < len(fields):
+            for text in self._required:
+                if text not in found:
+                    raise decoder._schema_error(f"Missing key {text!r}")
+            for text in self._missing_none:
+                values.setdefault(fields[text][0], None)
+        return values if self._build is None else self._build(values)
+
+
+class _Decoder(Parser):
+    """Parser which is driven by a compiled schema (see `Schema.decode()`).
+
+    Values of type `any` are parsed as by `Parser`, in default mode.
+    """
+    def __init__(self, source: str | Lexer) -> None:
+        super().__init__(source, mode=DEFAULT_MODE)
+
+    def _expect_value(self, token_type: TokenType, description: str) -> None:
+        if not self._match(token_type):
+            raise self._mismatch(description)
+
+    def _mismatch(self, description: str) -> SchemaError:
+        # Return an error for a value at the current token which is not of the type described.
+        token = self._current_token
+        return self._schema_error(f"Expected {description} but got {_describe(token.type, token.value)}")
+
+    def _schema_error(self, message: str, index: int | None = None, path: tuple[str | int, ...] = ()) -> SchemaError:
+        # Return an error located at `index`, or else at the current token (see `_error()`).
+        error = self._error(message, index)
+        return SchemaError(message, error.index, error.line, error.column, path)
+
+
+def _describe(token_type: TokenType, value: str) -> str:
+    # Describe a token in an error message, with the text of a symbol or string.
+    if token_type is TokenType.SYMBOL or token_type is TokenType.STRING:
+        return f"{token_type.value} {value!r}"
+    return token_type.value
+
+
+def _scalar_decoder(token_type: TokenType, convert: typing.Callable[[str], typing.Any],
+                    description: str) -> _Decode:
+    # Return a decoder for a symbol or string which `convert` turns into its value, or else returns None.
+    def decode(decoder: _Decoder) -> typing.Any:
+        token = decoder._current_token
+        if token.type is token_type:
+            value = convert(token.value)
+            if value is not None:
+                decoder._advance()
+                return value
+        raise decoder._mismatch(description)
+
+    return decode
+
+
+def _list_decoder(decode_item: _Decode) -> _Decode:
+    def decode(decoder: _Decoder) -> list[typing.Any]:
+        decoder._expect_value(TokenType.LEFT_BRACKET, "a list")
+        values: list[typing.Any] = []
+        while True:
+            token_type = decoder._current_token.type
+            if token_type is TokenType.RIGHT_BRACKET or token_type is TokenType.EMPTY:
+                break
+            try:
+                values.append(decode_item(decoder))
+            except SchemaError as e:
+                e.path = (len(values), *e.path)
+                raise
+            if decoder._current_token.type is not TokenType.RIGHT_BRACKET:
+                decoder._expect_whitespace()
+        decoder._expect(TokenType.RIGHT_BRACKET)
+        return values
+
+    return decode
+
+
+def _decode_any(decoder: _Decoder) -> Value:
+    return decoder._value()
+
+
+def _is_optional(annotation: typing.Any) -> bool:
+    origin = typing.get_origin(annotation)
+    if origin is not typing.Union and origin is not types.UnionType:
+        return False
+    args = typing.get_args(annotation)
+    if len(args) != 2 or type(None) not in args:
+        raise TypeError(f"Unsupported type in schema: {annotation!r} (only unions with None are supported)")
+    return True
+
+
+_decode_string = _scalar_decoder(TokenType.STRING, str, "a string")
+_decode_text = _scalar_decoder(TokenType.SYMBOL, TextSymbol, "a symbol")
+_decode_symbol = _scalar_decoder(TokenType.SYMBOL, classify, "a symbol")
+
+# Decoders for the types named in a schema written in Beech.
+_NAMED_TYPES: dict[str, _Decode] = {
+    "string": _decode_string,
+    "text": _decode_text,
+    "symbol": _decode_symbol,
+    "number": _scalar_decoder(TokenType.SYMBOL, NumberSymbol.try_parse, "a number"),
+    "date": _scalar_decoder(TokenType.SYMBOL, DateSymbol.try_parse, "a date"),
+    "time": _scalar_decoder(TokenType.SYMBOL, TimeSymbol.try_parse, "a time"),
+    "date-time": _scalar_decoder(TokenType.SYMBOL, DateTimeSymbol.try_parse, "a date and time"),
+    "any": _decode_any,
+}
+
+# Decoders for the types in a record class, other than lists and record classes.
+_PYTHON_TYPES: dict[typing.Any, _Decode] = {
+    str: _decode_string,
+    int: _scalar_decoder(TokenType.SYMBOL, parse_number, "a number"),
+    Date: _scalar_decoder(TokenType.SYMBOL, parse_date, "a date"),
+    Time: _scalar_decoder(TokenType.SYMBOL, parse_time, "a time"),
+    DateTime: _scalar_decoder(TokenType.SYMBOL, parse_date_time, "a date and time"),
+    Symbol: _decode_symbol,
+    TextSymbol: _decode_text,
+    NumberSymbol: _NAMED_TYPES["number"],
+    DateSymbol: _NAMED_TYPES["date"],
+    TimeSymbol: _NAMED_TYPES["time"],
+    DateTimeSymbol: _NAMED_TYPES["date-time"],
+    typing.Any: _decode_any,
+}
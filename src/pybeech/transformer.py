@@ -1,14 +1,29 @@
 """Module for transforming a general Beech AST into a specified one."""
 from __future__ import annotations
 
-from typing import Callable, TypeVar
+from collections.abc import Iterator, Mapping, Sequence
+from typing import Any, Callable, NamedTuple, TypeVar, cast, overload
 
-from .beech_types import Symbol, Key, Value
+from .beech_types import Symbol, Key, Value, Tree, List, OrderedTree
 
 
 T = TypeVar("T")
 Transform = Callable[[T], T]
 
+# Rules for trees (ordered or not) and lists in a dispatch table, which are handled by the transformer itself.
+_TREE: Any = object()
+_LIST: Any = object()
+_UNSET: Any = object()
+
+
+class Mode(NamedTuple):
+    """A named set of transformation rules for symbols and strings.
+
+    A mode can be applied while parsing (see `Parser`) or to an existing tree with `mode_transformer()`.
+    """
+    transform_symbol: Transform[Symbol] | None = None
+    transform_string: Transform[str] | None = None
+
 
 def transformer(transform_symbol: Transform[Symbol] | None = None,
                 transform_string: Transform[str] | None = None) -> Transform[Value]:
@@ -44,6 +59,211 @@ def transformer(transform_symbol: Transform[Symbol] | None = None,
             return {transform_key(k): transform_value(v) for k, v in value.items()}
         if isinstance(value, list):
             return [transform_value(v) for v in value]
+        if isinstance(value, OrderedTree):
+            return OrderedTree.from_lists([transform_key(k) for k in value],
+                                          [transform_value(v) for v in value.values()])
         raise TypeError(f"Unexpected value type: {type(value)}")
 
     return transform_value
+
+
+def mode_transformer(mode: Mode) -> Transform[Value]:
+    """Return a transformation function for Beech values based on the rules of a mode (see `transformer()`)."""
+    return transformer(transform_symbol=mode.transform_symbol, transform_string=mode.transform_string)
+
+
+def in_place_transformer(transform_symbol: Transform[Symbol] | None = None,
+                         transform_string: Transform[str] | None = None) -> Transform[Value]:
+    """Return a transformation function for Beech values which updates trees and lists in place.
+
+    This applies the same rules as `transformer()`, but instead of copying each tree and list it replaces their
+    contents, and returns the same tree or list it was given. Nested values are handled with an explicit stack,
+    so there is no limit on nesting depth.
+
+    :param transform_symbol: (optional) rule for transforming symbols into other symbols
+    :param transform_string: (optional) rule for transforming strings into other strings
+
+    :return: inferred transformation rule for any Beech value
+    """
+    key_rules, value_rules = _rules(transform_symbol, transform_string)
+    # Keys can be left where they are unless they are transformed.
+    rebuild_keys = transform_symbol is not None or transform_string is not None
+
+    def transform_value(value: Value) -> Value:
+        rule = value_rules[type(value)]
+        if rule is not _TREE and rule is not _LIST:
+            return rule(value)
+        stack: list[Tree | List | OrderedTree] = [value]
+        while stack:
+            container = stack.pop()
+            if type(container) is list:
+                for i, item in enumerate(container):
+                    rule = value_rules[type(item)]
+                    if rule is _TREE or rule is _LIST:
+                        stack.append(item)
+                    else:
+                        container[i] = rule(item)
+                continue
+            items = container.items()
+            # An ordered tree's pairs can't be replaced by key, so it is always rebuilt.
+            ordered = type(container) is OrderedTree
+            if rebuild_keys or ordered:
+                items = list(items)
+                container.clear()
+            for key, item in items:
+                if rebuild_keys:
+                    key = key_rules[type(key)](key)
+                rule = value_rules[type(item)]
+                if rule is _TREE or rule is _LIST:
+                    stack.append(item)
+                else:
+                    item = rule(item)
+                if ordered:
+                    container.append(key, item)
+                else:
+                    container[key] = item
+        return value
+
+    return transform_value
+
+
+def lazy_transformer(transform_symbol: Transform[Symbol] | None = None,
+                     transform_string: Transform[str] | None = None) -> Transform[Value]:
+    """Return a transformation function for Beech values which transforms trees and lists as they are accessed.
+
+    This applies the same rules as `transformer()`, but a tree or list is returned as a read-only `LazyTree` or
+    `LazyList` view of the original, which transforms each value (and wraps each nested tree or list) when it is
+    first accessed. The keys of a tree are transformed all at once, the first time it is accessed by key or
+    iterated over. An ordered tree is returned as an `OrderedTree` with its keys transformed straight away, whose
+    values are held in a `LazyList`. The original tree must not be changed while a view of it is in use.
+
+    :param transform_symbol: (optional) rule for transforming symbols into other symbols
+    :param transform_string: (optional) rule for transforming strings into other strings
+
+    :return: inferred transformation rule for any Beech value
+    """
+    key_rules, value_rules = _rules(transform_symbol, transform_string)
+
+    def transform_key(key: Key) -> Key:
+        return key_rules[type(key)](key)
+
+    def transform_value(value: Value) -> Value | LazyTree | LazyList:
+        rule = value_rules[type(value)]
+        if rule is _TREE and type(value) is OrderedTree:
+            return OrderedTree.from_lists([transform_key(k) for k in value],
+                                          cast(List, LazyList(list(value.values()), transform_value)))
+        if rule is _TREE:
+            return LazyTree(value, transform_key if transform_symbol or transform_string else None, transform_value)
+        if rule is _LIST:
+            return LazyList(value, transform_value)
+        return rule(value)
+
+    return transform_value
+
+
+class LazyTree(Mapping):
+    """A read-only view of a tree which transforms its keys and values when they are accessed.
+
+    See `lazy_transformer()`.
+    """
+    __slots__ = ("_tree", "_transform_key", "_transform_value", "_keys", "_values")
+
+    def __init__(self, tree: Tree, transform_key: Transform[Key] | None,
+                 transform_value: Callable[[Value], Any]) -> None:
+        self._tree = tree
+        self._transform_key = transform_key
+        self._transform_value = transform_value
+        self._keys: dict[Key, Key] | None = None  # Map from each transformed key to the original key.
+        self._values: dict[Key, Any] = {}  # Transformed values, by original key.
+
+    def __getitem__(self, key: Key) -> Any:
+        if self._transform_key is not None:
+            key = self._key_map()[key]
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = self._transform_value(self._tree[key])
+        return value
+
+    def __iter__(self) -> Iterator[Key]:
+        return iter(self._tree if self._transform_key is None else self._key_map())
+
+    def __len__(self) -> int:
+        return len(self._tree if self._transform_key is None else self._key_map())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._tree!r})"
+
+    def _key_map(self) -> dict[Key, Key]:
+        if self._keys is None:
+            transform_key = cast(Transform[Key], self._transform_key)
+            self._keys = {transform_key(key): key for key in self._tree}
+        return self._keys
+
+
+class LazyList(Sequence):
+    """A read-only view of a list which transforms its values when they are accessed.
+
+    See `lazy_transformer()`.
+    """
+    __slots__ = ("_list", "_transform_value", "_values")
+
+    def __init__(self, list_: List, transform_value: Callable[[Value], Any]) -> None:
+        self._list = list_
+        self._transform_value = transform_value
+        self._values: list[Any] | None = None  # Transformed values, or _UNSET where not accessed yet.
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self._list)))]
+        item = self._list[index]
+        if index < 0:
+            index += len(self._list)
+        if self._values is None:
+            self._values = [_UNSET] * len(self._list)
+        value = self._values[index]
+        if value is _UNSET:
+            value = self._values[index] = self._transform_value(item)
+        return value
+
+    def __len__(self) -> int:
+        return len(self._list)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (list, LazyList)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._list!r})"
+
+
+class _DispatchTable(dict):
+    """Table of transformation rules by type, which falls back on the rule for a base class (such as Symbol)."""
+    def __init__(self, kind: str, rules: dict[type, Any]) -> None:
+        super().__init__(rules)
+        self._kind = kind
+
+    def __missing__(self, value_type: type) -> Any:
+        for base in value_type.__mro__[1:]:
+            if base in self:
+                rule = self[value_type] = self[base]
+                return rule
+        raise TypeError(f"Unexpected {self._kind} type: {value_type}")
+
+
+def _rules(transform_symbol: Transform[Symbol] | None,
+           transform_string: Transform[str] | None) -> tuple[_DispatchTable, _DispatchTable]:
+    # Build the dispatch tables for keys and values.
+    def _identity(_x: T) -> T: return _x
+
+    key_rules = {Symbol: transform_symbol or _identity, str: transform_string or _identity}
+    value_rules = {**key_rules, dict: _TREE, list: _LIST, OrderedTree: _TREE}
+    return _DispatchTable("key", key_rules), _DispatchTable("value", value_rules)
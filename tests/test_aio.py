@@ -0,0 +1,107 @@
+"""Tests for parsing from asyncio streams with `aio.parse_async()`."""
+import asyncio
+import random
+
+import pytest
+
+from benchmarks.corpus import KINDS, generate
+from src.pybeech.aio import parse_async
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.errors import LexError, ParseError
+from src.pybeech.lexer import Lexer
+from src.pybeech.parser import Parser
+
+
+async def chunks(text, rng, as_bytes):
+    # Split the text at random, cutting through multibyte characters when it is encoded.
+    data = text.encode() if as_bytes else text
+    index = 0
+    while index < len(data):
+        size = rng.randrange(1, 40)
+        yield data[index:index + size]
+        index += size
+
+
+def outcome(parse):
+    # Return the tree parsed, or the type, message and position of the error raised.
+    try:
+        return parse()
+    except (LexError, ParseError) as e:
+        return type(e), e.message, e.index, e.line, e.column
+
+
+@pytest.mark.parametrize("as_bytes", [False, True])
+@pytest.mark.parametrize("kind", sorted(KINDS))
+def test_corpus_matches_parser(kind, as_bytes):
+    source = generate(kind, 1 << 14) + ' note "é ü"'
+    rng = random.Random(0)
+    tree = asyncio.run(parse_async(chunks(source, rng, as_bytes), mode=DEFAULT_MODE, chunk_size=64))
+    assert tree == Parser(source, mode=DEFAULT_MODE).parse()
+
+
+def test_random_sources_match_parser():
+    rng = random.Random(1)
+    pieces = ["[", "]", " ", "a", "b", "{", "}", "(", ")", " ", "c", '"', "'", "\\", "\n", "#", "~{", "}~", "~", "é"]
+    for _ in range(1000):
+        source = "".join(rng.choice(pieces) for _ in range(rng.randrange(30)))
+        expected = outcome(lambda: Parser(source).parse())
+        parse = parse_async(chunks(source, rng, rng.random() < 0.5), chunk_size=rng.choice([1, 7, 64]),
+                            yield_every=rng.choice([1, 3, 1000]))
+        assert outcome(lambda: asyncio.run(parse)) == expected, source
+
+
+def test_stream_reader():
+    source = generate("data", 1 << 14)
+
+    async def parse():
+        reader = asyncio.StreamReader()
+        reader.feed_data(source.encode())
+        reader.feed_eof()
+        return await parse_async(reader, chunk_size=256)
+
+    assert asyncio.run(parse()) == Parser(source).parse()
+
+
+def test_yields_to_the_event_loop():
+    source = generate("data", 1 << 17)
+
+    async def parse():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        await asyncio.sleep(0)
+        start = ticks
+
+        async def one_chunk():
+            yield source
+
+        tree = await parse_async(one_chunk(), yield_every=100)
+        task.cancel()
+        return tree, ticks - start
+
+    tree, ticks = asyncio.run(parse())
+    assert tree == Parser(source).parse()
+    # Control goes back to the event loop at least once every 100 tokens.
+    assert ticks >= len(list(Lexer(source))) // 100
+
+
+@pytest.mark.parametrize("threshold", [1 << 10, 1 << 30])
+def test_executor_threshold(threshold):
+    source = generate("wide", 1 << 14)
+    tree = asyncio.run(parse_async(chunks(source, random.Random(2), True), mode=DEFAULT_MODE,
+                                   executor_threshold=threshold))
+    assert tree == Parser(source, mode=DEFAULT_MODE).parse()
+
+
+def test_invalid_yield_every():
+    async def empty():
+        yield ""
+
+    with pytest.raises(ValueError):
+        asyncio.run(parse_async(empty(), yield_every=0))
@@ -0,0 +1,69 @@
+"""Tests for caching parsed trees on disk with `ParseCache`."""
+import os
+
+import pytest
+
+from src.pybeech.beech_types import Symbol
+from src.pybeech.cache import ParseCache, _mode_id
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, TextSymbol
+from src.pybeech.transformer import Mode
+
+
+def upper(symbol):
+    return Symbol(str(symbol).upper())
+
+
+def make_rule(suffix):
+    def rule(symbol):
+        return Symbol(str(symbol) + suffix)
+    return rule
+
+
+def test_hits_and_misses(tmp_path):
+    cache = ParseCache(tmp_path)
+    assert cache.parse("a b", DEFAULT_MODE) == {TextSymbol("a"): TextSymbol("b")}
+    assert cache.parse("a b", DEFAULT_MODE) == {TextSymbol("a"): TextSymbol("b")}
+    assert cache.parse("a b") == {Symbol("a"): Symbol("b")}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_module_level_rules_are_cached(tmp_path):
+    cache = ParseCache(tmp_path)
+    mode = Mode(upper, None)
+    assert _mode_id(mode) == f"{__name__}.upper -"
+    assert cache.parse("a b", mode) == cache.parse("a b", mode) == {Symbol("A"): Symbol("B")}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lambdas_and_closures_are_not_cached(tmp_path):
+    cache = ParseCache(tmp_path)
+    for first, second in [(lambda s: Symbol(f"{s}1"), lambda s: Symbol(f"{s}2")), (make_rule("1"), make_rule("2"))]:
+        assert _mode_id(Mode(first, None)) is None
+        assert cache.parse("a b", Mode(first, None)) == {Symbol("a1"): Symbol("b1")}
+        assert cache.parse("a b", Mode(second, None)) == {Symbol("a2"): Symbol("b2")}
+    assert (cache.hits, cache.misses) == (0, 0)
+    assert os.listdir(tmp_path) == []
+
+
+def test_file_removed_before_it_is_marked_as_used(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path)
+    cache.parse("a b")
+
+    def evicted(path, *args, **kwargs):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "utime", evicted)
+    assert cache.parse("a b") == {Symbol("a"): Symbol("b")}
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_empty_entry_is_a_miss(tmp_path, use_mmap):
+    cache = ParseCache(tmp_path, use_mmap=use_mmap)
+    cache.parse("a b")
+    [entry] = os.listdir(tmp_path)
+    open(tmp_path / entry, "wb").close()
+    assert cache.parse("a b") == {Symbol("a"): Symbol("b")}
+    assert cache.parse("a b") == {Symbol("a"): Symbol("b")}
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,44 @@
+"""Tests for extracting lists into columns with `extract_column()` and `extract_table()`."""
+import pytest
+
+from src.pybeech.columns import extract_column, extract_table
+from src.pybeech.default_mode.extension_types import Date, DateTime, Time
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE, DateSymbol, TextSymbol
+from src.pybeech.errors import SchemaError
+from src.pybeech.parser import Parser
+
+
+def test_kinds_are_inferred():
+    source = "n (1 -2 3) d (2024-02-29 1970-01-01) t (2024-01-01T01:30:00+01:30) s (a 'b c' a)"
+    assert list(extract_column(source, "n")) == [1, -2, 3]
+    assert list(extract_column(source, "d")) == [Date(2024, 2, 29), Date(1970, 1, 1)]
+    assert list(extract_column(source, "t")) == [DateTime(Date(2024, 1, 1), Time(0, 0, 0, 0, 0))]
+    column = extract_column(source, "s")
+    assert (list(column), column.values) == (["a", "b c", "a"], ["a", "b c"])
+
+
+@pytest.mark.parametrize("source, kind, index, message", [
+    ("d (2023-02-28 2023-02-31)", None, 1, "Date 2023-02-31"),
+    ("d (0000-01-01)", "date", 0, "Date 0000-01-01"),
+    ("d (2023-04-31T00:00:00Z)", None, 0, "Date-time 2023-04-31T00:00:00Z"),
+    ("d (1 99999999999999999999)", None, 1, "Number 99999999999999999999"),
+])
+def test_out_of_range_items(source, kind, index, message):
+    # Default mode accepts these items, but a column cannot hold them.
+    Parser(source, mode=DEFAULT_MODE).parse()
+    with pytest.raises(SchemaError, match=f"^d/{index}: {message} is out of the range of a column") as info:
+        extract_column(source, "d", kind)
+    assert info.value.path == ("d", index)
+
+
+def test_out_of_range_item_in_table():
+    source = "r ({a 2020-02-29} {a 2020-02-30})"
+    assert Parser(source, mode=DEFAULT_MODE).parse()[TextSymbol("r")][1][TextSymbol("a")] == DateSymbol(2020, 2, 30)
+    with pytest.raises(SchemaError, match="^r/1/a: Date 2020-02-30 is out of the range of a column") as info:
+        extract_table(source, "r")
+    assert info.value.path == ("r", 1, "a")
+
+
+def test_mismatched_item():
+    with pytest.raises(SchemaError, match="^d/1: Expected a date but got symbol token 'x'"):
+        extract_column("d (2020-01-01 x)", "d")
@@ -0,0 +1,143 @@
+"""Round-trip tests for writing trees with `dump()` and `dumps()` and parsing them back with `Parser`."""
+import io
+
+import pytest
+
+from benchmarks.corpus import KINDS, generate
+from src.pybeech.beech_types import OrderedTree, Symbol
+from src.pybeech.columns import extract_column, extract_table
+from src.pybeech.default_mode.extension_types import Date, DateTime, Time
+from src.pybeech.default_mode.symbol_parser import (DEFAULT_MODE, DateSymbol, DateTimeSymbol, NumberSymbol,
+                                                    TextSymbol, TimeSymbol)
+from src.pybeech.emitter import dump, dumps
+from src.pybeech.parser import Parser
+from src.pybeech.schema import Schema
+
+
+def reparse(tree, indent=None, mode=None):
+    return Parser(dumps(tree, indent), mode=mode).parse()
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("kind", sorted(KINDS))
+def test_corpus_round_trip(kind, indent):
+    tree = Parser(generate(kind, 1 << 14)).parse()
+    assert reparse(tree, indent) == tree
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+@pytest.mark.parametrize("kind", ["data", "wide"])
+def test_default_mode_round_trip(kind, indent):
+    tree = Parser(generate(kind, 1 << 14), mode=DEFAULT_MODE).parse()
+    assert reparse(tree, indent, DEFAULT_MODE) == tree
+
+
+def test_strings_and_containers_round_trip():
+    tree = {
+        Symbol("escapes"): 'quote " backslash \\ newline \n tab \t bell \a nul \x00 é   \U0001f333',
+        "string key": [Symbol("a"), "b", [], {}, OrderedTree(), [[Symbol("nested")]]],
+        Symbol("log"): OrderedTree([(Symbol("k"), Symbol("1")), (Symbol("k"), {Symbol("x"): "y"})]),
+    }
+    for indent in (None, 0, 3):
+        assert reparse(tree, indent) == tree
+
+
+def test_default_mode_symbols_round_trip():
+    tree = {
+        TextSymbol("number"): NumberSymbol(-42),
+        TextSymbol("date"): DateSymbol(2024, 2, 29),
+        TextSymbol("time"): TimeSymbol(23, 59, 60, -5, 30),
+        TextSymbol("date-time"): DateTimeSymbol(Date(1999, 12, 31), Time(0, 0, 0, 0, 0)),
+    }
+    assert reparse(tree, mode=DEFAULT_MODE) == tree
+
+
+@pytest.mark.parametrize("value, text", [
+    (Date(2024, 2, 29), "2024-02-29"),
+    (Time(7, 5, 3), "07:05:03"),
+    (Time(7, 5, 3, 0, 0), "07:05:03+00:00"),
+    (Time(7, 5, 3, -5, 30), "07:05:03-05:30"),
+    (Time(7, 5, 3, 2), "07:05:03+02:00"),
+    (DateTime(Date(2023, 8, 1), Time(12, 0, 0, 1, 0)), "2023-08-01T12:00:00+01:00"),
+    (DateTime(Date(2023, 8, 1), Time(12, 0, 0)), "2023-08-01T12:00:00"),
+])
+def test_bare_dates_and_times(value, text):
+    assert dumps({Symbol("v"): value}) == f"v {text}"
+    parsed = reparse({Symbol("v"): [value]}, mode=DEFAULT_MODE)[TextSymbol("v")][0]
+    assert str(parsed.value) == text
+
+
+def test_schema_records_round_trip():
+    source = "at 2023-08-01T12:00:00+01:00 day 2024-02-29 when 07:05:03Z n 12 name x"
+    tree = Schema.from_source("at date-time day date when time n number name text").decode(source)
+    assert reparse(tree, mode=DEFAULT_MODE) == tree
+
+
+def test_columns_round_trip():
+    source = "dates (2024-02-29 1970-01-01) times (1970-01-01T00:00:00Z 2024-01-01T01:30:00+01:30) " \
+             "rows ({n 1 s a} {n 2 s 'b c'})"
+    dates = extract_column(source, "dates")
+    times = extract_column(source, "times")
+    table = extract_table(source, "rows")
+    tree = {Symbol("dates"): list(dates), Symbol("times"): list(times),
+            Symbol("rows"): {Symbol("s"): list(table["s"])}}
+    parsed = reparse(tree, mode=DEFAULT_MODE)
+    assert [d.value for d in parsed[TextSymbol("dates")]] == list(dates)
+    assert [t.value for t in parsed[TextSymbol("times")]] == list(times)
+    assert [str(s) for s in parsed[TextSymbol("rows")][TextSymbol("s")]] == ["a", "b c"]
+
+
+def test_dump_in_chunks_matches_dumps():
+    tree = Parser(generate("lists", 1 << 14)).parse()
+    writes = []
+
+    class Stream(io.StringIO):
+        def write(self, text):
+            writes.append(text)
+            return super().write(text)
+
+    stream = Stream()
+    dump(tree, stream, chunk_size=256)
+    assert stream.getvalue() == dumps(tree)
+    assert len(writes) > 1
+
+
+def test_dump_chunks_of_keys_are_bounded():
+    # Every value is an empty tree, so only the keys make up the size of the output.
+    tree = {Symbol(f"key{i:05}"): {Symbol(f"nested{i:05}"): {}} for i in range(2000)}
+    writes = []
+
+    class Stream(io.StringIO):
+        def write(self, text):
+            writes.append(text)
+            return super().write(text)
+
+    dump(tree, Stream(), chunk_size=256)
+    assert len(writes) > 100
+    assert max(len(text) for text in writes) < 2 * 256
+
+
+def test_container_subclasses_at_every_level():
+    class Tree(dict):
+        pass
+
+    class Items(list):
+        pass
+
+    class Log(OrderedTree):
+        pass
+
+    tree = Tree({Symbol("a"): Tree({Symbol("b"): Items([Symbol("c"), Tree()])}),
+                 Symbol("d"): Log([(Symbol("e"), Items())])})
+    expected = {Symbol("a"): {Symbol("b"): [Symbol("c"), {}]}, Symbol("d"): OrderedTree([(Symbol("e"), [])])}
+    for indent in (None, 2):
+        assert reparse(tree, indent) == expected
+
+
+def test_invalid_values():
+    with pytest.raises(TypeError):
+        dumps({Symbol("x"): 1})
+    with pytest.raises(TypeError):
+        dumps([Symbol("x")])
+    with pytest.raises(ValueError):
+        dumps({Symbol("x"): Symbol("a b")})
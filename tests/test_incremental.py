@@ -0,0 +1,80 @@
+"""Tests for reparsing documents incrementally with `incremental.Document`."""
+import random
+
+import pytest
+
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.errors import LexError, ParseError
+from src.pybeech.incremental import Document
+from src.pybeech.parser import Parser
+
+PIECES = [" ", "\n", "a", "b", "c1", "{", "}", "(", ")", "[", "]", '"', "'", "#", "~{", "}~", "\\", "x ", '"s t"',
+          "{ q r }", "(1 2)", "k"]
+
+
+def outcome(parse):
+    # Return the tree parsed with the type of each key, or the type and text of the error raised.
+    try:
+        tree = parse()
+    except (LexError, ParseError) as e:
+        return type(e), str(e)
+    return tree, [type(key) for key in tree]
+
+
+def random_document(rng):
+    def value(depth):
+        r = rng.random()
+        if depth < 3 and r < 0.2:
+            entries = (f"{rng.choice('abcdef')}{i} {value(depth + 1)}" for i in range(rng.randint(0, 4)))
+            return "{" + " ".join(entries) + "}"
+        if depth < 3 and r < 0.35:
+            return "(" + " ".join(value(depth + 1) for _ in range(rng.randint(0, 4))) + ")"
+        if r < 0.5:
+            return f'"str {rng.randint(0, 9)}"'
+        if r < 0.55:
+            return '"multi\n  "line"'
+        return rng.choice(["x", "y", "12", "2023-01-01", "z~w"])
+
+    return "".join(f"key{i} {value(0)}" + rng.choice(["\n", " ", "  # c\n", " ~{ b }~ "])
+                   for i in range(rng.randint(0, 8)))
+
+
+@pytest.mark.parametrize("mode", [None, DEFAULT_MODE])
+def test_edits_match_full_parse(mode):
+    rng = random.Random(0)
+    for _ in range(200):
+        source = random_document(rng)
+        document = Document(source, mode=mode)
+        for _ in range(10):
+            offset = rng.randint(0, len(source))
+            removed = rng.randint(0, min(3, len(source) - offset))
+            inserted = "".join(rng.choice(PIECES) for _ in range(rng.randint(0, 2)))
+            new_source = source[:offset] + inserted + source[offset + removed:]
+            expected = outcome(lambda: Parser(new_source, mode=mode).parse())
+            assert outcome(lambda: document.edit(offset, removed, inserted).tree) == expected, (source, new_source)
+            if isinstance(expected[0], dict):
+                edited = document.edit(offset, removed, inserted)
+                assert list(edited.tree.items()) == list(expected[0].items())
+                # The previous document is left unchanged.
+                assert document.tree == Parser(source, mode=mode).parse()
+                document, source = edited, new_source
+
+
+def test_untouched_values_are_reused():
+    source = "a {x 1 y (2 3)} b {z 4} c (5 {w 6})"
+    document = Document(source)
+    offset = source.index("4")
+    edited = document.edit(offset, 1, "40")
+    assert edited.source == "a {x 1 y (2 3)} b {z 40} c (5 {w 6})"
+    assert edited.tree == Parser(edited.source).parse()
+    assert edited.tree[Symbol("a")] is document.tree[Symbol("a")]
+    assert edited.tree[Symbol("c")] is document.tree[Symbol("c")]
+    assert document.tree[Symbol("b")] == {Symbol("z"): Symbol("4")}
+    assert document.source == source
+
+
+@pytest.mark.parametrize("offset, removed", [(-1, 0), (0, -1), (3, 1), (4, 0)])
+def test_edit_outside_source(offset, removed):
+    with pytest.raises(ValueError):
+        Document("a b").edit(offset, removed, "x")
@@ -0,0 +1,41 @@
+"""Tests that every lexing engine gives the same tokens and errors as the reference engine."""
+import pytest
+
+from benchmarks.lexer_conformance import CASES, ENGINES, random_cases, tokens
+from src.pybeech import lexer
+from src.pybeech.errors import LexError
+from src.pybeech.lexer import Lexer
+
+SOURCES = CASES + random_cases(2_000)
+
+
+@pytest.fixture(params=sorted(ENGINES))
+def engine(request):
+    if request.param == "compiled" and lexer._speedups is None:
+        pytest.skip("compiled accelerator not built")
+    return ENGINES[request.param]
+
+
+def test_engine_matches_reference(engine):
+    mismatches = [source for source in SOURCES if tokens(source, engine) != tokens(source, ENGINES["reference"])]
+    assert mismatches == []
+
+
+@pytest.mark.skipif(lexer._speedups is None, reason="compiled accelerator not built")
+@pytest.mark.parametrize("index", [-1, -100, 4, 1 << 40])
+def test_compiled_index_out_of_range(index):
+    with pytest.raises(IndexError):
+        lexer._speedups.next_token("a b", index)
+
+
+@pytest.mark.parametrize("source, line, column", [
+    (r'a "\ud800"', 1, 3),
+    ('a\n "x\\uDC00y"', 2, 2),
+    (r'a "\U00110000"', 1, 3),
+    (r'a "\UFFFFFFFF"', 1, 3),
+    ('a "multi\n  "\\U0000d800"', 1, 3),
+])
+def test_invalid_code_point_is_located(engine, source, line, column):
+    with pytest.raises(LexError, match="Invalid code point") as info:
+        list(Lexer(source, **engine))
+    assert (info.value.line, info.value.column) == (line, column)
@@ -0,0 +1,69 @@
+"""Tests for parsing with `Parser`."""
+import io
+import random
+
+import pytest
+
+from benchmarks.corpus import KINDS, generate
+from src.pybeech.beech_types import Symbol
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.errors import LexError, ParseError
+from src.pybeech.lexer import Lexer
+from src.pybeech.parser import Parser
+
+
+@pytest.mark.parametrize("options", [{"fast_lexer": False}, {"fast_lexer": True}, {"intern_symbols": True},
+                                     {"intern_symbols": False}])
+def test_lexer_options_with_a_lexer_are_rejected(options):
+    with pytest.raises(TypeError):
+        Parser(Lexer("a b"), **options)
+    with pytest.raises(TypeError):
+        Parser(Lexer.from_file(io.StringIO("a b")), **options)
+
+
+@pytest.mark.parametrize("options", [{}, {"fast_lexer": False}, {"intern_symbols": True}])
+def test_lexer_options_with_source(options):
+    assert Parser("a b", **options).parse() == Parser(Lexer("a b")).parse() == {Symbol("a"): Symbol("b")}
+
+
+def outcome(parse):
+    # Return the tree parsed, or the type, message and position of the error raised.
+    try:
+        return parse()
+    except (LexError, ParseError) as e:
+        return type(e), e.message, e.index, e.line, e.column
+
+
+def random_sources(count, seed=0):
+    rng = random.Random(seed)
+    pieces = ["a", "b", "c", " ", " ", "\n", "{", "}", "(", ")", "[", "]", '"s"', "'t'", "#", "~{", "}~", "1"]
+    return ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 24))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("mode", [None, DEFAULT_MODE])
+@pytest.mark.parametrize("kind", sorted(KINDS))
+def test_iterative_matches_recursive_on_corpus(kind, mode):
+    source = generate(kind, 1 << 14)
+    assert Parser(source, iterative=True, mode=mode).parse() == Parser(source, mode=mode).parse()
+
+
+def test_iterative_matches_recursive_on_random_sources():
+    for source in random_sources(3000) + ["a {b 1 b 2}", "a (b {c d} e", "a b a c", "a [b 1 b 2] c {d}}"]:
+        expected = outcome(lambda: Parser(source).parse())
+        assert outcome(lambda: Parser(source, iterative=True).parse()) == expected, source
+
+
+def test_iterative_has_no_depth_limit():
+    depth = 20_000
+    source = "a " + "{b " * depth + "c" + "}" * depth + " d (" + "(" * depth + ")" * depth + ")"
+    with pytest.raises(RecursionError):
+        Parser(source).parse()
+    tree = Parser(source, iterative=True).parse()
+    node = tree[Symbol("a")]
+    for _ in range(depth - 1):
+        node = node[Symbol("b")]
+    assert node == {Symbol("b"): Symbol("c")}
+    items = tree[Symbol("d")]
+    for _ in range(depth):
+        [items] = items
+    assert items == []
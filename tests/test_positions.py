@@ -0,0 +1,66 @@
+"""Tests for the line and column of tokens and errors, in memory and when reading from a file."""
+import io
+import tracemalloc
+
+import pytest
+
+from src.pybeech.errors import LexError, ParseError
+from src.pybeech.lexer import Lexer, LineIndex
+from src.pybeech.parser import Parser
+
+SOURCE = """key value
+list (a b
+  c) # comment
+"multi
+ "line" ~{ block
+ comment }~ tree {
+    x 'y'
+}
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_buffered_positions_match_line_index(chunk_size):
+    index = LineIndex(SOURCE)
+    lexer = Lexer.from_file(io.StringIO(SOURCE), chunk_size=chunk_size)
+    starts = []
+    for token in lexer:
+        starts.append(token.start_index)
+        assert lexer.position(token.start_index) == index.position(token.start_index)
+    assert starts == [token.start_index for token in Lexer(SOURCE)]
+
+
+@pytest.mark.parametrize("source", ['a b\nc "x\n\\q"', "a\n  b }~", "a (b\n c\n d ~{\n e",
+                                    'a\nb\n"\\ud800"'])
+@pytest.mark.parametrize("chunk_size", [1, 5, 64])
+def test_buffered_lex_errors_match(source, chunk_size):
+    with pytest.raises(LexError) as expected:
+        list(Lexer(source))
+    with pytest.raises(LexError) as actual:
+        list(Lexer.from_file(io.StringIO(source), chunk_size=chunk_size))
+    assert (actual.value.index, actual.value.line, actual.value.column) == \
+        (expected.value.index, expected.value.line, expected.value.column)
+
+
+def test_buffered_parse_error_before_window_has_index_only():
+    source = "a 1\na {" + "".join(f"x{i} y\n" for i in range(1000)) + "}"
+    with pytest.raises(ParseError) as in_memory:
+        Parser(source).parse()
+    with pytest.raises(ParseError) as buffered:
+        Parser.from_file(io.StringIO(source), chunk_size=16).parse()
+    assert (in_memory.value.index, in_memory.value.line) == (4, 2)
+    assert (buffered.value.index, buffered.value.line, buffered.value.column) == (4, None, None)
+
+
+def test_buffered_lexer_memory_is_bounded():
+    stream = io.StringIO("".join(f"key{i} value{i}\n" for i in range(50_000)))
+    tracemalloc.start()
+    try:
+        lexer = Lexer.from_file(stream, chunk_size=1 << 12)
+        for _ in lexer:
+            pass
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert lexer.position(lexer.index) == (50_001, 1)
+    assert retained < 1 << 16
@@ -0,0 +1,20 @@
+"""Tests for the counters collected by `profile()`."""
+from src.pybeech.lexer import TokenType
+from src.pybeech.profiling import profile
+
+
+def test_counts_of_a_simple_source():
+    stats = profile('a {b "c\\td"} # note\ne (f g)').stats
+    assert stats.token_counts[TokenType.SYMBOL] == 5
+    assert stats.token_counts[TokenType.STRING] == 1
+    assert stats.max_depth == 1
+    assert (stats.payload_chars, stats.comment_chars, stats.escapes) == (15, 6, 1)
+
+
+def test_comments_between_lines_of_a_string_are_not_payload():
+    # `"a\tb` and its newline, then `"c\n"` after a line comment and a block comment, both holding backslashes.
+    source = 'k "a\\tb\n  # c\\ \\q\n  ~{ x\\y }~ "c\\n" z y'
+    result = profile(source)
+    stats = result.stats
+    assert (stats.payload_chars, stats.comment_chars, stats.escapes) == (1 + 6 + 5 + 1 + 1, 7 + 9, 2)
+    assert "whitespace: 9 " in result.report()
@@ -0,0 +1,33 @@
+"""Tests for extracting values by path with `query()` and `query_all()`."""
+import pytest
+
+from src.pybeech.beech_types import OrderedTree, Symbol
+from src.pybeech.parser import query, query_all
+
+# An ordered tree repeating key `b`, only the second of which leads to `b/b/c`.
+REPEATED = "b [b {x 1} b {c 2}] z 3"
+# A tree with a symbol and a string key of the same text, each leading to `b/a/c`.
+SAME_TEXT = 'b {a {c 1} "a" {c 2}} z 3'
+
+
+@pytest.mark.parametrize("source, path, others", [
+    (REPEATED, ("b", "b", "c"), [("b",)]),
+    (REPEATED, ("b", "b", "c"), [("b",), ("b", "b"), ("z",)]),
+    (REPEATED, ("b", "b", "x"), [("b",), ("b", "b", "c")]),
+    (SAME_TEXT, ("b", "a", "c"), [("b",)]),
+    (SAME_TEXT, ("b", "a", "c"), [("b",), ("b", "a"), ("z",)]),
+])
+def test_query_all_uses_first_occurrence_whatever_else_is_requested(source, path, others):
+    alone = query_all(source, [path])
+    together = query_all(source, [path, *others])
+    assert together.get(path, None) == alone.get(path, None)
+    assert alone.get(path, None) == query(source, path, None)
+
+
+def test_query_all_first_occurrence_values():
+    results = query_all(REPEATED, [("b", "b", "x"), ("b", "b", "c"), ("b",)])
+    assert results[("b", "b", "x")] == Symbol("1")
+    assert ("b", "b", "c") not in results
+    assert isinstance(results[("b",)], OrderedTree)
+    results = query_all(SAME_TEXT, ["b/a/c", "b"])
+    assert results["b/a/c"] == Symbol("1")
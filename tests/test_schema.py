@@ -0,0 +1,40 @@
+"""Tests for decoding documents with a `Schema`."""
+import pytest
+
+from src.pybeech.default_mode.symbol_parser import DEFAULT_MODE
+from src.pybeech.errors import ParseError, SchemaError
+from src.pybeech.parser import Parser
+from src.pybeech.schema import Schema
+
+
+@pytest.mark.parametrize("spec", [
+    'a number "b" number c {d text "e" string}',
+    '"a" number b number "c" {"d" text e string}',
+])
+@pytest.mark.parametrize("source", [
+    'a 1 b 2 c {d x e "y"}',
+    '"a" 1 "b" 2 "c" {"d" x "e" "y"}',
+    '"a" 1 b 2 c {"d" x e "y"}',
+])
+def test_keys_are_as_in_default_mode(spec, source):
+    # A `TextSymbol` key is not equal to a `str` key of the same text, so this checks the type of every key.
+    assert Schema.from_source(spec).decode(source) == Parser(source, mode=DEFAULT_MODE).parse()
+
+
+@pytest.mark.parametrize("spec, source", [
+    ('"1" text "2024-02-29" number "07:00" string', '1 x 2024-02-29 3 07:00 "y"'),
+    ('"1" text "2024-02-29" number "07:00" string', '"1" x "2024-02-29" 3 "07:00" "y"'),
+    ('"2024-01-01T00:00:00Z" {"-5" any}', '2024-01-01T00:00:00Z {-5 (a 1)}'),
+])
+def test_non_text_symbol_keys_are_as_in_default_mode(spec, source):
+    assert Schema.from_source(spec).decode(source) == Parser(source, mode=DEFAULT_MODE).parse()
+
+
+@pytest.mark.parametrize("source", ['a 1 "a" 2', '"a" 1 a 2', 'a 1 a 2', '"a" 1 b 2 "a" 3'])
+def test_key_repeated_as_symbol_or_string(source):
+    # A repeated key must not fill in for another one, as `a 1 "a" 2` once hid the missing key `b`.
+    with pytest.raises(ParseError, match="Keys in a tree must be unique"):
+        Schema.from_source("a number b number").decode(source)
+    with pytest.raises(SchemaError, match="Missing key 'b'"):
+        Schema.from_source("a number b number").decode("a 1")
+